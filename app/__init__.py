@@ -22,6 +22,16 @@ def create_app(config_name=None):
     app.config.from_object(config[config_name])
     config[config_name].init_app(app)
     
+    # 进程池工作进程重新导入主模块（如 run.py）时也会创建应用，不启动日志监听和学习进度缓冲线程，
+    # 避免与主进程同时写入日志文件、重放学习进度溢写文件
+    from app.utils.process_pool import in_worker_process
+    worker_process = in_worker_process()
+    
+    # 日志通过队列异步写入
+    if not worker_process:
+        from app.utils.logging_config import configure_logging
+        configure_logging(app)
+    
     # 初始化扩展
     db.init_app(app)
     migrate.init_app(app, db)
@@ -41,4 +51,9 @@ def create_app(config_name=None):
     if not os.path.exists(app.config['AUDIO_FOLDER']):
         os.makedirs(app.config['AUDIO_FOLDER'])
     
+    # 学习进度写缓冲（需在目录创建之后初始化，启动时会重放未写入的进度）
+    if not worker_process:
+        from app.services.study_buffer import study_buffer
+        study_buffer.init_app(app)
+    
     return app
\ No newline at end of file
@@ -0,0 +1,35 @@
+from datetime import datetime
+from app import db
+
+class AudioAsset(db.Model):
+    """音频清单（内容寻址存储的索引）
+    
+    每个合成来源（后端、语言、文本）对应一行，记录其音频文件在存储中的位置和元数据。
+    文件按内容哈希存放，内容相同的来源共用同一个文件。
+    校验、信息查询和垃圾回收都读取本表，不逐个访问文件系统。
+    """
+    __tablename__ = 'audio_assets'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    source_key = db.Column(db.String(120), nullable=False, unique=True)  # 后端:语言:文本MD5，也是合成缓存的键
+    checksum = db.Column(db.String(64), nullable=False, index=True)      # 文件内容的SHA-256
+    path = db.Column(db.String(200), nullable=False, index=True)         # 相对于音频目录的路径
+    size = db.Column(db.Integer, nullable=False)
+    duration_ms = db.Column(db.Integer)
+    backend = db.Column(db.String(20), nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<AudioAsset {self.source_key} -> {self.checksum[:12]}>'
+    
+    def to_dict(self):
+        """转换为字典格式"""
+        return {
+            'source_key': self.source_key,
+            'checksum': self.checksum,
+            'path': self.path,
+            'size': self.size,
+            'duration_ms': self.duration_ms,
+            'backend': self.backend,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
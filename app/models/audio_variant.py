@@ -0,0 +1,39 @@
+from datetime import datetime
+from app import db
+
+class AudioVariant(db.Model):
+    """音频转码版本
+    
+    记录存储中原始音频（gTTS 生成的 mp3 等）经过去静音、响度归一化和转码后的小体积版本。
+    原始文件保留不变，单词的 audio_url 仍指向原始文件，作为不支持新格式的浏览器的后备。
+    """
+    __tablename__ = 'audio_variants'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    source_path = db.Column(db.String(200), nullable=False)  # 原始音频在音频目录中的相对路径
+    format = db.Column(db.String(10), nullable=False)        # 转码格式（opus、aac）
+    path = db.Column(db.String(200), nullable=False, index=True)
+    size = db.Column(db.Integer, nullable=False)
+    source_size = db.Column(db.Integer, nullable=False)      # 原始文件大小，用于统计节省的字节数
+    duration_ms = db.Column(db.Integer)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    
+    # 每个原始音频的每种格式只有一个版本
+    __table_args__ = (
+        db.Index('uq_audio_variants_source_format', 'source_path', 'format', unique=True),
+    )
+    
+    def __repr__(self):
+        return f'<AudioVariant {self.source_path} -> {self.format}>'
+    
+    def to_dict(self):
+        """转换为字典格式"""
+        return {
+            'source_path': self.source_path,
+            'format': self.format,
+            'path': self.path,
+            'size': self.size,
+            'source_size': self.source_size,
+            'duration_ms': self.duration_ms,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
@@ -0,0 +1,68 @@
+from datetime import datetime, timedelta
+from app import db
+
+class UserDueCount(db.Model):
+    """用户每日待复习单词数（夜间预计算）"""
+    __tablename__ = 'user_due_counts'
+    
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    due_count = db.Column(db.Integer, nullable=False, default=0)  # 截至当天结束到期的单词数
+    next_due_at = db.Column(db.DateTime)  # 最早到期时间
+    computed_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    user = db.relationship('User', backref=db.backref('due_count', uselist=False, cascade='all, delete-orphan'))
+    
+    def __repr__(self):
+        return f'<UserDueCount user:{self.user_id} due:{self.due_count}>'
+    
+    def to_dict(self):
+        """转换为字典格式"""
+        return {
+            'user_id': self.user_id,
+            'due_count': self.due_count,
+            'next_due_at': self.next_due_at.isoformat() if self.next_due_at and hasattr(self.next_due_at, 'isoformat') else str(self.next_due_at) if self.next_due_at else None,
+            'computed_at': self.computed_at.isoformat() if self.computed_at and hasattr(self.computed_at, 'isoformat') else str(self.computed_at) if self.computed_at else None
+        }
+    
+    @staticmethod
+    def refresh(as_of=None):
+        """重新计算所有用户截至当天结束的待复习单词数
+        
+        Args:
+            as_of (datetime): 计算基准时间，默认当前时间
+        
+        Returns:
+            int: 有待复习单词的用户数
+        """
+        from app.models.study_record import StudyRecord
+        
+        as_of = as_of or datetime.utcnow()
+        day_end = datetime.combine(as_of.date(), datetime.min.time()) + timedelta(days=1)
+        
+        # 单次分组查询统计所有用户
+        rows = db.session.query(
+            StudyRecord.user_id,
+            db.func.count(StudyRecord.id),
+            db.func.min(StudyRecord.due_at)
+        ).filter(
+            StudyRecord.due_at < day_end
+        ).group_by(StudyRecord.user_id).all()
+        
+        UserDueCount.query.delete(synchronize_session=False)
+        db.session.add_all([
+            UserDueCount(user_id=user_id, due_count=count, next_due_at=next_due_at, computed_at=as_of)
+            for user_id, count, next_due_at in rows
+        ])
+        db.session.commit()
+        
+        return len(rows)
+    
+    @staticmethod
+    def get_for_user(user_id, as_of=None):
+        """获取用户当天的预计算结果，不是当天计算的返回None"""
+        as_of = as_of or datetime.utcnow()
+        
+        record = db.session.get(UserDueCount, user_id)
+        if record and record.computed_at and record.computed_at.date() == as_of.date():
+            return record
+        return None
@@ -0,0 +1,214 @@
+from app import db
+
+class UserProgressCounter(db.Model):
+    """用户学习进度计数器（随学习记录在同一事务中增量维护）
+    
+    每个用户按三个层级各保存一行：
+    - (0, 0)：用户全部学习进度
+    - (年级, 0)：该年级学习进度
+    - (年级, 单元)：该单元学习进度
+    """
+    __tablename__ = 'user_progress_counters'
+    
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    grade = db.Column(db.Integer, primary_key=True, default=0)
+    unit = db.Column(db.Integer, primary_key=True, default=0)
+    studied = db.Column(db.Integer, nullable=False, default=0)  # 已学习单词数
+    mastered = db.Column(db.Integer, nullable=False, default=0)  # 已掌握单词数
+    mastery_sum = db.Column(db.Integer, nullable=False, default=0)  # 掌握程度之和，用于计算平均掌握程度
+    
+    user = db.relationship('User', backref=db.backref('progress_counters', lazy='dynamic', cascade='all, delete-orphan'))
+    
+    # 掌握程度不低于该值视为已掌握
+    MASTERED_LEVEL = 4
+    
+    def __repr__(self):
+        return f'<UserProgressCounter user:{self.user_id} grade:{self.grade} unit:{self.unit} studied:{self.studied}>'
+    
+    @staticmethod
+    def change_delta(old_level, new_level):
+        """计算一次学习记录变化对计数器的增量 (studied, mastered, mastery_sum)
+        
+        Args:
+            old_level (int): 原掌握程度，新学习的单词为None
+            new_level (int): 新掌握程度
+        """
+        mastered_level = UserProgressCounter.MASTERED_LEVEL
+        if old_level is None:
+            return 1, int(new_level >= mastered_level), new_level
+        return 0, int(new_level >= mastered_level) - int(old_level >= mastered_level), new_level - old_level
+    
+    @staticmethod
+    def apply_deltas(user_id, unit_deltas):
+        """把各单元的增量累加到单元、年级和用户三级计数器（不提交事务）
+        
+        Args:
+            user_id (int): 用户ID
+            unit_deltas (dict): {(年级, 单元): (studied, mastered, mastery_sum)}
+        """
+        from sqlalchemy.dialects.sqlite import insert
+        
+        totals = {}
+        for (grade, unit), delta in unit_deltas.items():
+            for key in ((0, 0), (grade, 0), (grade, unit)):
+                current = totals.get(key, (0, 0, 0))
+                totals[key] = tuple(a + b for a, b in zip(current, delta))
+        
+        rows = [
+            {
+                'user_id': user_id,
+                'grade': grade,
+                'unit': unit,
+                'studied': studied,
+                'mastered': mastered,
+                'mastery_sum': mastery_sum
+            }
+            for (grade, unit), (studied, mastered, mastery_sum) in totals.items()
+            if studied or mastered or mastery_sum
+        ]
+        if not rows:
+            return
+        
+        # 单条 INSERT ... ON CONFLICT DO UPDATE，在数据库中累加，避免并发写入时丢失更新
+        stmt = insert(UserProgressCounter).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=['user_id', 'grade', 'unit'],
+            set_={
+                'studied': UserProgressCounter.studied + stmt.excluded.studied,
+                'mastered': UserProgressCounter.mastered + stmt.excluded.mastered,
+                'mastery_sum': UserProgressCounter.mastery_sum + stmt.excluded.mastery_sum
+            }
+        )
+        db.session.execute(stmt)
+    
+    @staticmethod
+    def get_counters(user_id, keys):
+        """一次主键查询获取多个计数器
+        
+        Args:
+            user_id (int): 用户ID
+            keys (list): (年级, 单元) 列表，0 表示不限
+        
+        Returns:
+            dict: {(年级, 单元): (studied, mastered, mastery_sum)}，没有记录的为全0
+        """
+        keys = list(keys)
+        rows = db.session.query(
+            UserProgressCounter.grade,
+            UserProgressCounter.unit,
+            UserProgressCounter.studied,
+            UserProgressCounter.mastered,
+            UserProgressCounter.mastery_sum
+        ).filter(
+            UserProgressCounter.user_id == user_id,
+            db.tuple_(UserProgressCounter.grade, UserProgressCounter.unit).in_(keys)
+        ).all()
+        
+        found = {(row.grade, row.unit): (row.studied, row.mastered, row.mastery_sum) for row in rows}
+        return {key: found.get(key, (0, 0, 0)) for key in keys}
+    
+    @staticmethod
+    def get_counters_for_users(keys_by_user):
+        """一次主键查询获取多个用户的计数器（用于班级报告等批量场景）
+        
+        Args:
+            keys_by_user (dict): {用户ID: (年级, 单元) 列表}
+        
+        Returns:
+            dict: {用户ID: {(年级, 单元): (studied, mastered, mastery_sum)}}，没有记录的为全0
+        """
+        triples = [
+            (user_id, grade, unit)
+            for user_id, keys in keys_by_user.items()
+            for grade, unit in keys
+        ]
+        if not triples:
+            return {}
+        
+        rows = db.session.query(
+            UserProgressCounter.user_id,
+            UserProgressCounter.grade,
+            UserProgressCounter.unit,
+            UserProgressCounter.studied,
+            UserProgressCounter.mastered,
+            UserProgressCounter.mastery_sum
+        ).filter(
+            db.tuple_(UserProgressCounter.user_id, UserProgressCounter.grade, UserProgressCounter.unit).in_(triples)
+        ).all()
+        
+        found = {(row.user_id, row.grade, row.unit): (row.studied, row.mastered, row.mastery_sum) for row in rows}
+        return {
+            user_id: {key: found.get((user_id,) + tuple(key), (0, 0, 0)) for key in keys}
+            for user_id, keys in keys_by_user.items()
+        }
+    
+    @staticmethod
+    def get_unit_counters(user_id, unit):
+        """获取用户在所有年级中同一单元号的合计（未指定年级时使用）"""
+        row = db.session.query(
+            db.func.coalesce(db.func.sum(UserProgressCounter.studied), 0),
+            db.func.coalesce(db.func.sum(UserProgressCounter.mastered), 0),
+            db.func.coalesce(db.func.sum(UserProgressCounter.mastery_sum), 0)
+        ).filter(
+            UserProgressCounter.user_id == user_id,
+            UserProgressCounter.grade != 0,
+            UserProgressCounter.unit == unit
+        ).one()
+        return tuple(int(value) for value in row)
+    
+    @staticmethod
+    def rebuild(user_ids=None, commit=True):
+        """根据学习记录重建计数器（用于初始化、数据修复或单词调整年级/单元后）
+        
+        Args:
+            user_ids (list): 需要重建的用户ID，None 表示全部用户
+            commit (bool): 是否提交事务
+        
+        Returns:
+            int: 重建后的计数器行数
+        """
+        from app.models.study_record import StudyRecord
+        from app.models.word import Word
+        
+        delete_query = UserProgressCounter.query
+        if user_ids is not None:
+            if not user_ids:
+                return 0
+            delete_query = delete_query.filter(UserProgressCounter.user_id.in_(user_ids))
+        delete_query.delete(synchronize_session=False)
+        
+        mastered = db.func.sum(db.case((StudyRecord.mastery_level >= UserProgressCounter.MASTERED_LEVEL, 1), else_=0))
+        zero = db.literal(0)
+        levels = [
+            (zero, zero, []),
+            (Word.grade, zero, [Word.grade]),
+            (Word.grade, Word.unit, [Word.grade, Word.unit])
+        ]
+        
+        for grade, unit, group_columns in levels:
+            source = db.session.query(
+                StudyRecord.user_id,
+                grade,
+                unit,
+                db.func.count(StudyRecord.id),
+                mastered,
+                db.func.sum(StudyRecord.mastery_level)
+            ).join(Word, Word.id == StudyRecord.word_id)
+            if user_ids is not None:
+                source = source.filter(StudyRecord.user_id.in_(user_ids))
+            source = source.group_by(StudyRecord.user_id, *group_columns)
+            
+            db.session.execute(
+                db.insert(UserProgressCounter).from_select(
+                    ['user_id', 'grade', 'unit', 'studied', 'mastered', 'mastery_sum'],
+                    source
+                )
+            )
+        
+        if commit:
+            db.session.commit()
+        
+        query = UserProgressCounter.query
+        if user_ids is not None:
+            query = query.filter(UserProgressCounter.user_id.in_(user_ids))
+        return query.count()
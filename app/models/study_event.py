@@ -0,0 +1,191 @@
+from datetime import datetime, timedelta
+from app import db
+
+class StudyEvent(db.Model):
+    """学习事件日志（只追加）
+    
+    StudyRecord 只保存每个单词最近一次的掌握程度，本表记录每一次学习，
+    用于按天统计学习量和连续学习天数。行尽量紧凑：用户、单词、掌握程度、时间。
+    """
+    __tablename__ = 'study_events'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    word_id = db.Column(db.Integer, nullable=False)  # 不设外键，单词删除后历史学习量仍然保留
+    level = db.Column(db.SmallInteger, nullable=False)  # 本次掌握程度 1-5
+    ts = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    
+    # (user_id, ts) 复合索引使按用户的时间范围查询成为一次范围扫描
+    __table_args__ = (
+        db.Index('idx_study_events_user_ts', 'user_id', 'ts'),
+    )
+    
+    user = db.relationship('User', backref=db.backref('study_events', lazy='dynamic', cascade='all, delete-orphan'))
+    
+    # 掌握程度不低于该值视为已掌握
+    MASTERED_LEVEL = 4
+    
+    def __repr__(self):
+        return f'<StudyEvent user:{self.user_id} word:{self.word_id} level:{self.level} ts:{self.ts}>'
+    
+    @staticmethod
+    def append(user_id, events):
+        """追加学习事件（不提交事务，由调用方与学习记录一并提交）
+        
+        Args:
+            user_id (int): 用户ID
+            events (list): (word_id, level, ts) 元组列表
+        """
+        if not events:
+            return
+        
+        db.session.execute(db.insert(StudyEvent), [
+            {'user_id': user_id, 'word_id': word_id, 'level': level, 'ts': ts}
+            for word_id, level, ts in events
+        ])
+    
+    @staticmethod
+    def get_daily_stats(user_id, start_day, end_day=None):
+        """按天统计学习量（在数据库中分组）
+        
+        Args:
+            user_id (int): 用户ID
+            start_day (date): 起始日期（含）
+            end_day (date): 结束日期（含），默认今天
+        
+        Returns:
+            list: [{'date', 'studied_count', 'mastered_count', 'event_count'}]，按日期升序，只包含有学习的日期
+        """
+        end_day = end_day or datetime.utcnow().date()
+        start = datetime.combine(start_day, datetime.min.time())
+        end = datetime.combine(end_day, datetime.min.time()) + timedelta(days=1)
+        
+        day = db.func.date(StudyEvent.ts)
+        mastered_word = db.case((StudyEvent.level >= StudyEvent.MASTERED_LEVEL, StudyEvent.word_id))
+        
+        rows = db.session.query(
+            day,
+            db.func.count(db.distinct(StudyEvent.word_id)),
+            db.func.count(db.distinct(mastered_word)),
+            db.func.count(StudyEvent.id)
+        ).filter(
+            StudyEvent.user_id == user_id,
+            StudyEvent.ts >= start,
+            StudyEvent.ts < end
+        ).group_by(day).order_by(day).all()
+        
+        return [
+            {
+                'date': date,
+                'studied_count': studied,
+                'mastered_count': mastered,
+                'event_count': events
+            }
+            for date, studied, mastered, events in rows
+        ]
+    
+    @staticmethod
+    def get_streak(user_id, as_of=None, max_days=366):
+        """计算截至今天的连续学习天数（在数据库中用窗口函数识别连续日期段）
+        
+        今天还没有学习时，从昨天开始往前计算。
+        
+        Args:
+            user_id (int): 用户ID
+            as_of (datetime): 计算基准时间，默认当前时间
+            max_days (int): 最多往前查看的天数
+        
+        Returns:
+            int: 连续学习天数
+        """
+        as_of = as_of or datetime.utcnow()
+        today = as_of.date()
+        since = datetime.combine(today - timedelta(days=max_days), datetime.min.time())
+        
+        days = db.session.query(
+            db.func.date(StudyEvent.ts).label('day')
+        ).filter(
+            StudyEvent.user_id == user_id,
+            StudyEvent.ts >= since
+        ).distinct().subquery()
+        
+        # 日期倒序编号后，连续日期的 (儒略日 + 序号) 相同
+        island = (
+            db.func.julianday(days.c.day) +
+            db.func.row_number().over(order_by=days.c.day.desc())
+        ).label('island')
+        islands = db.session.query(days.c.day, island).subquery()
+        
+        latest = db.session.query(
+            db.func.max(islands.c.day),
+            db.func.count()
+        ).group_by(islands.c.island).order_by(db.func.max(islands.c.day).desc()).first()
+        
+        if not latest:
+            return 0
+        
+        last_day, streak = latest
+        if last_day < (today - timedelta(days=1)).isoformat():
+            return 0
+        return streak
+    
+    @staticmethod
+    def compact(before):
+        """压缩旧事件：每个 (用户, 单词, 日期) 只保留掌握程度最高的一条
+        
+        压缩后按天统计的学习单词数与掌握单词数不变。
+        
+        Args:
+            before (datetime): 只压缩早于该时间的事件
+        
+        Returns:
+            int: 删除的事件数
+        """
+        deleted = db.session.execute(db.text('''
+            DELETE FROM study_events
+            WHERE ts < :before AND id NOT IN (
+                SELECT id FROM (
+                    SELECT id, ROW_NUMBER() OVER (
+                        PARTITION BY user_id, word_id, date(ts)
+                        ORDER BY level DESC, ts DESC, id DESC
+                    ) AS row_num
+                    FROM study_events
+                    WHERE ts < :before
+                ) WHERE row_num = 1
+            )
+        ''').bindparams(db.bindparam('before', type_=db.DateTime)), {'before': before}).rowcount
+        db.session.commit()
+        return deleted
+    
+    @staticmethod
+    def purge(before):
+        """删除超过保留期限的事件
+        
+        Returns:
+            int: 删除的事件数
+        """
+        deleted = StudyEvent.query.filter(StudyEvent.ts < before).delete(synchronize_session=False)
+        db.session.commit()
+        return deleted
+    
+    @staticmethod
+    def backfill_from_records():
+        """用现有学习记录初始化事件日志（每条记录对应其最近一次学习）
+        
+        Returns:
+            int: 写入的事件数
+        """
+        from app.models.study_record import StudyRecord
+        
+        source = db.session.query(
+            StudyRecord.user_id,
+            StudyRecord.word_id,
+            StudyRecord.mastery_level,
+            StudyRecord.studied_at
+        ).filter(StudyRecord.studied_at.isnot(None))
+        
+        result = db.session.execute(
+            db.insert(StudyEvent).from_select(['user_id', 'word_id', 'level', 'ts'], source)
+        )
+        db.session.commit()
+        return result.rowcount
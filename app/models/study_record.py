@@ -1,4 +1,4 @@
-from datetime import datetime
+from datetime import datetime, timedelta
 from app import db
 
 class StudyRecord(db.Model):
@@ -11,11 +11,24 @@ class StudyRecord(db.Model):
     studied_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
     mastery_level = db.Column(db.Integer, nullable=False, default=1)  # 掌握程度 1-5
     
-    # 复合唯一索引，确保一个用户对一个单词只有一条最新记录
+    # 间隔重复调度（SM-2算法）
+    due_at = db.Column(db.DateTime)  # 下次复习时间
+    interval_days = db.Column(db.Float, nullable=False, default=0)  # 当前复习间隔（天）
+    ease = db.Column(db.Float, nullable=False, default=2.5)  # 难易系数
+    repetitions = db.Column(db.Integer, nullable=False, default=0)  # 连续成功复习次数
+    
+    # 复合唯一索引，确保一个用户对一个单词只有一条最新记录（批量写入依赖它做 ON CONFLICT 更新）
+    # (user_id, due_at) 复合索引使"当前待复习单词"成为一次范围扫描
     __table_args__ = (
-        db.Index('idx_study_records_user_word', 'user_id', 'word_id'),
+        db.Index('uq_study_records_user_word', 'user_id', 'word_id', unique=True),
+        db.Index('idx_study_records_user_due', 'user_id', 'due_at'),
     )
     
+    # SM-2 参数
+    DEFAULT_EASE = 2.5
+    MIN_EASE = 1.3
+    PASSING_LEVEL = 3  # 掌握程度不低于该值视为复习成功
+    
     def __repr__(self):
         return f'<StudyRecord user:{self.user_id} word:{self.word_id} level:{self.mastery_level}>'
     
@@ -27,47 +40,283 @@ class StudyRecord(db.Model):
             'word_id': self.word_id,
             'studied_at': self.studied_at.isoformat() if self.studied_at and hasattr(self.studied_at, 'isoformat') else str(self.studied_at) if self.studied_at else None,
             'mastery_level': self.mastery_level,
+            'due_at': self.due_at.isoformat() if self.due_at and hasattr(self.due_at, 'isoformat') else str(self.due_at) if self.due_at else None,
+            'interval_days': self.interval_days,
+            'ease': self.ease,
             'word': self.word.to_dict() if self.word else None
         }
     
+    @staticmethod
+    def compute_schedule(mastery_level, repetitions=0, interval_days=0, ease=None, reviewed_at=None):
+        """根据本次复习的掌握程度计算下次复习安排（SM-2算法）
+        
+        Args:
+            mastery_level (int): 本次掌握程度 1-5，作为SM-2的回忆质量评分
+            repetitions (int): 此前连续成功复习次数
+            interval_days (float): 此前复习间隔（天）
+            ease (float): 此前难易系数
+            reviewed_at (datetime): 复习时间
+        
+        Returns:
+            dict: repetitions、interval_days、ease、due_at
+        """
+        reviewed_at = reviewed_at or datetime.utcnow()
+        ease = ease or StudyRecord.DEFAULT_EASE
+        repetitions = repetitions or 0
+        interval_days = interval_days or 0
+        
+        if mastery_level >= StudyRecord.PASSING_LEVEL:
+            if repetitions == 0:
+                interval_days = 1
+            elif repetitions == 1:
+                interval_days = 6
+            else:
+                interval_days = round(interval_days * ease, 1)
+            repetitions += 1
+        else:
+            # 复习失败，重新从短间隔开始
+            repetitions = 0
+            interval_days = 1
+        
+        quality_gap = 5 - mastery_level
+        ease = max(StudyRecord.MIN_EASE, ease + 0.1 - quality_gap * (0.08 + quality_gap * 0.02))
+        
+        return {
+            'repetitions': repetitions,
+            'interval_days': interval_days,
+            'ease': round(ease, 2),
+            'due_at': reviewed_at + timedelta(days=interval_days)
+        }
+    
+    def schedule_review(self, mastery_level, reviewed_at=None):
+        """记录一次复习并更新下次复习时间"""
+        schedule = StudyRecord.compute_schedule(
+            mastery_level,
+            repetitions=self.repetitions,
+            interval_days=self.interval_days,
+            ease=self.ease,
+            reviewed_at=reviewed_at
+        )
+        
+        self.repetitions = schedule['repetitions']
+        self.interval_days = schedule['interval_days']
+        self.ease = schedule['ease']
+        self.due_at = schedule['due_at']
+    
     @staticmethod
     def update_or_create(user_id, word_id, mastery_level):
         """更新或创建学习记录"""
+        from app.models.word_stat import WordStat
+        from app.models.progress_counter import UserProgressCounter
+        from app.models.study_event import StudyEvent
+        
         record = StudyRecord.query.filter_by(user_id=user_id, word_id=word_id).first()
         
+        now = datetime.utcnow()
+        old_level = record.mastery_level if record else None
+        
         if record:
             # 更新现有记录
             record.mastery_level = mastery_level
-            record.studied_at = datetime.utcnow()
+            record.studied_at = now
         else:
             # 创建新记录
             record = StudyRecord(
                 user_id=user_id,
                 word_id=word_id,
-                mastery_level=mastery_level
+                mastery_level=mastery_level,
+                studied_at=now
             )
             db.session.add(record)
         
+        # 更新间隔重复调度
+        record.schedule_review(mastery_level, now)
+        
+        # 累加单词难度统计，与学习记录在同一事务中提交
+        WordStat.record_attempts([
+            (word_id, mastery_level <= WordStat.STUDY_ERROR_LEVEL, None)
+        ])
+        
+        # 累加用户学习进度计数器
+        StudyRecord._apply_progress_deltas(user_id, {
+            word_id: UserProgressCounter.change_delta(old_level, mastery_level)
+        })
+        
+        # 追加学习事件
+        StudyEvent.append(user_id, [(word_id, mastery_level, now)])
+        
         db.session.commit()
         return record
     
     @staticmethod
-    def get_user_progress(user_id, grade=None, unit=None):
-        """获取用户学习进度"""
+    def bulk_upsert(user_id, items, commit=True):
+        """批量写入学习记录：一次查询读取现有复习状态，一条 INSERT ... ON CONFLICT DO UPDATE 写入
+        
+        Args:
+            user_id (int): 用户ID
+            items (list): 已校验的 {'word_id', 'mastery_level', 'studied_at'} 字典列表
+            commit (bool): 是否提交事务，多个用户合并写入时由调用方统一提交
+        
+        Returns:
+            int: 实际写入的单词数
+        """
+        from sqlalchemy.dialects.sqlite import insert
+        from app.models.word_stat import WordStat
+        from app.models.progress_counter import UserProgressCounter
+        from app.models.study_event import StudyEvent
+        
+        if not items:
+            return 0
+        
+        # 同一单词只保留最后一次学习
+        latest = {}
+        for item in items:
+            current = latest.get(item['word_id'])
+            if current is None or item['studied_at'] >= current['studied_at']:
+                latest[item['word_id']] = item
+        
+        existing = {
+            row.word_id: row for row in db.session.query(
+                StudyRecord.word_id,
+                StudyRecord.studied_at,
+                StudyRecord.mastery_level,
+                StudyRecord.repetitions,
+                StudyRecord.interval_days,
+                StudyRecord.ease
+            ).filter(
+                StudyRecord.user_id == user_id,
+                StudyRecord.word_id.in_(list(latest.keys()))
+            ).all()
+        }
+        
+        rows = []
+        word_deltas = {}
+        for word_id, item in latest.items():
+            previous = existing.get(word_id)
+            
+            # 晚到的旧数据（如离线设备补传）不覆盖更新的记录；时间相同说明是同一次学习（重复提交或重放），不再推进复习间隔
+            if previous and previous.studied_at and item['studied_at'] <= previous.studied_at:
+                continue
+            
+            schedule = StudyRecord.compute_schedule(
+                item['mastery_level'],
+                repetitions=previous.repetitions if previous else 0,
+                interval_days=previous.interval_days if previous else 0,
+                ease=previous.ease if previous else None,
+                reviewed_at=item['studied_at']
+            )
+            rows.append({
+                'user_id': user_id,
+                'word_id': word_id,
+                'mastery_level': item['mastery_level'],
+                'studied_at': item['studied_at'],
+                **schedule
+            })
+            word_deltas[word_id] = UserProgressCounter.change_delta(
+                previous.mastery_level if previous else None,
+                item['mastery_level']
+            )
+        
+        if rows:
+            stmt = insert(StudyRecord).values(rows)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=['user_id', 'word_id'],
+                set_={
+                    'mastery_level': stmt.excluded.mastery_level,
+                    'studied_at': stmt.excluded.studied_at,
+                    'due_at': stmt.excluded.due_at,
+                    'interval_days': stmt.excluded.interval_days,
+                    'ease': stmt.excluded.ease,
+                    'repetitions': stmt.excluded.repetitions
+                },
+                where=db.or_(
+                    StudyRecord.studied_at.is_(None),
+                    stmt.excluded.studied_at > StudyRecord.studied_at
+                )
+            )
+            db.session.execute(stmt)
+        
+        # 每次翻卡都计入单词难度统计，与学习记录在同一事务中提交
+        WordStat.record_attempts([
+            (item['word_id'], item['mastery_level'] <= WordStat.STUDY_ERROR_LEVEL, None)
+            for item in items
+        ])
+        
+        # 累加用户学习进度计数器
+        StudyRecord._apply_progress_deltas(user_id, word_deltas)
+        
+        # 每次学习都追加到事件日志（包括晚到的旧数据，它们仍是当天真实发生的学习）
+        StudyEvent.append(user_id, [
+            (item['word_id'], item['mastery_level'], item['studied_at'])
+            for item in items
+        ])
+        
+        if commit:
+            db.session.commit()
+        return len(rows)
+    
+    @staticmethod
+    def _apply_progress_deltas(user_id, word_deltas):
+        """按单词所属年级、单元汇总增量并累加到用户学习进度计数器（不提交事务）
+        
+        Args:
+            user_id (int): 用户ID
+            word_deltas (dict): {单词ID: (studied, mastered, mastery_sum)}
+        """
         from app.models.word import Word
+        from app.models.progress_counter import UserProgressCounter
+        
+        if not word_deltas:
+            return
+        
+        locations = db.session.query(Word.id, Word.grade, Word.unit).filter(
+            Word.id.in_(list(word_deltas.keys()))
+        ).all()
+        
+        unit_deltas = {}
+        for word_id, grade, unit in locations:
+            current = unit_deltas.get((grade, unit), (0, 0, 0))
+            unit_deltas[(grade, unit)] = tuple(a + b for a, b in zip(current, word_deltas[word_id]))
         
-        query = StudyRecord.query.filter_by(user_id=user_id)
+        UserProgressCounter.apply_deltas(user_id, unit_deltas)
+    
+    @staticmethod
+    def get_due_records(user_id, limit=10, now=None):
+        """获取当前到期待复习的学习记录（按到期时间先后）"""
+        from sqlalchemy.orm import joinedload
         
-        if grade or unit:
-            query = query.join(Word)
-            if grade:
-                query = query.filter(Word.grade == grade)
-            if unit:
-                query = query.filter(Word.unit == unit)
+        now = now or datetime.utcnow()
+        
+        return StudyRecord.query.options(joinedload(StudyRecord.word)).filter(
+            StudyRecord.user_id == user_id,
+            StudyRecord.due_at <= now
+        ).order_by(StudyRecord.due_at.asc()).limit(limit).all()
+    
+    @staticmethod
+    def count_due(user_id, now=None):
+        """统计当前到期待复习的单词数"""
+        now = now or datetime.utcnow()
+        
+        return StudyRecord.query.filter(
+            StudyRecord.user_id == user_id,
+            StudyRecord.due_at <= now
+        ).count()
+    
+    @staticmethod
+    def get_user_progress(user_id, grade=None, unit=None):
+        """获取用户学习进度（读取预先累计的进度计数器）"""
+        from app.models.progress_counter import UserProgressCounter
+        from app.services.cache_service import WordCacheService
         
-        records = query.all()
+        if grade:
+            key = (grade, unit or 0)
+            studied_words, mastered_words, mastery_sum = UserProgressCounter.get_counters(user_id, [key])[key]
+        elif unit:
+            studied_words, mastered_words, mastery_sum = UserProgressCounter.get_unit_counters(user_id, unit)
+        else:
+            studied_words, mastered_words, mastery_sum = UserProgressCounter.get_counters(user_id, [(0, 0)])[(0, 0)]
         
-        if not records:
+        if not studied_words:
             return {
                 'total_words': 0,
                 'studied_words': 0,
@@ -76,25 +325,15 @@ class StudyRecord(db.Model):
                 'progress_rate': 0
             }
         
-        studied_words = len(records)
-        mastered_words = len([r for r in records if r.mastery_level >= 4])
-        average_mastery = sum(r.mastery_level for r in records) / studied_words
-        
-        # 获取总单词数
-        word_query = Word.query
-        if grade:
-            word_query = word_query.filter_by(grade=grade)
-        if unit:
-            word_query = word_query.filter_by(unit=unit)
-        
-        total_words = word_query.count()
+        # 获取总单词数（来自词库缓存）
+        total_words = WordCacheService.count_words(grade, unit)
         progress_rate = (studied_words / total_words * 100) if total_words > 0 else 0
         
         return {
             'total_words': total_words,
             'studied_words': studied_words,
             'mastered_words': mastered_words,
-            'average_mastery': round(average_mastery, 1),
+            'average_mastery': round(mastery_sum / studied_words, 1),
             'progress_rate': round(progress_rate, 1),
             'mastery_rate': round((mastered_words / studied_words * 100) if studied_words > 0 else 0, 1)
         }
\ No newline at end of file
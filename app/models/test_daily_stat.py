@@ -0,0 +1,182 @@
+from datetime import datetime, timedelta
+from app import db
+
+class TestDailyStat(db.Model):
+    """用户每日测验汇总模型（按用户、日期、测验类型累计，随测验记录增量更新）"""
+    __tablename__ = 'test_daily_stats'
+    
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    test_type = db.Column(db.String(20), primary_key=True)
+    test_count = db.Column(db.Integer, nullable=False, default=0)
+    total_questions = db.Column(db.Integer, nullable=False, default=0)
+    total_correct = db.Column(db.Integer, nullable=False, default=0)
+    
+    user = db.relationship('User', backref=db.backref('test_daily_stats', lazy='dynamic', cascade='all, delete-orphan'))
+    
+    def __repr__(self):
+        return f'<TestDailyStat user:{self.user_id} day:{self.day} type:{self.test_type} tests:{self.test_count}>'
+    
+    @staticmethod
+    def record_test(user_id, test_type, tested_at, total_questions, correct_answers):
+        """累加一次测验到当日汇总（不提交事务，由调用方与测验记录一并提交）"""
+        day = (tested_at or datetime.utcnow()).date()
+        
+        stat = db.session.get(TestDailyStat, (user_id, day, test_type))
+        if stat is None:
+            stat = TestDailyStat(
+                user_id=user_id,
+                day=day,
+                test_type=test_type,
+                test_count=1,
+                total_questions=total_questions,
+                total_correct=correct_answers
+            )
+            db.session.add(stat)
+            return stat
+        
+        # 使用SQL表达式自增，避免并发写入时丢失更新
+        stat.test_count = TestDailyStat.test_count + 1
+        stat.total_questions = TestDailyStat.total_questions + total_questions
+        stat.total_correct = TestDailyStat.total_correct + correct_answers
+        return stat
+    
+    @staticmethod
+    def get_window_stats(user_id, windows=(30, 7)):
+        """一次分组查询计算多个时间窗口的测验统计
+        
+        Args:
+            user_id (int): 用户ID
+            windows (iterable): 时间窗口天数列表，窗口包含今天在内的最近N个自然日
+        
+        Returns:
+            dict: {天数: 统计数据}，统计数据格式与 TestRecord.get_user_test_stats 一致
+        """
+        windows = sorted(set(windows), reverse=True)
+        today = datetime.utcnow().date()
+        start_days = {days: today - timedelta(days=max(days, 1) - 1) for days in windows}
+        
+        columns = [TestDailyStat.test_type]
+        for days in windows:
+            in_window = TestDailyStat.day >= start_days[days]
+            columns.extend([
+                db.func.sum(db.case((in_window, TestDailyStat.test_count), else_=0)),
+                db.func.sum(db.case((in_window, TestDailyStat.total_questions), else_=0)),
+                db.func.sum(db.case((in_window, TestDailyStat.total_correct), else_=0)),
+            ])
+        
+        rows = db.session.query(*columns).filter(
+            TestDailyStat.user_id == user_id,
+            TestDailyStat.day >= start_days[windows[0]]
+        ).group_by(TestDailyStat.test_type).all()
+        
+        results = {}
+        for index, days in enumerate(windows):
+            offset = 1 + index * 3
+            test_types = {}
+            for row in rows:
+                count, questions, correct = (int(value or 0) for value in row[offset:offset + 3])
+                if count == 0:
+                    continue
+                test_types[row[0]] = {
+                    'count': count,
+                    'total_questions': questions,
+                    'total_correct': correct,
+                    'average_score': round(correct / questions * 100, 1) if questions > 0 else 0
+                }
+            
+            results[days] = TestDailyStat._summarize(test_types)
+        
+        return results
+    
+    @staticmethod
+    def get_window_stats_for_users(user_ids, days=30):
+        """一次分组查询计算多个用户最近N天的测验统计（用于班级报告等批量场景）
+        
+        Args:
+            user_ids (list): 用户ID列表
+            days (int): 时间窗口天数，窗口包含今天在内的最近N个自然日
+        
+        Returns:
+            dict: {用户ID: 统计数据}，统计数据格式与 TestRecord.get_user_test_stats 一致
+        """
+        user_ids = list(user_ids)
+        start_day = datetime.utcnow().date() - timedelta(days=max(days, 1) - 1)
+        
+        rows = db.session.query(
+            TestDailyStat.user_id,
+            TestDailyStat.test_type,
+            db.func.sum(TestDailyStat.test_count),
+            db.func.sum(TestDailyStat.total_questions),
+            db.func.sum(TestDailyStat.total_correct)
+        ).filter(
+            TestDailyStat.user_id.in_(user_ids),
+            TestDailyStat.day >= start_day
+        ).group_by(TestDailyStat.user_id, TestDailyStat.test_type).all()
+        
+        test_types_by_user = {user_id: {} for user_id in user_ids}
+        for user_id, test_type, count, questions, correct in rows:
+            count, questions, correct = int(count or 0), int(questions or 0), int(correct or 0)
+            if count == 0:
+                continue
+            test_types_by_user[user_id][test_type] = {
+                'count': count,
+                'total_questions': questions,
+                'total_correct': correct,
+                'average_score': round(correct / questions * 100, 1) if questions > 0 else 0
+            }
+        
+        return {
+            user_id: TestDailyStat._summarize(test_types)
+            for user_id, test_types in test_types_by_user.items()
+        }
+    
+    @staticmethod
+    def _summarize(test_types):
+        """由各测验类型的统计汇总出总体统计"""
+        total_questions = sum(t['total_questions'] for t in test_types.values())
+        total_correct = sum(t['total_correct'] for t in test_types.values())
+        
+        return {
+            'total_tests': sum(t['count'] for t in test_types.values()),
+            'average_score': round(total_correct / total_questions * 100, 1) if total_questions > 0 else 0,
+            'total_questions': total_questions,
+            'total_correct': total_correct,
+            'test_types': test_types
+        }
+    
+    @staticmethod
+    def rebuild(user_id=None):
+        """根据测验记录重建每日汇总（用于初始化或数据修复）"""
+        from app.models.test_record import TestRecord
+        
+        delete_query = TestDailyStat.query
+        if user_id:
+            delete_query = delete_query.filter_by(user_id=user_id)
+        delete_query.delete(synchronize_session=False)
+        
+        day = db.func.date(TestRecord.tested_at)
+        source = db.session.query(
+            TestRecord.user_id,
+            day,
+            TestRecord.test_type,
+            db.func.count(TestRecord.id),
+            db.func.sum(TestRecord.total_questions),
+            db.func.sum(TestRecord.correct_answers)
+        ).filter(TestRecord.tested_at.isnot(None))
+        if user_id:
+            source = source.filter(TestRecord.user_id == user_id)
+        source = source.group_by(TestRecord.user_id, day, TestRecord.test_type)
+        
+        db.session.execute(
+            db.insert(TestDailyStat).from_select(
+                ['user_id', 'day', 'test_type', 'test_count', 'total_questions', 'total_correct'],
+                source
+            )
+        )
+        db.session.commit()
+        
+        query = TestDailyStat.query
+        if user_id:
+            query = query.filter_by(user_id=user_id)
+        return query.count()
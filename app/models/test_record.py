@@ -1,5 +1,6 @@
 from datetime import datetime
 from app import db
+from app.models.test_daily_stat import TestDailyStat
 import json
 
 class TestRecord(db.Model):
@@ -95,63 +96,21 @@ class TestRecord(db.Model):
         if wrong_word_ids:
             record.set_wrong_word_ids(wrong_word_ids)
         
+        record.tested_at = datetime.utcnow()
         db.session.add(record)
+        
+        # 累加每日汇总，与测验记录在同一事务中提交
+        TestDailyStat.record_test(user_id, test_type, record.tested_at, total_questions, correct_answers)
+        
         db.session.commit()
         return record
     
     @staticmethod
     def get_user_test_stats(user_id, days=30):
-        """获取用户测验统计"""
-        from sqlalchemy import func
-        from datetime import timedelta
-        
-        end_date = datetime.utcnow()
-        start_date = end_date - timedelta(days=days)
-        
-        records = TestRecord.query.filter(
-            TestRecord.user_id == user_id,
-            TestRecord.tested_at >= start_date
-        ).all()
-        
-        if not records:
-            return {
-                'total_tests': 0,
-                'average_score': 0,
-                'total_questions': 0,
-                'total_correct': 0,
-                'test_types': {}
-            }
+        """获取用户测验统计（读取每日汇总表，不扫描测验明细）"""
+        return TestRecord.get_user_test_stats_windows(user_id, (days,))[days]
         
-        total_tests = len(records)
-        total_questions = sum(r.total_questions for r in records)
-        total_correct = sum(r.correct_answers for r in records)
-        average_score = (total_correct / total_questions * 100) if total_questions > 0 else 0
-        
-        # 按测试类型统计
-        test_types = {}
-        for record in records:
-            if record.test_type not in test_types:
-                test_types[record.test_type] = {
-                    'count': 0,
-                    'total_questions': 0,
-                    'total_correct': 0,
-                    'average_score': 0
-                }
-            
-            test_types[record.test_type]['count'] += 1
-            test_types[record.test_type]['total_questions'] += record.total_questions
-            test_types[record.test_type]['total_correct'] += record.correct_answers
-        
-        # 计算各类型平均分
-        for test_type in test_types:
-            stats = test_types[test_type]
-            if stats['total_questions'] > 0:
-                stats['average_score'] = round(stats['total_correct'] / stats['total_questions'] * 100, 1)
-        
-        return {
-            'total_tests': total_tests,
-            'average_score': round(average_score, 1),
-            'total_questions': total_questions,
-            'total_correct': total_correct,
-            'test_types': test_types
-        }
\ No newline at end of file
+    @staticmethod
+    def get_user_test_stats_windows(user_id, windows=(30, 7)):
+        """一次查询获取用户多个时间窗口的测验统计"""
+        return TestDailyStat.get_window_stats(user_id, windows)
\ No newline at end of file
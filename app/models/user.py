@@ -29,22 +29,22 @@ class User(db.Model):
         }
     
     def get_study_progress(self):
-        """获取学习进度统计"""
-        from app.models.study_record import StudyRecord
+        """获取学习进度统计（一次主键查询读取用户总计与当前单元计数器）"""
+        from app.models.progress_counter import UserProgressCounter
         
-        # 总学习单词数
-        total_studied = StudyRecord.query.filter_by(user_id=self.id).count()
+        total_key = (0, 0)
+        unit_key = (self.grade, self.current_unit or 0)
+        counters = UserProgressCounter.get_counters(self.id, [total_key, unit_key])
+        return User.study_progress_from_counters(counters, unit_key)
         
-        # 已掌握单词数（掌握程度>=4）
-        mastered = StudyRecord.query.filter_by(user_id=self.id).filter(
-            StudyRecord.mastery_level >= 4
-        ).count()
+    @staticmethod
+    def study_progress_from_counters(counters, unit_key):
+        """由 (0, 0) 总计与当前单元计数器组装学习进度统计
         
-        # 当前单元学习进度
-        current_unit_studied = StudyRecord.query.join(StudyRecord.word).filter(
-            StudyRecord.user_id == self.id,
-            StudyRecord.word.has(grade=self.grade, unit=self.current_unit)
-        ).count()
+        未设置当前单元时 unit_key 为 (年级, 0)，即年级总计，此时当前单元学习数为0。
+        """
+        total_studied, mastered, _ = counters[(0, 0)]
+        current_unit_studied = counters[unit_key][0] if unit_key[1] else 0
         
         return {
             'total_studied': total_studied,
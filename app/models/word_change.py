@@ -0,0 +1,90 @@
+from datetime import datetime
+from sqlalchemy import event
+from sqlalchemy.orm import object_session
+from app import db
+from app.models.word import Word
+
+class WordChange(db.Model):
+    """词库变更日志（用于增量同步）
+    
+    每个单词只保留最近一次变更：单词新增或修改时写入 upsert，删除时写入 delete（墓碑）。
+    版本号单调递增且不复用，客户端记录收到的最大版本号，下次只拉取更大版本的变更。
+    变更与单词在同一事务中写入，SQLite 写事务串行执行，版本号按提交顺序分配。
+    """
+    __tablename__ = 'word_changes'
+    
+    OP_UPSERT = 'upsert'
+    OP_DELETE = 'delete'
+    
+    version = db.Column(db.Integer, primary_key=True)
+    word_id = db.Column(db.Integer, nullable=False, unique=True)  # 不设外键，单词删除后保留墓碑
+    op = db.Column(db.String(10), nullable=False)
+    changed_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    
+    # AUTOINCREMENT 保证删除最大版本的行后版本号也不会被重新分配
+    __table_args__ = {'sqlite_autoincrement': True}
+    
+    def __repr__(self):
+        return f'<WordChange v{self.version} word:{self.word_id} {self.op}>'
+    
+    @staticmethod
+    def record(connection, word_id, op):
+        """记录单词变更（在 flush 的同一连接和事务中执行），替换该单词之前的变更"""
+        table = WordChange.__table__
+        connection.execute(table.delete().where(table.c.word_id == word_id))
+        connection.execute(table.insert().values(word_id=word_id, op=op, changed_at=datetime.utcnow()))
+    
+    @staticmethod
+    def get_latest_version():
+        """当前最大版本号，没有变更时为0"""
+        return db.session.query(db.func.max(WordChange.version)).scalar() or 0
+    
+    @staticmethod
+    def get_changes_since(since, limit):
+        """按版本顺序获取某版本之后的变更
+        
+        Returns:
+            list: (WordChange, Word) 列表，单词已删除时 Word 为 None
+        """
+        return db.session.query(WordChange, Word).outerjoin(
+            Word, Word.id == WordChange.word_id
+        ).filter(
+            WordChange.version > since
+        ).order_by(WordChange.version).limit(limit).all()
+    
+    @staticmethod
+    def backfill_from_words():
+        """用现有单词初始化变更日志（每个单词一条 upsert）
+        
+        Returns:
+            int: 写入的变更数
+        """
+        source = db.session.query(
+            Word.id,
+            db.literal(WordChange.OP_UPSERT),
+            db.func.coalesce(Word.updated_at, Word.created_at, db.func.current_timestamp())
+        ).order_by(Word.id)
+        
+        result = db.session.execute(
+            db.insert(WordChange).from_select(['word_id', 'op', 'changed_at'], source)
+        )
+        db.session.commit()
+        return result.rowcount
+
+@event.listens_for(Word, 'after_insert')
+def _record_word_insert(mapper, connection, target):
+    """新增单词时记录变更"""
+    WordChange.record(connection, target.id, WordChange.OP_UPSERT)
+
+@event.listens_for(Word, 'after_update')
+def _record_word_update(mapper, connection, target):
+    """单词字段实际发生变化时记录变更"""
+    session = object_session(target)
+    if session is not None and not session.is_modified(target, include_collections=False):
+        return
+    WordChange.record(connection, target.id, WordChange.OP_UPSERT)
+
+@event.listens_for(Word, 'after_delete')
+def _record_word_delete(mapper, connection, target):
+    """删除单词时写入墓碑"""
+    WordChange.record(connection, target.id, WordChange.OP_DELETE)
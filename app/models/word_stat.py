@@ -0,0 +1,127 @@
+from datetime import datetime
+from app import db
+
+class WordStat(db.Model):
+    """单词难度统计模型（跨用户累计，随测验和学习记录增量更新）"""
+    __tablename__ = 'word_stats'
+    
+    # 难度平滑先验：相当于预先记入1次错误、2次作答，避免作答次数少的单词难度失真
+    PRIOR_ERRORS = 1
+    PRIOR_ATTEMPTS = 2
+    
+    # 学习记录中掌握程度不高于该值时计为一次错误
+    STUDY_ERROR_LEVEL = 2
+    
+    word_id = db.Column(db.Integer, db.ForeignKey('words.id'), primary_key=True)
+    grade = db.Column(db.Integer, nullable=False)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    errors = db.Column(db.Integer, nullable=False, default=0)
+    timed_attempts = db.Column(db.Integer, nullable=False, default=0)  # 有作答时长的次数
+    total_answer_ms = db.Column(db.Integer, nullable=False, default=0)  # 累计作答时长（毫秒）
+    difficulty = db.Column(db.Float, nullable=False, default=0.5)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    word = db.relationship('Word', backref=db.backref('stat', uselist=False, cascade='all, delete-orphan'))
+    
+    # 有序索引：按难度倒序取最难单词时只需扫描索引头部
+    __table_args__ = (
+        db.Index('idx_word_stats_difficulty', 'difficulty'),
+        db.Index('idx_word_stats_grade_difficulty', 'grade', 'difficulty'),
+    )
+    
+    def __repr__(self):
+        return f'<WordStat word:{self.word_id} attempts:{self.attempts} errors:{self.errors}>'
+    
+    def to_dict(self):
+        """转换为字典格式"""
+        return {
+            'word_id': self.word_id,
+            'grade': self.grade,
+            'attempts': self.attempts,
+            'errors': self.errors,
+            'error_rate': round(self.errors / self.attempts * 100, 1) if self.attempts else 0,
+            'average_answer_ms': round(self.total_answer_ms / self.timed_attempts) if self.timed_attempts else None,
+            'difficulty': round(self.difficulty, 4),
+            'updated_at': self.updated_at.isoformat() if self.updated_at and hasattr(self.updated_at, 'isoformat') else str(self.updated_at) if self.updated_at else None
+        }
+    
+    @staticmethod
+    def record_attempts(attempts):
+        """累加单词作答统计（不提交事务，由调用方与业务写入一并提交）
+        
+        Args:
+            attempts (list): (word_id, is_error, answer_ms) 元组列表，answer_ms 可为 None
+        """
+        from app.models.word import Word
+        
+        if not attempts:
+            return
+        
+        # 按单词合并同一批次内的多次作答
+        deltas = {}
+        for word_id, is_error, answer_ms in attempts:
+            delta = deltas.setdefault(word_id, {'attempts': 0, 'errors': 0, 'timed': 0, 'ms': 0})
+            delta['attempts'] += 1
+            if is_error:
+                delta['errors'] += 1
+            if answer_ms is not None and answer_ms >= 0:
+                delta['timed'] += 1
+                delta['ms'] += int(answer_ms)
+        
+        word_ids = list(deltas.keys())
+        grades = dict(db.session.query(Word.id, Word.grade).filter(Word.id.in_(word_ids)).all())
+        stats = {s.word_id: s for s in WordStat.query.filter(WordStat.word_id.in_(word_ids)).all()}
+        
+        for word_id, delta in deltas.items():
+            if word_id not in grades:
+                continue
+            
+            stat = stats.get(word_id)
+            if stat is None:
+                stat = WordStat(
+                    word_id=word_id,
+                    grade=grades[word_id],
+                    attempts=delta['attempts'],
+                    errors=delta['errors'],
+                    timed_attempts=delta['timed'],
+                    total_answer_ms=delta['ms'],
+                    difficulty=WordStat.compute_difficulty(delta['attempts'], delta['errors'])
+                )
+                db.session.add(stat)
+                continue
+            
+            # 使用SQL表达式自增，避免并发写入时丢失更新
+            stat.grade = grades[word_id]
+            stat.attempts = WordStat.attempts + delta['attempts']
+            stat.errors = WordStat.errors + delta['errors']
+            stat.timed_attempts = WordStat.timed_attempts + delta['timed']
+            stat.total_answer_ms = WordStat.total_answer_ms + delta['ms']
+            stat.difficulty = (WordStat.errors + delta['errors'] + WordStat.PRIOR_ERRORS) * 1.0 / \
+                (WordStat.attempts + delta['attempts'] + WordStat.PRIOR_ATTEMPTS)
+    
+    @staticmethod
+    def compute_difficulty(attempts, errors):
+        """计算平滑后的难度（0-1，越大越难）"""
+        return (errors + WordStat.PRIOR_ERRORS) / (attempts + WordStat.PRIOR_ATTEMPTS)
+    
+    @staticmethod
+    def get_hardest_words(grade=None, limit=20):
+        """按难度倒序获取最难的单词"""
+        from sqlalchemy.orm import joinedload
+        
+        query = WordStat.query.options(joinedload(WordStat.word))
+        if grade:
+            query = query.filter(WordStat.grade == grade)
+        
+        return query.order_by(WordStat.difficulty.desc()).limit(limit).all()
+    
+    @staticmethod
+    def get_difficulty_map(word_ids):
+        """批量获取单词难度，没有统计的单词不在结果中"""
+        if not word_ids:
+            return {}
+        
+        rows = db.session.query(WordStat.word_id, WordStat.difficulty).filter(
+            WordStat.word_id.in_(word_ids)
+        ).all()
+        return dict(rows)
@@ -4,6 +4,7 @@
 from flask import Blueprint, jsonify, request
 from app.utils.error_handler import ErrorHandler
 from app.services.cache_service import CacheService, WordCacheService, UserCacheService, AudioCacheService
+from app.services.dashboard_service import DashboardService
 import logging
 
 logger = logging.getLogger(__name__)
@@ -21,6 +22,7 @@ def get_cache_stats():
         'success': True,
         'data': {
             'cache_stats': stats,
+            'dashboard_stats': DashboardService.get_stats(),
             'keys': cache.keys()
         }
     })
@@ -1,36 +1,32 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
-from flask import request, jsonify, send_file, make_response
+from flask import request, jsonify, send_file, make_response, Response, stream_with_context
 from app.routes.api import api
 from app.services.export_service import ExportService
+from app.services.pdf_cache import PdfCacheService
+from app.services.class_report import ClassReportService
 from app.services.word_service import WordService
 from app.services.user_service import UserService
+from app.services.cache_service import WordCacheService
 from app.utils.error_handler import ErrorHandler, ValidationError, NotFoundError
 from app.utils.param_helpers import safe_get_int_param
 from datetime import datetime
 import io
-import csv
+import unicodedata
+from urllib.parse import quote
 
 @api.route('/export/words/csv', methods=['GET'])
 @ErrorHandler.handle_api_error
 def export_words_csv():
-    """导出单词为CSV格式"""
+    """导出单词为CSV格式（流式输出）"""
     grade = safe_get_int_param(request.args, 'grade')
     unit = safe_get_int_param(request.args, 'unit')
     
-    # 获取单词列表
-    words = WordService.get_words_by_criteria(grade, unit)
-    
-    if not words:
+    # 检查是否有符合条件的单词（词库缓存中的单元单词数）
+    if WordCacheService.count_words(grade, unit) == 0:
         raise NotFoundError('没有找到符合条件的单词')
     
-    # 导出CSV
-    csv_content, error = ExportService.export_words_to_csv(words)
-    
-    if error:
-        raise Exception(error)
-    
     # 创建文件名
     filename_parts = ['words']
     if grade:
@@ -40,46 +36,38 @@ def export_words_csv():
     filename_parts.append(datetime.now().strftime('%Y%m%d'))
     filename = '_'.join(filename_parts) + '.csv'
     
-    # 创建响应
-    output = io.StringIO(csv_content)
-    mem = io.BytesIO()
-    mem.write(csv_content.encode('utf-8-sig'))  # 添加BOM以支持Excel
-    mem.seek(0)
-    
-    return send_file(
-        mem,
-        mimetype='text/csv',
-        as_attachment=True,
-        download_name=filename
+    return _stream_csv(
+        ExportService.iter_word_rows(grade, unit),
+        ExportService.WORD_CSV_HEADERS,
+        filename
     )
 
 @api.route('/export/words/pdf', methods=['GET'])
 @ErrorHandler.handle_api_error
 def export_words_pdf():
-    """导出单词为PDF格式"""
+    """导出单词为PDF格式（按词库版本缓存，支持条件请求）"""
     grade = safe_get_int_param(request.args, 'grade')
     unit = safe_get_int_param(request.args, 'unit')
     
-    # 获取单词列表
-    words = WordService.get_words_by_criteria(grade, unit)
-    
-    if not words:
+    # 检查是否有符合条件的单词（词库缓存中的单元单词数）
+    if WordCacheService.count_words(grade, unit) == 0:
         raise NotFoundError('没有找到符合条件的单词')
     
-    # 创建标题
-    title_parts = ['单词列表']
-    if grade:
-        title_parts.append(f'{grade}年级')
-    if unit:
-        title_parts.append(f'第{unit}单元')
-    title = ' - '.join(title_parts)
-    
-    # 导出PDF
-    pdf_content, error = ExportService.export_words_to_pdf(words, title)
+    cached, error = PdfCacheService.get_word_list_pdf(grade, unit)
     
     if error:
         raise Exception(error)
     
+    if not cached:
+        # 渲染仍在进行，稍后重试即可取到缓存结果
+        response = jsonify({
+            'success': False,
+            'error': 'PDF正在生成，请稍后重试'
+        })
+        response.status_code = 202
+        response.headers['Retry-After'] = '5'
+        return response
+    
     # 创建文件名
     filename_parts = ['words']
     if grade:
@@ -89,14 +77,14 @@ def export_words_pdf():
     filename_parts.append(datetime.now().strftime('%Y%m%d'))
     filename = '_'.join(filename_parts) + '.pdf'
     
-    # 创建响应
-    mem = io.BytesIO(pdf_content)
-    
     return send_file(
-        mem,
+        cached['path'],
         mimetype='application/pdf',
         as_attachment=True,
-        download_name=filename
+        download_name=filename,
+        conditional=True,
+        etag=cached['etag'],
+        max_age=0
     )
 
 @api.route('/export/words/json', methods=['GET'])
@@ -138,6 +126,33 @@ def export_words_json():
     
     return response
 
+@api.route('/export/words/ndjson', methods=['GET'])
+@ErrorHandler.handle_api_error
+def export_words_ndjson():
+    """导出单词为NDJSON格式（每行一个单词，流式输出，gzip=true时边导出边压缩）"""
+    grade = safe_get_int_param(request.args, 'grade')
+    unit = safe_get_int_param(request.args, 'unit')
+    compress = request.args.get('gzip', 'false').lower() == 'true'
+    
+    # 检查是否有符合条件的单词（词库缓存中的单元单词数）
+    if WordCacheService.count_words(grade, unit) == 0:
+        raise NotFoundError('没有找到符合条件的单词')
+    
+    # 创建文件名
+    filename_parts = ['words']
+    if grade:
+        filename_parts.append(f'grade{grade}')
+    if unit:
+        filename_parts.append(f'unit{unit}')
+    filename_parts.append(datetime.now().strftime('%Y%m%d'))
+    filename = '_'.join(filename_parts) + ('.ndjson.gz' if compress else '.ndjson')
+    
+    return _stream_download(
+        ExportService.iter_ndjson(ExportService.iter_word_records(grade, unit), compress),
+        'application/gzip' if compress else 'application/x-ndjson',
+        filename
+    )
+
 @api.route('/export/study-report/<int:user_id>/pdf', methods=['GET'])
 @ErrorHandler.handle_api_error
 def export_study_report_pdf(user_id):
@@ -173,56 +188,119 @@ def export_study_report_pdf(user_id):
         download_name=filename
     )
 
+@api.route('/export/class-report', methods=['POST'])
+@ErrorHandler.handle_api_error
+def start_class_report():
+    """创建班级学习报告导出任务（按年级或用户列表，后台并行渲染）"""
+    data = request.get_json() or {}
+    
+    grade = data.get('grade')
+    user_ids = data.get('user_ids')
+    
+    if user_ids is not None:
+        if not isinstance(user_ids, list) or not all(isinstance(user_id, int) for user_id in user_ids):
+            raise ValidationError('user_ids必须是用户ID列表')
+    elif grade is None or not isinstance(grade, int):
+        raise ValidationError('请提供年级或用户列表')
+    
+    job, error = ClassReportService.start_job(grade=grade, user_ids=user_ids)
+    if error:
+        raise NotFoundError(error)
+    
+    response = jsonify({
+        'success': True,
+        'data': job
+    })
+    response.status_code = 202
+    return response
+
+@api.route('/export/class-report/<job_id>', methods=['GET'])
+@ErrorHandler.handle_api_error
+def get_class_report_progress(job_id):
+    """查询班级报告导出任务进度"""
+    job = ClassReportService.get_job(job_id)
+    if not job:
+        raise NotFoundError('导出任务不存在')
+    
+    return jsonify({
+        'success': True,
+        'data': job
+    })
+
+@api.route('/export/class-report/<job_id>/download', methods=['GET'])
+@ErrorHandler.handle_api_error
+def download_class_report(job_id):
+    """下载已完成的班级报告zip"""
+    if not ClassReportService.get_job(job_id):
+        raise NotFoundError('导出任务不存在')
+    
+    report, error = ClassReportService.get_job_file(job_id)
+    if error:
+        raise ValidationError(error)
+    
+    return send_file(
+        report['path'],
+        mimetype='application/zip',
+        as_attachment=True,
+        download_name=report['filename']
+    )
+
 @api.route('/export/study-report/<int:user_id>/csv', methods=['GET'])
 @ErrorHandler.handle_api_error
 def export_study_report_csv(user_id):
-    """导出用户学习报告为CSV格式"""
+    """导出用户学习报告为CSV格式（流式输出）"""
     # 获取用户信息
     user = UserService.get_user_by_id(user_id)
     if not user:
         raise NotFoundError('用户不存在')
     
-    # 获取学习记录
-    study_records = user.study_records.order_by('studied_at').all()
-    
-    # 创建CSV内容
-    output = io.StringIO()
-    writer = csv.writer(output, quoting=csv.QUOTE_ALL)
-    
-    # 写入表头
-    headers = ['学习时间', '单词', '中文含义', '年级', '单元', '掌握程度']
-    writer.writerow(headers)
-    
-    # 写入数据
-    for record in study_records:
-        row = [
-            record.studied_at.strftime('%Y-%m-%d %H:%M:%S'),
-            record.word.word,
-            record.word.chinese_meaning,
-            record.word.grade,
-            record.word.unit,
-            record.mastery_level
-        ]
-        writer.writerow(row)
-    
-    csv_content = output.getvalue()
-    output.close()
-    
     # 创建文件名
     filename = f'study_records_{user.username}_{datetime.now().strftime("%Y%m%d")}.csv'
     
-    # 创建响应
-    mem = io.BytesIO()
-    mem.write(csv_content.encode('utf-8-sig'))
-    mem.seek(0)
+    return _stream_csv(
+        ExportService.iter_study_record_rows(user_id),
+        ExportService.STUDY_RECORD_CSV_HEADERS,
+        filename
+    )
     
-    return send_file(
-        mem,
-        mimetype='text/csv',
-        as_attachment=True,
-        download_name=filename
+@api.route('/export/study-records/csv', methods=['GET'])
+@ErrorHandler.handle_api_error
+def export_school_study_records_csv():
+    """导出全校学习记录为CSV格式（流式输出，可按用户年级筛选）"""
+    grade = safe_get_int_param(request.args, 'grade')
+    
+    # 创建文件名
+    filename_parts = ['study_records_all']
+    if grade:
+        filename_parts.append(f'grade{grade}')
+    filename_parts.append(datetime.now().strftime('%Y%m%d'))
+    filename = '_'.join(filename_parts) + '.csv'
+    
+    return _stream_csv(
+        ExportService.iter_study_record_rows(grade=grade),
+        ExportService.SCHOOL_STUDY_RECORD_CSV_HEADERS,
+        filename
     )
 
+def _stream_csv(rows, headers, filename):
+    """以生成器响应流式输出CSV，边查询边编码，不在内存中拼接整个文件"""
+    return _stream_download(ExportService.iter_csv(rows, headers), 'text/csv', filename)
+
+def _stream_download(chunks, mimetype, filename):
+    """以生成器响应流式输出附件"""
+    response = Response(stream_with_context(chunks), mimetype=mimetype)
+    
+    # 与 send_file 相同的文件名编码方式，兼容中文用户名
+    try:
+        filename.encode('ascii')
+        response.headers.set('Content-Disposition', 'attachment', filename=filename)
+    except UnicodeEncodeError:
+        simple = unicodedata.normalize('NFKD', filename).encode('ascii', 'ignore').decode('ascii')
+        response.headers.set('Content-Disposition', 'attachment', filename=simple,
+                             **{'filename*': f"UTF-8''{quote(filename, safe='')}"})
+    
+    return response
+
 @api.route('/export/formats', methods=['GET'])
 @ErrorHandler.handle_api_error
 def get_export_formats():
@@ -231,6 +309,7 @@ def get_export_formats():
         'words': [
             {'format': 'csv', 'name': 'CSV格式', 'description': '逗号分隔值，兼容Excel'},
             {'format': 'json', 'name': 'JSON格式', 'description': '结构化数据格式'},
+            {'format': 'ndjson', 'name': 'NDJSON格式', 'description': '每行一个单词，可gzip压缩，适合环境间迁移'},
         ],
         'reports': [
             {'format': 'csv', 'name': 'CSV格式', 'description': '学习记录数据'}
@@ -85,6 +85,46 @@ def record_progress():
             'error': str(e)
         }), 500
 
+@api.route('/study/progress/batch', methods=['POST'])
+def record_progress_batch():
+    """批量记录学习进度"""
+    try:
+        data = request.get_json()
+        
+        if not data:
+            return jsonify({
+                'success': False,
+                'error': '请提供学习进度数据'
+            }), 400
+        
+        user_id = data.get('user_id')
+        items = data.get('items')
+        
+        if not user_id or not items:
+            return jsonify({
+                'success': False,
+                'error': '用户ID和学习进度列表是必需的'
+            }), 400
+        
+        result, error = StudyService.record_study_progress_batch(user_id, items)
+        
+        if error:
+            return jsonify({
+                'success': False,
+                'error': error
+            }), 400
+        
+        return jsonify({
+            'success': True,
+            'data': result
+        })
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
 @api.route('/study/progress/<int:user_id>', methods=['GET'])
 def get_study_progress(user_id):
     """获取学习进度"""
@@ -137,6 +177,34 @@ def get_recommended_words(user_id):
             'error': str(e)
         }), 500
 
+@api.route('/study/due/<int:user_id>', methods=['GET'])
+def get_due_words(user_id):
+    """获取到期待复习的单词"""
+    try:
+        count = safe_get_int_param(request.args, 'count', 10)
+        if count is None or count <= 0:
+            count = 10
+        count = min(count, 100)
+        
+        due_data, error = StudyService.get_due_words(user_id, count)
+        
+        if error:
+            return jsonify({
+                'success': False,
+                'error': error
+            }), 400
+        
+        return jsonify({
+            'success': True,
+            'data': due_data
+        })
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
 @api.route('/study/statistics/<int:user_id>', methods=['GET'])
 def get_study_statistics(user_id):
     """获取学习统计"""
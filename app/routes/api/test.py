@@ -21,6 +21,7 @@ def generate_test():
         grade = safe_int(data.get('grade'))
         unit = safe_int(data.get('unit'))
         question_count = safe_int(data.get('question_count'), 10)
+        weight_by_difficulty = bool(data.get('weight_by_difficulty', False))
         
         if not user_id or not test_type:
             return jsonify({
@@ -29,7 +30,7 @@ def generate_test():
             }), 400
         
         test_data, error = TestService.generate_test(
-            user_id, test_type, grade, unit, question_count
+            user_id, test_type, grade, unit, question_count, weight_by_difficulty
         )
         
         if error:
@@ -2,6 +2,8 @@ from flask import request, jsonify
 from app.routes.api import api
 from app.models.user import User
 from app.services.user_service import UserService
+from app.services.dashboard_service import DashboardService
+from app.services.cache_service import UserCacheService
 from app.utils.error_handler import ErrorHandler, ValidationError, NotFoundError
 from app import db
 
@@ -128,6 +130,7 @@ def update_user(user_id):
             user.current_unit = current_unit
         
         db.session.commit()
+        UserCacheService.clear_user_cache(user_id)
         
         return jsonify({
             'success': True,
@@ -154,6 +157,7 @@ def delete_user(user_id):
         
         db.session.delete(user)
         db.session.commit()
+        UserCacheService.clear_user_cache(user_id)
         
         return jsonify({
             'success': True,
@@ -168,33 +172,16 @@ def delete_user(user_id):
 
 @api.route('/users/<int:user_id>/dashboard', methods=['GET'])
 def get_user_dashboard(user_id):
-    """获取用户仪表板数据"""
+    """获取用户仪表板数据（按用户缓存的汇总文档）"""
     try:
-        user = User.query.get(user_id)
+        dashboard_data, error = DashboardService.get_dashboard(user_id)
         
-        if not user:
+        if error:
             return jsonify({
                 'success': False,
-                'error': '用户不存在'
+                'error': error
             }), 404
         
-        # 获取学习进度
-        study_progress = user.get_study_progress()
-        
-        # 获取最近测验记录
-        recent_tests = user.get_recent_tests(10)
-        
-        # 获取测验统计
-        from app.models.test_record import TestRecord
-        test_stats = TestRecord.get_user_test_stats(user_id, days=30)
-        
-        dashboard_data = {
-            'user': user.to_dict(),
-            'study_progress': study_progress,
-            'recent_tests': [test.to_dict() for test in recent_tests],
-            'test_statistics': test_stats
-        }
-        
         return jsonify({
             'success': True,
             'data': dashboard_data
@@ -48,6 +48,23 @@ def get_word(word_id):
         'data': word.to_dict()
     })
 
+@api.route('/words/changes', methods=['GET'])
+@ErrorHandler.handle_api_error
+def get_word_changes():
+    """获取某版本之后的词库变更（新增、修改与删除墓碑），用于客户端增量同步"""
+    since = safe_get_int_param(request.args, 'since', 0)
+    limit = safe_get_int_param(request.args, 'limit', 500)
+    
+    if since < 0:
+        raise ValidationError('since不能为负数')
+    if not 1 <= limit <= 2000:
+        raise ValidationError('limit必须在1-2000之间')
+    
+    return jsonify({
+        'success': True,
+        'data': WordService.get_changes(since, limit)
+    })
+
 @api.route('/words/random', methods=['GET'])
 def get_random_words():
     """获取随机单词"""
@@ -83,6 +100,27 @@ def get_word_statistics():
         'data': stats
     })
 
+@api.route('/words/hardest', methods=['GET'])
+@ErrorHandler.handle_api_error
+def get_hardest_words():
+    """获取难度最高的单词"""
+    grade = safe_get_int_param(request.args, 'grade')
+    limit = safe_get_int_param(request.args, 'limit', 20)
+    
+    if grade is not None:
+        Validator.validate_grade(grade)
+    if limit is None or limit <= 0:
+        limit = 20
+    limit = min(limit, 100)
+    
+    words = WordService.get_hardest_words(grade, limit)
+    
+    return jsonify({
+        'success': True,
+        'data': words,
+        'count': len(words)
+    })
+
 @api.route('/words/grades', methods=['GET'])
 @ErrorHandler.handle_api_error
 def get_grades():
@@ -177,6 +215,110 @@ def validate_audio_files():
             'error': str(e)
         }), 500
 
+@api.route('/words/audio/reconcile', methods=['GET', 'POST'])
+@ErrorHandler.handle_api_error
+def reconcile_audio_files():
+    """对比音频目录与数据库：报告缺失、孤立和重复的音频文件；POST 时可按选项修复"""
+    from app.services.audio_store import AudioStore
+    from app.services.cache_service import WordCacheService
+    
+    options = (request.get_json(silent=True) or {}) if request.method == 'POST' else {}
+    regenerate_missing = bool(options.get('regenerate_missing', False))
+    
+    report = AudioStore.reconcile(
+        regenerate_missing=regenerate_missing,
+        delete_orphans=bool(options.get('delete_orphans', False))
+    )
+    
+    if regenerate_missing and report['queued_word_ids']:
+        WordCacheService.clear_word_cache()
+    
+    return jsonify({
+        'success': True,
+        'data': report
+    })
+
+@api.route('/words/audio/bundle', methods=['GET'])
+@ErrorHandler.handle_api_error
+def get_unit_audio_bundle():
+    """获取单元音频合集的偏移索引，播放器按偏移定位播放单词
+    
+    合集尚未生成或已过期时在后台生成并返回 202（data 为 null，播放器改为逐个播放单词音频）。
+    """
+    from app.services.audio_bundle import AudioBundleService
+    
+    grade = safe_get_int_param(request.args, 'grade')
+    unit = safe_get_int_param(request.args, 'unit')
+    if grade is None or unit is None:
+        raise ValidationError("请指定年级和单元")
+    
+    index, status, error = AudioBundleService.request_unit_bundle(grade, unit)
+    if error:
+        raise NotFoundError(error)
+    
+    if status == 'building':
+        return jsonify({
+            'success': True,
+            'data': None,
+            'status': status,
+            'message': '单元音频合集正在生成'
+        }), 202
+    
+    return jsonify({
+        'success': True,
+        'data': index,
+        'status': status
+    })
+
+@api.route('/words/audio/postprocess', methods=['POST'])
+@ErrorHandler.handle_api_error
+def postprocess_audio():
+    """对年级或单元的音频去静音、归一化响度并转码，返回各单元节省的字节数"""
+    from app.services.audio_postprocess import AudioPostprocessService
+    
+    data = request.get_json(silent=True) or {}
+    grade = data.get('grade')
+    unit = data.get('unit')
+    if grade is not None:
+        Validator.validate_grade(grade)
+    if unit is not None:
+        Validator.validate_unit(unit)
+    
+    report, error = AudioPostprocessService.process_units(
+        grade=grade,
+        unit=unit,
+        force=bool(data.get('force', False))
+    )
+    if error:
+        raise ValidationError(error)
+    
+    return jsonify({
+        'success': True,
+        'data': report
+    })
+
+@api.route('/words/audio/variants', methods=['GET'])
+@ErrorHandler.handle_api_error
+def get_unit_audio_variants():
+    """获取单元内单词音频的转码版本：{单词ID: {格式: 音频URL}}"""
+    from app.services.audio_postprocess import AudioPostprocessService, FORMATS
+    
+    grade = safe_get_int_param(request.args, 'grade')
+    unit = safe_get_int_param(request.args, 'unit')
+    if grade is None or unit is None:
+        raise ValidationError("请指定年级和单元")
+    
+    return jsonify({
+        'success': True,
+        'data': {
+            'mimetypes': {
+                name: FORMATS[name]['mimetype']
+                for name in AudioPostprocessService.configured_formats() if name in FORMATS
+            },
+            'words': AudioPostprocessService.get_unit_variants(grade, unit)
+        }
+    })
+
 @api.route('/words/without-audio', methods=['GET'])
 def get_words_without_audio():
     """获取没有音频的单词"""
@@ -306,6 +448,19 @@ def import_words():
             'error': str(e)
         }), 500
 
+@api.route('/words/import/ndjson', methods=['POST'])
+@ErrorHandler.handle_api_error
+def import_words_ndjson():
+    """导入NDJSON格式的单词（上传文件或直接作为请求体，支持gzip压缩，逐行读取）"""
+    upload = request.files.get('file')
+    stream = upload.stream if upload else request.stream
+    
+    result = DataImportService.import_from_ndjson(stream)
+    if not result['success']:
+        raise ValidationError(result['error'])
+    
+    return jsonify(result)
+
 @api.route('/words/export', methods=['GET'])
 def export_words():
     """导出单词数据"""
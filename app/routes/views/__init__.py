@@ -4,4 +4,4 @@ from flask import Blueprint
 main = Blueprint('main', __name__)
 
 # 导入所有视图路由
-from . import index, study, test, admin, word_admin
\ No newline at end of file
+from . import index, study, test, admin, word_admin, audio
\ No newline at end of file
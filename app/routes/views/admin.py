@@ -1,13 +1,18 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
-from flask import render_template, request, jsonify, send_file
+from flask import render_template, request, jsonify, send_file, current_app
 from app.routes.views import main
 from app.utils.error_handler import ErrorHandler
 from app.utils.param_helpers import safe_get_int_param
+from app.utils.log_reader import tail_log
+from app.utils.log_index import LogIndex
+from datetime import datetime
 import os
 import logging
 
+MAX_LOG_LINES = 5000
+
 @main.route('/admin/logs')
 def admin_logs():
     """管理员日志查看页面"""
@@ -15,11 +20,17 @@ def admin_logs():
 
 @main.route('/admin/logs/api')
 def get_logs():
-    """获取日志数据API"""
+    """获取日志数据API
+    
+    从日志末尾倒序读取最近的N条（可按级别筛选，当前文件不够时继续读取轮转文件）；
+    传入上次返回的 cursor 作为 since 参数时只返回之后新写入的日志，用于自动刷新。
+    """
     try:
-        log_file = 'app.log'
-        lines = safe_get_int_param(request.args, 'lines', 100)
+        log_file = current_app.config['LOG_FILE']
+        lines = min(max(safe_get_int_param(request.args, 'lines', 100), 1), MAX_LOG_LINES)
         level = request.args.get('level', 'all')
+        since = request.args.get('since')
+        include_rotated = request.args.get('rotated', 'true').lower() != 'false'
         
         if not os.path.exists(log_file):
             return jsonify({
@@ -28,28 +39,14 @@ def get_logs():
                 'message': '日志文件不存在'
             })
         
-        logs = []
-        with open(log_file, 'r', encoding='utf-8') as f:
-            all_lines = f.readlines()
-            # 获取最后N行
-            recent_lines = all_lines[-lines:] if len(all_lines) > lines else all_lines
-            
-            for line in recent_lines:
-                line = line.strip()
-                if not line:
-                    continue
-                
-                # 解析日志级别
-                if level != 'all':
-                    if level.upper() not in line:
-                        continue
-                
-                logs.append(line)
+        result = tail_log(log_file, limit=lines, level=level, since=since, include_rotated=include_rotated)
         
         return jsonify({
             'success': True,
-            'data': logs,
-            'count': len(logs)
+            'data': result['entries'],
+            'count': len(result['entries']),
+            'cursor': result['cursor'],
+            'truncated': result['truncated']
         })
         
     except Exception as e:
@@ -58,11 +55,68 @@ def get_logs():
             'error': str(e)
         }), 500
 
+def _parse_log_time(value):
+    """解析页面传入的时间（datetime-local 或 ISO 格式，按服务器本地时间），为空时返回None"""
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except ValueError:
+        raise ValueError(f"时间格式不正确: {value}")
+
+@main.route('/admin/logs/search')
+def search_logs():
+    """按级别、时间范围和 request_id 查询日志（含轮转文件）
+    
+    查询前增量更新日志索引，只读取索引中命中的时间桶字节范围和 request_id 偏移。
+    """
+    try:
+        log_file = current_app.config['LOG_FILE']
+        limit = min(max(safe_get_int_param(request.args, 'limit', 500), 1), MAX_LOG_LINES)
+        start = _parse_log_time(request.args.get('start'))
+        end = _parse_log_time(request.args.get('end'))
+        request_id = request.args.get('request_id', '').strip() or None
+        
+        if start is not None and end is not None and start >= end:
+            return jsonify({
+                'success': False,
+                'error': '结束时间必须晚于开始时间'
+            }), 400
+        
+        index = LogIndex(
+            log_file,
+            index_file=current_app.config.get('LOG_INDEX_FILE'),
+            bucket_seconds=current_app.config.get('LOG_INDEX_BUCKET_SECONDS', 60)
+        )
+        result = index.search(
+            level=request.args.get('level', 'all'), start=start, end=end, request_id=request_id, limit=limit
+        )
+        
+        return jsonify({
+            'success': True,
+            'data': [entry['text'] for entry in result['entries']],
+            'count': len(result['entries']),
+            'truncated': result['truncated'],
+            'scanned_bytes': result['scanned_bytes'],
+            'elapsed_ms': result['elapsed_ms']
+        })
+    
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
 @main.route('/admin/logs/download')
 def download_logs():
     """下载日志文件"""
     try:
-        log_file = 'app.log'
+        log_file = current_app.config['LOG_FILE']
         
         if not os.path.exists(log_file):
             return jsonify({
@@ -70,7 +124,7 @@ def download_logs():
                 'error': '日志文件不存在'
             }), 404
         
-        return send_file(log_file, as_attachment=True, download_name='app.log')
+        return send_file(log_file, as_attachment=True, download_name=os.path.basename(log_file))
         
     except Exception as e:
         return jsonify({
@@ -82,7 +136,7 @@ def download_logs():
 def clear_logs():
     """清空日志文件"""
     try:
-        log_file = 'app.log'
+        log_file = current_app.config['LOG_FILE']
         
         if os.path.exists(log_file):
             with open(log_file, 'w', encoding='utf-8') as f:
@@ -111,13 +165,14 @@ def system_info():
     from app.models.user import User
     
     try:
+        log_file = current_app.config['LOG_FILE']
         system_info = {
             'python_version': sys.version,
             'platform': platform.platform(),
             'start_time': datetime.now().isoformat(),
             'word_count': Word.query.count(),
             'user_count': User.query.count(),
-            'log_file_size': os.path.getsize('app.log') if os.path.exists('app.log') else 0
+            'log_file_size': os.path.getsize(log_file) if os.path.exists(log_file) else 0
         }
         
         return render_template('admin/system_info.html', system_info=system_info)
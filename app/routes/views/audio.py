@@ -0,0 +1,51 @@
+import os
+import mimetypes
+from flask import current_app, send_file, abort, make_response
+from werkzeug.security import safe_join
+from app.routes.views import main
+from app.services.audio_store import AudioStore
+
+@main.route('/static/audio/<path:filename>')
+def serve_audio(filename):
+    """提供音频文件（覆盖默认静态目录，从 AUDIO_FOLDER 读取）
+    
+    支持 Range 请求（播放器拖动和单元合集定位）以及 ETag / Last-Modified 条件请求；
+    文件名含内容摘要的音频按不可变资源长期缓存，重复播放不再请求服务器。
+    """
+    audio_folder = current_app.config['AUDIO_FOLDER']
+    file_path = safe_join(audio_folder, filename)
+    if file_path is None or not os.path.isfile(file_path):
+        abort(404)
+    
+    immutable = AudioStore.is_immutable_path(filename)
+    max_age = current_app.config.get('AUDIO_CACHE_MAX_AGE', 31536000) if immutable else 0
+    mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    
+    sendfile = current_app.config.get('AUDIO_SENDFILE')
+    if sendfile in ('x-sendfile', 'x-accel-redirect'):
+        # 由反向代理读取并发送文件（代理负责 Range 和条件请求），应用只返回响应头
+        response = make_response('')
+        response.mimetype = mimetype
+        if sendfile == 'x-sendfile':
+            response.headers['X-Sendfile'] = os.path.abspath(file_path)
+        else:
+            prefix = current_app.config.get('AUDIO_ACCEL_REDIRECT_PREFIX', '/internal-audio/')
+            response.headers['X-Accel-Redirect'] = prefix.rstrip('/') + '/' + filename
+        response.cache_control.max_age = max_age
+    else:
+        # 不可变文件用文件名中的内容摘要作为 ETag，其余文件按修改时间和大小生成
+        etag = os.path.basename(filename).split('.', 1)[0] if immutable else True
+        response = send_file(
+            file_path,
+            mimetype=mimetype,
+            conditional=True,
+            etag=etag,
+            max_age=max_age
+        )
+    
+    response.cache_control.public = True
+    if immutable:
+        response.cache_control.immutable = True
+    else:
+        response.cache_control.no_cache = True
+    return response
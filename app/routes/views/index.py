@@ -1,4 +1,4 @@
-from flask import render_template, request, redirect, url_for, flash
+from flask import render_template, request, redirect, url_for, flash, abort
 from app.routes.views import main
 from app.models.user import User
 from app.services.word_service import WordService
@@ -66,23 +66,16 @@ def create_user():
 @main.route('/dashboard/<int:user_id>')
 def dashboard(user_id):
     """用户仪表板"""
-    user = User.query.get_or_404(user_id)
+    from app.services.dashboard_service import DashboardService
     
-    # 获取学习进度
-    study_progress = user.get_study_progress()
-    
-    # 获取最近测验记录
-    recent_tests = user.get_recent_tests(5)
-    
-    # 获取测验统计
-    from app.models.test_record import TestRecord
-    test_stats = TestRecord.get_user_test_stats(user_id, days=30)
+    # 仪表板汇总随页面一同下发，页面无需再请求接口
+    dashboard_data, error = DashboardService.get_dashboard(user_id)
+    if error:
+        abort(404)
     
     return render_template('dashboard.html',
-                         user=user,
-                         study_progress=study_progress,
-                         recent_tests=recent_tests,
-                         test_stats=test_stats)
+                         user=dashboard_data['user'],
+                         dashboard=dashboard_data)
 
 @main.route('/maintenance')
 def maintenance():
@@ -98,8 +98,9 @@ def study_review(user_id):
     
     # 获取需要复习的单词（掌握程度<4的单词）
     from app.models.study_record import StudyRecord
+    from sqlalchemy.orm import joinedload
     
-    unmastered_records = StudyRecord.query.filter(
+    unmastered_records = StudyRecord.query.options(joinedload(StudyRecord.word)).filter(
         StudyRecord.user_id == user_id,
         StudyRecord.mastery_level < 4
     ).order_by(StudyRecord.studied_at.asc()).limit(20).all()
@@ -0,0 +1,335 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import json
+import time
+import hashlib
+import threading
+from datetime import datetime
+from flask import current_app
+from app import db
+from app.models.word import Word
+from app.services.audio_store import AudioStore
+import logging
+
+logger = logging.getLogger(__name__)
+
+class AudioBundleService:
+    """单元音频合集（音频精灵）
+    
+    把一个单元所有单词的音频按单词ID顺序拼接成一个压缩文件，并生成 单词ID -> [起始毫秒, 时长毫秒] 的偏移索引，
+    播放器只需请求一次合集文件，按偏移定位播放各个单词。
+    合集文件名包含单元音频内容的摘要（单词ID和音频URL，音频URL按内容寻址），
+    单元内任何单词增删或音频变化都会得到新的摘要，重新生成后旧合集随之删除。
+    
+    合集由 flask build-audio-bundles 批量生成；页面请求时只读取已生成的合集，
+    不存在时在后台线程中生成，请求不等待解码和编码。生成失败的摘要在一段时间内不再重试。
+    """
+    
+    # 合集格式变化时递增，使已有合集失效
+    BUNDLE_VERSION = 1
+    
+    _build_locks = {}
+    _locks_guard = threading.Lock()
+    _failures = {}  # {(年级, 单元): (摘要, 失败时间, 错误信息)}
+    
+    @staticmethod
+    def request_unit_bundle(grade, unit):
+        """页面请求单元音频合集：已生成时返回索引，否则在后台生成，不阻塞请求
+        
+        同一单元正在生成时不重复启动；同一摘要最近生成失败（缺少 ffmpeg、音频无法解码等）时
+        在 AUDIO_BUNDLE_RETRY_SECONDS 内直接返回失败原因。
+        
+        Returns:
+            tuple: (索引字典, 状态, 错误信息)，状态为 'ready'、'building' 或 'failed'
+        """
+        sources = AudioBundleService._unit_sources(grade, unit)
+        if not sources:
+            return None, 'failed', "该单元没有可用的音频"
+        
+        settings = AudioBundleService._settings()
+        key = AudioBundleService.bundle_key(sources, settings)
+        index = AudioBundleService._load_index(grade, unit, key)
+        if index is not None:
+            return index, 'ready', None
+        
+        retry_seconds = current_app.config.get('AUDIO_BUNDLE_RETRY_SECONDS', 600)
+        error = AudioBundleService._recent_failure(grade, unit, key, retry_seconds)
+        if error:
+            return None, 'failed', error
+        
+        lock = AudioBundleService._unit_lock(grade, unit)
+        if lock.locked():
+            return None, 'building', None
+        
+        app = current_app._get_current_object()
+        
+        def build():
+            # 并发请求可能各启动一个线程，取得锁后再检查一次，只生成一次
+            with app.app_context(), lock:
+                if AudioBundleService._load_index(grade, unit, key) is None \
+                        and not AudioBundleService._recent_failure(grade, unit, key, retry_seconds):
+                    AudioBundleService._build(grade, unit, sources, key, settings)
+        
+        threading.Thread(target=build, name=f'audio-bundle-g{grade}-u{unit}', daemon=True).start()
+        return None, 'building', None
+    
+    @staticmethod
+    def _recent_failure(grade, unit, key, retry_seconds):
+        """同一摘要在重试间隔内的生成失败原因，没有时返回None"""
+        failure = AudioBundleService._failures.get((grade, unit))
+        if failure and failure[0] == key and time.time() - failure[1] < retry_seconds:
+            return failure[2]
+        return None
+    
+    @staticmethod
+    def get_unit_bundle(grade, unit, build=True):
+        """获取单元音频合集的索引，合集不存在或已过期时在当前线程中重新生成（命令行批量生成使用）
+        
+        Args:
+            grade (int): 年级
+            unit (int): 单元
+            build (bool): 合集不存在时是否生成
+        
+        Returns:
+            tuple: (索引字典, 错误信息)
+        """
+        sources = AudioBundleService._unit_sources(grade, unit)
+        if not sources:
+            return None, "该单元没有可用的音频"
+        
+        settings = AudioBundleService._settings()
+        key = AudioBundleService.bundle_key(sources, settings)
+        index = AudioBundleService._load_index(grade, unit, key)
+        if index is not None:
+            return index, None
+        if not build:
+            return None, "单元音频合集尚未生成"
+        
+        # 同一单元同时只生成一次，等待的请求直接读取生成结果
+        with AudioBundleService._unit_lock(grade, unit):
+            index = AudioBundleService._load_index(grade, unit, key)
+            if index is not None:
+                return index, None
+            return AudioBundleService._build(grade, unit, sources, key, settings)
+    
+    @staticmethod
+    def build_all(grade=None):
+        """生成所有单元（或指定年级）的音频合集，已是最新的合集直接跳过
+        
+        Returns:
+            dict: {'built', 'up_to_date', 'failed', 'errors'}
+        """
+        query = db.session.query(Word.grade, Word.unit).filter(
+            Word.audio_url.isnot(None),
+            Word.audio_url != ''
+        )
+        if grade is not None:
+            query = query.filter(Word.grade == grade)
+        units = query.distinct().order_by(Word.grade, Word.unit).all()
+        
+        result = {'built': 0, 'up_to_date': 0, 'failed': 0, 'errors': []}
+        for unit_grade, unit in units:
+            existing, _ = AudioBundleService.get_unit_bundle(unit_grade, unit, build=False)
+            if existing is not None:
+                result['up_to_date'] += 1
+                continue
+            
+            index, error = AudioBundleService.get_unit_bundle(unit_grade, unit)
+            if error:
+                result['failed'] += 1
+                result['errors'].append(f"{unit_grade}年级第{unit}单元: {error}")
+            else:
+                result['built'] += 1
+        
+        logger.info(f"单元音频合集生成完成: 新生成 {result['built']}，已是最新 {result['up_to_date']}，失败 {result['failed']}")
+        return result
+    
+    @staticmethod
+    def bundle_key(sources, settings):
+        """单元音频内容的摘要：单词ID、音频URL和合集参数任一变化都会改变摘要"""
+        payload = json.dumps([AudioBundleService.BUNDLE_VERSION, settings, sources], separators=(',', ':'))
+        return hashlib.sha1(payload.encode('utf-8')).hexdigest()[:16]
+    
+    @staticmethod
+    def _settings():
+        """合集参数（格式、码率、单词间隔）"""
+        config = current_app.config
+        return {
+            'format': config.get('AUDIO_BUNDLE_FORMAT', 'mp3'),
+            'bitrate': config.get('AUDIO_BUNDLE_BITRATE', '64k'),
+            'gap_ms': config.get('AUDIO_BUNDLE_GAP_MS', 300)
+        }
+    
+    @staticmethod
+    def _unit_sources(grade, unit):
+        """单元内有音频的单词（按ID排序）
+        
+        Returns:
+            list: [[单词ID, 音频URL], ...]
+        """
+        rows = db.session.query(Word.id, Word.audio_url).filter(
+            Word.grade == grade,
+            Word.unit == unit,
+            Word.audio_url.isnot(None),
+            Word.audio_url != ''
+        ).order_by(Word.id).all()
+        return [[word_id, audio_url] for word_id, audio_url in rows]
+    
+    @staticmethod
+    def _bundle_folder():
+        audio_folder = current_app.config.get('AUDIO_FOLDER', 'app/static/audio')
+        return os.path.join(audio_folder, AudioStore.BUNDLES_DIR)
+    
+    @staticmethod
+    def _bundle_prefix(grade, unit):
+        return f'g{grade}_u{unit}_'
+    
+    @staticmethod
+    def _load_index(grade, unit, key):
+        """读取摘要对应的索引文件（不存在时返回None）"""
+        index_path = os.path.join(
+            AudioBundleService._bundle_folder(),
+            f'{AudioBundleService._bundle_prefix(grade, unit)}{key}.json'
+        )
+        try:
+            with open(index_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+    
+    @staticmethod
+    def _unit_lock(grade, unit):
+        with AudioBundleService._locks_guard:
+            return AudioBundleService._build_locks.setdefault((grade, unit), threading.Lock())
+    
+    @staticmethod
+    def _build(grade, unit, sources, key, settings):
+        """生成合集，失败时记录摘要和失败时间（页面请求在重试间隔内不再触发生成）"""
+        index, error = AudioBundleService._build_bundle(grade, unit, sources, key, settings)
+        if error:
+            AudioBundleService._failures[(grade, unit)] = (key, time.time(), error)
+        else:
+            AudioBundleService._failures.pop((grade, unit), None)
+        return index, error
+    
+    @staticmethod
+    def _build_bundle(grade, unit, sources, key, settings):
+        """拼接单元音频并写入合集文件和索引
+        
+        所有片段先统一为相同的采样率、声道数和位宽，再一次性拼接原始PCM数据，
+        避免逐段相加时反复复制整个合集。
+        """
+        try:
+            from pydub import AudioSegment
+        except ImportError:
+            return None, "未安装 pydub，无法生成单元音频合集"
+        
+        audio_folder = current_app.config.get('AUDIO_FOLDER', 'app/static/audio')
+        bundle_folder = AudioBundleService._bundle_folder()
+        name = f'{AudioBundleService._bundle_prefix(grade, unit)}{key}'
+        bundle_file = f"{name}.{settings['format']}"
+        
+        try:
+            segments = []
+            decoded = {}
+            missing = []
+            for word_id, audio_url in sources:
+                relative_path = AudioStore.path_for_url(audio_url) or os.path.basename(audio_url)
+                file_path = os.path.join(audio_folder, *relative_path.split('/'))
+                if '..' in relative_path.split('/') or not os.path.isfile(file_path):
+                    missing.append(word_id)
+                    continue
+                # 多个单词共用同一音频时只解码一次
+                if relative_path not in decoded:
+                    decoded[relative_path] = AudioSegment.from_file(file_path)
+                segments.append((word_id, decoded[relative_path]))
+            
+            if not segments:
+                return None, "该单元的音频文件均不存在"
+            
+            frame_rate = max(segment.frame_rate for _, segment in segments)
+            channels = max(segment.channels for _, segment in segments)
+            sample_width = max(segment.sample_width for _, segment in segments)
+            
+            def normalize(segment):
+                return segment.set_frame_rate(frame_rate).set_channels(channels).set_sample_width(sample_width)
+            
+            gap = normalize(AudioSegment.silent(duration=settings['gap_ms'], frame_rate=frame_rate)).raw_data
+            frame_width = channels * sample_width
+            
+            parts = []
+            offsets = {}
+            total_bytes = 0
+            for word_id, segment in segments:
+                if parts:
+                    parts.append(gap)
+                    total_bytes += len(gap)
+                data = normalize(segment).raw_data
+                offsets[str(word_id)] = [
+                    round(total_bytes / frame_width * 1000 / frame_rate),
+                    round(len(data) / frame_width * 1000 / frame_rate)
+                ]
+                parts.append(data)
+                total_bytes += len(data)
+            
+            bundle = AudioSegment(
+                data=b''.join(parts),
+                sample_width=sample_width,
+                frame_rate=frame_rate,
+                channels=channels
+            )
+            
+            os.makedirs(bundle_folder, exist_ok=True)
+            tmp_path = os.path.join(bundle_folder, f'.{name}.{os.getpid()}.tmp')
+            try:
+                export_options = {'format': settings['format']}
+                if settings['format'] != 'wav':
+                    export_options['bitrate'] = settings['bitrate']
+                bundle.export(tmp_path, **export_options)
+                os.replace(tmp_path, os.path.join(bundle_folder, bundle_file))
+            finally:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+        except Exception as e:
+            logger.error(f"生成单元音频合集失败 ({grade}年级第{unit}单元): {str(e)}")
+            return None, f"生成单元音频合集失败: {str(e)}"
+        
+        index = {
+            'grade': grade,
+            'unit': unit,
+            'key': key,
+            'url': AudioStore.url_for_path(f'{AudioStore.BUNDLES_DIR}/{bundle_file}'),
+            'format': settings['format'],
+            'size': os.path.getsize(os.path.join(bundle_folder, bundle_file)),
+            'duration_ms': len(bundle),
+            'words': offsets,
+            'missing_word_ids': missing,
+            'built_at': datetime.utcnow().isoformat()
+        }
+        
+        # 索引最后写入：索引存在即表示合集文件已完整
+        index_path = os.path.join(bundle_folder, f'{name}.json')
+        tmp_index_path = f'{index_path}.{os.getpid()}.tmp'
+        with open(tmp_index_path, 'w', encoding='utf-8') as f:
+            json.dump(index, f, ensure_ascii=False)
+        os.replace(tmp_index_path, index_path)
+        
+        AudioBundleService._remove_stale(grade, unit, name)
+        logger.info(f"单元音频合集已生成: {grade}年级第{unit}单元，{len(offsets)} 个单词，{index['size']} 字节")
+        return index, None
+    
+    @staticmethod
+    def _remove_stale(grade, unit, current_name):
+        """删除该单元旧摘要的合集和索引"""
+        bundle_folder = AudioBundleService._bundle_folder()
+        prefix = AudioBundleService._bundle_prefix(grade, unit)
+        with os.scandir(bundle_folder) as entries:
+            for entry in entries:
+                if not entry.name.startswith(prefix) or entry.name.rsplit('.', 1)[0] == current_name:
+                    continue
+                try:
+                    os.remove(entry.path)
+                except FileNotFoundError:
+                    pass
@@ -0,0 +1,297 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import time
+from datetime import datetime
+from concurrent.futures import as_completed
+from concurrent.futures.process import BrokenProcessPool
+from sqlalchemy.dialects.sqlite import insert
+from flask import current_app
+from app import db
+from app.models.word import Word
+from app.models.audio_variant import AudioVariant
+from app.services.audio_store import AudioStore
+from app.utils.process_pool import get_executor, discard_executor
+import logging
+
+logger = logging.getLogger(__name__)
+
+# 转码格式：pydub 导出参数（ffmpeg 封装格式与编码器）和浏览器检测用的 MIME 类型
+FORMATS = {
+    'opus': {'extension': 'opus', 'format': 'opus', 'codec': 'libopus', 'mimetype': 'audio/ogg; codecs=opus'},
+    'aac': {'extension': 'm4a', 'format': 'ipod', 'codec': 'aac', 'mimetype': 'audio/mp4; codecs="mp4a.40.2"'}
+}
+
+def process_audio(task):
+    """处理单个原始音频（在子进程中执行）
+    
+    去除首尾静音、按平均响度归一化（保留峰值余量避免削波）、转为单声道，再编码为各目标格式写入存储。
+    模块级函数，参数和返回值都是普通数据，可以在进程间传递。
+    
+    Returns:
+        tuple: (原始相对路径, 原始文件大小, {格式: 存储元数据}, 错误信息)
+    """
+    source_path = task['source_path']
+    try:
+        from pydub import AudioSegment
+        from pydub.silence import detect_leading_silence
+        
+        file_path = os.path.join(task['audio_folder'], *source_path.split('/'))
+        source_size = os.path.getsize(file_path)
+        audio = AudioSegment.from_file(file_path)
+        
+        padding = task['padding_ms']
+        start = max(0, detect_leading_silence(audio, task['silence_thresh']) - padding)
+        end = len(audio) - max(0, detect_leading_silence(audio.reverse(), task['silence_thresh']) - padding)
+        if end > start:
+            audio = audio[start:end]
+        
+        if audio.dBFS != float('-inf'):
+            gain = min(task['target_dbfs'] - audio.dBFS, task['peak_dbfs'] - audio.max_dBFS)
+            audio = audio.apply_gain(gain)
+        audio = audio.set_channels(1)
+        
+        variants = {}
+        for name in task['formats']:
+            spec = FORMATS[name]
+            
+            def write(tmp_path):
+                audio.export(tmp_path, format=spec['format'], codec=spec['codec'], bitrate=task['bitrate'])
+            
+            meta = AudioStore.store_file(task['audio_folder'], spec['extension'], write)
+            if meta['duration_ms'] is None:
+                meta['duration_ms'] = len(audio)
+            variants[name] = meta
+        return source_path, source_size, variants, None
+    except Exception as e:
+        return source_path, 0, {}, str(e)
+
+class AudioPostprocessService:
+    """音频后处理服务
+    
+    对存储中的原始音频去静音、归一化响度并转码为低码率单声道格式（Opus/AAC），
+    解码和编码是 CPU 密集型操作，交给进程池并行执行，清单只在调用进程中写入。
+    原始文件保留，单词的 audio_url 不变，播放器按浏览器支持情况选择转码版本。
+    """
+    
+    MAX_REPORTED_ERRORS = 100
+    QUERY_BATCH_SIZE = 500
+    
+    EXECUTOR_NAME = 'audio_postprocess'
+    
+    @staticmethod
+    def process_units(grade=None, unit=None, force=False):
+        """处理单元内单词引用的原始音频，已有转码版本的跳过
+        
+        Args:
+            grade (int): 年级筛选
+            unit (int): 单元筛选
+            force (bool): 是否重新处理已有转码版本的音频
+        
+        Returns:
+            tuple: (处理报告, 错误信息)
+        """
+        start_time = time.perf_counter()
+        config = current_app.config
+        formats = AudioPostprocessService.configured_formats()
+        unknown = [name for name in formats if name not in FORMATS]
+        if unknown:
+            return None, f"不支持的转码格式: {', '.join(unknown)}"
+        
+        unit_paths = AudioPostprocessService._unit_source_paths(grade, unit)
+        if not unit_paths:
+            return None, "没有可处理的音频（请先生成音频，旧版音频需先导入存储）"
+        
+        all_paths = set().union(*unit_paths.values())
+        existing = AudioPostprocessService._load_variants(all_paths)
+        
+        tasks = []
+        for source_path in sorted(all_paths):
+            pending = [name for name in formats if force or (source_path, name) not in existing]
+            if pending:
+                tasks.append({
+                    'audio_folder': config.get('AUDIO_FOLDER', 'app/static/audio'),
+                    'source_path': source_path,
+                    'formats': pending,
+                    'bitrate': config.get('AUDIO_VARIANT_BITRATE', '24k'),
+                    'target_dbfs': config.get('AUDIO_TARGET_DBFS', -20.0),
+                    'peak_dbfs': config.get('AUDIO_PEAK_DBFS', -1.0),
+                    'silence_thresh': config.get('AUDIO_SILENCE_THRESH', -45.0),
+                    'padding_ms': config.get('AUDIO_TRIM_PADDING_MS', 50)
+                })
+        
+        processed = 0
+        errors = []
+        failed_paths = set()
+        if tasks:
+            executor = None
+            try:
+                executor = AudioPostprocessService._get_executor()
+                futures = [executor.submit(process_audio, task) for task in tasks]
+                for future in as_completed(futures):
+                    source_path, source_size, variants, error = future.result()
+                    if error:
+                        failed_paths.add(source_path)
+                        if len(errors) < AudioPostprocessService.MAX_REPORTED_ERRORS:
+                            errors.append(f"{source_path}: {error}")
+                        continue
+                    
+                    for name, meta in variants.items():
+                        AudioPostprocessService._record_variant(source_path, name, source_size, meta)
+                    processed += 1
+            except BrokenProcessPool as e:
+                # 子进程异常退出后进程池不可再用，下次调用时重新创建；已完成的结果照常保存
+                if executor is not None:
+                    discard_executor(AudioPostprocessService.EXECUTOR_NAME, executor)
+                logger.error(f"音频转码进程池异常: {str(e)}")
+                errors.append(f"转码进程异常退出: {str(e)}")
+            db.session.commit()
+            existing = AudioPostprocessService._load_variants(all_paths)
+        
+        units = []
+        for (unit_grade, unit_number), paths in sorted(unit_paths.items()):
+            units.append(AudioPostprocessService._unit_summary(
+                unit_grade, unit_number, paths, formats, existing, failed_paths
+            ))
+        
+        report = {
+            'formats': formats,
+            'files': len(all_paths),
+            'processed': processed,
+            'skipped': len(all_paths) - len(tasks),
+            'failed': len(failed_paths),
+            'errors': errors,
+            'units': units,
+            'original_bytes': sum(item['original_bytes'] for item in units),
+            'bytes_saved': {
+                name: sum(item['bytes_saved'][name] for item in units) for name in formats
+            },
+            'elapsed_ms': round((time.perf_counter() - start_time) * 1000, 1)
+        }
+        logger.info(
+            f"音频后处理完成: 文件 {report['files']}，处理 {processed}，跳过 {report['skipped']}，"
+            f"失败 {report['failed']}，节省 {report['bytes_saved']} 字节，耗时 {report['elapsed_ms']}ms"
+        )
+        return report, None
+    
+    @staticmethod
+    def get_unit_variants(grade, unit):
+        """单元内单词的转码版本（一次查询）
+        
+        Returns:
+            dict: {单词ID: {格式: 音频URL}}
+        """
+        rows = db.session.query(Word.id, AudioVariant.format, AudioVariant.path).join(
+            AudioVariant,
+            AudioVariant.source_path == db.func.substr(Word.audio_url, len(AudioStore.URL_PREFIX) + 1)
+        ).filter(
+            Word.grade == grade,
+            Word.unit == unit,
+            Word.audio_url.like(f'{AudioStore.url_for_path(AudioStore.OBJECTS_DIR)}/%')
+        ).all()
+        
+        variants = {}
+        for word_id, name, path in rows:
+            variants.setdefault(word_id, {})[name] = AudioStore.url_for_path(path)
+        return variants
+    
+    @staticmethod
+    def configured_formats():
+        """配置的转码格式列表"""
+        value = current_app.config.get('AUDIO_VARIANT_FORMATS', 'opus')
+        return [name.strip() for name in value.split(',') if name.strip()]
+    
+    @staticmethod
+    def _unit_source_paths(grade, unit):
+        """单元内单词引用的存储中原始音频
+        
+        Returns:
+            dict: {(年级, 单元): {相对路径}}
+        """
+        query = db.session.query(Word.grade, Word.unit, Word.audio_url).filter(
+            Word.audio_url.like(f'{AudioStore.url_for_path(AudioStore.OBJECTS_DIR)}/%')
+        )
+        if grade:
+            query = query.filter(Word.grade == grade)
+        if unit:
+            query = query.filter(Word.unit == unit)
+        
+        unit_paths = {}
+        for word_grade, word_unit, audio_url in query.all():
+            unit_paths.setdefault((word_grade, word_unit), set()).add(AudioStore.path_for_url(audio_url))
+        return unit_paths
+    
+    @staticmethod
+    def _load_variants(source_paths):
+        """分批查询原始音频已有的转码版本
+        
+        Returns:
+            dict: {(原始相对路径, 格式): (大小, 原始大小)}
+        """
+        source_paths = list(source_paths)
+        variants = {}
+        batch_size = AudioPostprocessService.QUERY_BATCH_SIZE
+        for start in range(0, len(source_paths), batch_size):
+            rows = db.session.query(
+                AudioVariant.source_path, AudioVariant.format, AudioVariant.size, AudioVariant.source_size
+            ).filter(AudioVariant.source_path.in_(source_paths[start:start + batch_size])).all()
+            for source_path, name, size, source_size in rows:
+                variants[(source_path, name)] = (size, source_size)
+        return variants
+    
+    @staticmethod
+    def _record_variant(source_path, name, source_size, meta):
+        """写入或更新转码版本记录（不提交事务）"""
+        stmt = insert(AudioVariant).values(
+            source_path=source_path,
+            format=name,
+            path=meta['path'],
+            size=meta['size'],
+            source_size=source_size,
+            duration_ms=meta['duration_ms'],
+            created_at=datetime.utcnow()
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=['source_path', 'format'],
+            set_={
+                'path': stmt.excluded.path,
+                'size': stmt.excluded.size,
+                'source_size': stmt.excluded.source_size,
+                'duration_ms': stmt.excluded.duration_ms,
+                'created_at': stmt.excluded.created_at
+            }
+        )
+        db.session.execute(stmt)
+    
+    @staticmethod
+    def _unit_summary(grade, unit, paths, formats, variants, failed_paths):
+        """单元的字节统计：只统计已有全部转码版本的音频，原始大小与各格式大小对比"""
+        summary = {
+            'grade': grade,
+            'unit': unit,
+            'files': len(paths),
+            'converted': 0,
+            'failed': len(paths & failed_paths),
+            'original_bytes': 0,
+            'variant_bytes': {name: 0 for name in formats},
+            'bytes_saved': {name: 0 for name in formats}
+        }
+        for source_path in paths:
+            sizes = [variants.get((source_path, name)) for name in formats]
+            if None in sizes:
+                continue
+            summary['converted'] += 1
+            summary['original_bytes'] += sizes[0][1]
+            for name, (size, source_size) in zip(formats, sizes):
+                summary['variant_bytes'][name] += size
+                summary['bytes_saved'][name] += source_size - size
+        return summary
+    
+    @staticmethod
+    def _get_executor():
+        """获取转码进程池（首次使用时创建，与班级报告导出共用同一进程池工厂）"""
+        return get_executor(
+            AudioPostprocessService.EXECUTOR_NAME,
+            current_app.config.get('AUDIO_PROCESS_WORKERS') or os.cpu_count() or 1
+        )
@@ -0,0 +1,511 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import re
+import wave
+import shutil
+import hashlib
+import threading
+import time
+from datetime import datetime, timedelta
+from sqlalchemy.dialects.sqlite import insert
+from flask import current_app
+from app import db
+from app.models.word import Word
+from app.models.audio_asset import AudioAsset
+from app.models.audio_variant import AudioVariant
+import logging
+
+logger = logging.getLogger(__name__)
+
+class AudioStore:
+    """内容寻址的音频存储
+    
+    文件按内容的SHA-256存放在 objects/ab/cd/<哈希>.<扩展名>，两级前缀分片避免单个目录文件过多；
+    AudioAsset 清单记录每个合成来源对应的文件和元数据。
+    写入文件可以在工作线程中进行，清单只在调用线程中写入。
+    """
+    
+    URL_PREFIX = '/static/audio/'
+    OBJECTS_DIR = 'objects'
+    TMP_DIR = 'tmp'
+    BUNDLES_DIR = 'bundles'  # 单元音频合集（由 AudioBundleService 生成和清理，不参与对账）
+    
+    # 旧版文件名：<文本MD5>_<语言>.<扩展名>
+    LEGACY_NAME_PATTERN = re.compile(r'^([0-9a-f]{32})_([A-Za-z-]+)\.(\w+)$')
+    
+    # MPEG Layer III 码率表（kbps），按 MPEG1 / MPEG2 与 MPEG2.5 区分
+    MP3_BITRATES = {
+        'mpeg1': [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+        'mpeg2': [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160]
+    }
+    
+    @staticmethod
+    def source_key(backend_name, text, lang):
+        """合成来源的键：同一后端、语言和文本只合成一次"""
+        return f"{backend_name}:{lang}:{hashlib.md5(text.encode('utf-8')).hexdigest()}"
+    
+    @staticmethod
+    def object_path(checksum, extension):
+        """内容哈希对应的相对路径"""
+        return f"{AudioStore.OBJECTS_DIR}/{checksum[:2]}/{checksum[2:4]}/{checksum}.{extension}"
+    
+    @staticmethod
+    def url_for_path(path):
+        """相对路径对应的音频URL"""
+        return AudioStore.URL_PREFIX + path
+    
+    @staticmethod
+    def path_for_url(audio_url):
+        """音频URL对应的相对路径（URL不在音频目录下时返回None）"""
+        if not audio_url or not audio_url.startswith(AudioStore.URL_PREFIX):
+            return None
+        return audio_url.split('?', 1)[0][len(AudioStore.URL_PREFIX):]
+    
+    @staticmethod
+    def is_object_url(audio_url):
+        """是否为内容寻址存储中的音频"""
+        path = AudioStore.path_for_url(audio_url)
+        return bool(path) and path.startswith(f'{AudioStore.OBJECTS_DIR}/')
+    
+    @staticmethod
+    def is_immutable_path(path):
+        """文件名包含内容摘要（存储对象和单元合集），内容不会在原路径上改变"""
+        return path.startswith((f'{AudioStore.OBJECTS_DIR}/', f'{AudioStore.BUNDLES_DIR}/'))
+    
+    @staticmethod
+    def store_file(audio_folder, extension, write):
+        """写入临时文件后按内容哈希移入存储（不访问应用上下文，可在工作线程中执行）
+        
+        Args:
+            audio_folder (str): 音频目录
+            extension (str): 文件扩展名
+            write (callable): write(临时文件路径)，负责生成文件内容
+        
+        Returns:
+            dict: {'checksum', 'path', 'size', 'duration_ms'}
+        """
+        tmp_folder = os.path.join(audio_folder, AudioStore.TMP_DIR)
+        os.makedirs(tmp_folder, exist_ok=True)
+        tmp_path = os.path.join(tmp_folder, f'{os.getpid()}_{threading.get_ident()}.{extension}')
+        
+        try:
+            write(tmp_path)
+            
+            digest = hashlib.sha256()
+            with open(tmp_path, 'rb') as f:
+                for chunk in iter(lambda: f.read(65536), b''):
+                    digest.update(chunk)
+            checksum = digest.hexdigest()
+            
+            relative_path = AudioStore.object_path(checksum, extension)
+            file_path = os.path.join(audio_folder, *relative_path.split('/'))
+            meta = {
+                'checksum': checksum,
+                'path': relative_path,
+                'size': os.path.getsize(tmp_path),
+                'duration_ms': AudioStore.audio_duration_ms(tmp_path, extension)
+            }
+            
+            # 相同内容已存在时直接复用
+            if not os.path.exists(file_path):
+                os.makedirs(os.path.dirname(file_path), exist_ok=True)
+                os.replace(tmp_path, file_path)
+            return meta
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+    
+    @staticmethod
+    def audio_duration_ms(file_path, extension):
+        """读取音频时长（毫秒），无法识别时返回None
+        
+        WAV 读取文件头；MP3 按首帧码率估算（gTTS 输出为固定码率）。
+        """
+        try:
+            if extension == 'wav':
+                with wave.open(file_path, 'rb') as f:
+                    return int(f.getnframes() * 1000 / f.getframerate())
+            if extension == 'mp3':
+                return AudioStore._mp3_duration_ms(file_path)
+        except (OSError, EOFError, wave.Error):
+            pass
+        return None
+    
+    @staticmethod
+    def _mp3_duration_ms(file_path):
+        """按首个MPEG Layer III帧头的码率估算MP3时长"""
+        size = os.path.getsize(file_path)
+        with open(file_path, 'rb') as f:
+            header = f.read(10)
+            offset = 0
+            # 跳过ID3v2标签（长度为4个7位字节）
+            if header[:3] == b'ID3' and len(header) == 10:
+                offset = 10 + ((header[6] << 21) | (header[7] << 14) | (header[8] << 7) | header[9])
+            f.seek(offset)
+            data = f.read(4096)
+        
+        for index in range(len(data) - 3):
+            if data[index] != 0xFF or data[index + 1] & 0xE0 != 0xE0:
+                continue
+            version = (data[index + 1] >> 3) & 0x03
+            layer = (data[index + 1] >> 1) & 0x03
+            bitrate_index = data[index + 2] >> 4
+            if version == 1 or layer != 1 or bitrate_index in (0, 15):
+                continue
+            
+            table = AudioStore.MP3_BITRATES['mpeg1' if version == 3 else 'mpeg2']
+            bitrate = table[bitrate_index] * 1000
+            return int((size - offset - index) * 8 * 1000 / bitrate)
+        return None
+    
+    @staticmethod
+    def find_assets(source_keys):
+        """一次查询获取多个来源的清单记录
+        
+        Returns:
+            dict: {来源键: AudioAsset}
+        """
+        source_keys = list(source_keys)
+        if not source_keys:
+            return {}
+        return {
+            asset.source_key: asset
+            for asset in AudioAsset.query.filter(AudioAsset.source_key.in_(source_keys)).all()
+        }
+    
+    @staticmethod
+    def get_asset_by_url(audio_url):
+        """按音频URL查找清单记录"""
+        path = AudioStore.path_for_url(audio_url)
+        if not path:
+            return None
+        return AudioAsset.query.filter_by(path=path).order_by(AudioAsset.id).first()
+    
+    @staticmethod
+    def record_asset(source_key, backend_name, meta):
+        """写入或更新来源的清单记录（不提交事务）"""
+        stmt = insert(AudioAsset).values(
+            source_key=source_key,
+            backend=backend_name,
+            created_at=datetime.utcnow(),
+            **meta
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=['source_key'],
+            set_={
+                'checksum': stmt.excluded.checksum,
+                'path': stmt.excluded.path,
+                'size': stmt.excluded.size,
+                'duration_ms': stmt.excluded.duration_ms,
+                'backend': stmt.excluded.backend,
+                'created_at': stmt.excluded.created_at
+            }
+        )
+        db.session.execute(stmt)
+    
+    @staticmethod
+    def referenced_paths_query():
+        """单词引用的存储内路径（子查询）"""
+        prefix = AudioStore.url_for_path(f'{AudioStore.OBJECTS_DIR}/')
+        return db.session.query(
+            db.func.substr(Word.audio_url, len(AudioStore.URL_PREFIX) + 1)
+        ).filter(Word.audio_url.like(f'{prefix}%'))
+    
+    @staticmethod
+    def collect_garbage(min_age_hours=24, dry_run=False):
+        """删除没有单词引用的清单记录和转码版本，以及不再被任何记录指向的文件
+        
+        只处理创建时间早于 min_age_hours 的记录，避免删除正在批量生成、尚未写入单词的音频。
+        
+        Returns:
+            dict: {'assets_removed', 'variants_removed', 'files_removed', 'bytes_freed'}
+        """
+        audio_folder = current_app.config.get('AUDIO_FOLDER', 'app/static/audio')
+        cutoff = datetime.utcnow() - timedelta(hours=min_age_hours)
+        
+        unreferenced = AudioAsset.query.filter(
+            AudioAsset.created_at < cutoff,
+            AudioAsset.path.notin_(AudioStore.referenced_paths_query())
+        ).all()
+        # 原始音频不再被单词引用时，其转码版本一并回收
+        unreferenced_variants = AudioVariant.query.filter(
+            AudioVariant.created_at < cutoff,
+            AudioVariant.source_path.notin_(AudioStore.referenced_paths_query())
+        ).all()
+        
+        paths = {asset.path: asset.size for asset in unreferenced}
+        paths.update((variant.path, variant.size) for variant in unreferenced_variants)
+        removed_ids = [asset.id for asset in unreferenced]
+        removed_variant_ids = [variant.id for variant in unreferenced_variants]
+        
+        # 其他来源或转码版本仍指向同一文件时保留文件
+        still_used = set()
+        if paths:
+            still_used = {
+                row[0] for row in db.session.query(AudioAsset.path).filter(
+                    AudioAsset.path.in_(paths.keys()),
+                    AudioAsset.id.notin_(removed_ids)
+                ).distinct().all()
+            }
+            still_used.update(
+                row[0] for row in db.session.query(AudioVariant.path).filter(
+                    AudioVariant.path.in_(paths.keys()),
+                    AudioVariant.id.notin_(removed_variant_ids)
+                ).distinct().all()
+            )
+        
+        result = {
+            'assets_removed': len(removed_ids),
+            'variants_removed': len(removed_variant_ids),
+            'files_removed': 0,
+            'bytes_freed': 0
+        }
+        if dry_run:
+            result['files_removed'] = len(paths) - len(still_used)
+            result['bytes_freed'] = sum(size for path, size in paths.items() if path not in still_used)
+            return result
+        
+        if removed_ids:
+            AudioAsset.query.filter(AudioAsset.id.in_(removed_ids)).delete(synchronize_session=False)
+        if removed_variant_ids:
+            AudioVariant.query.filter(AudioVariant.id.in_(removed_variant_ids)).delete(synchronize_session=False)
+        if removed_ids or removed_variant_ids:
+            db.session.commit()
+        
+        for path, size in paths.items():
+            if path in still_used:
+                continue
+            file_path = os.path.join(audio_folder, *path.split('/'))
+            try:
+                os.remove(file_path)
+                result['files_removed'] += 1
+                result['bytes_freed'] += size
+            except FileNotFoundError:
+                pass
+        
+        logger.info(f"音频垃圾回收完成: {result}")
+        return result
+    
+    @staticmethod
+    def reconcile(regenerate_missing=False, delete_orphans=False, orphan_min_age_seconds=3600):
+        """一次遍历音频目录，与单词和音频清单在内存中比对
+        
+        只读取 (单词ID, 音频URL) 和清单路径，目录用 os.scandir 遍历一次；
+        内容寻址文件的哈希取自文件名，只有大小相同的旧版文件才计算哈希来识别重复。
+        
+        Args:
+            regenerate_missing (bool): 清除文件缺失单词的音频URL和失效的清单记录，
+                                       使其重新进入待生成列表（由批量生成接口处理）
+            delete_orphans (bool): 删除既没有单词引用、也不在清单中的文件
+            orphan_min_age_seconds (int): 只删除修改时间早于该秒数的孤立文件，避免删除正在写入的文件
+        
+        Returns:
+            dict: 对账报告
+        """
+        start = time.perf_counter()
+        audio_folder = current_app.config.get('AUDIO_FOLDER', 'app/static/audio')
+        
+        files = AudioStore._scan(audio_folder, exclude=(AudioStore.BUNDLES_DIR,))
+        
+        word_rows = db.session.query(Word.id, Word.audio_url).filter(
+            Word.audio_url.isnot(None),
+            Word.audio_url != ''
+        ).all()
+        asset_paths = dict(db.session.query(AudioAsset.path, AudioAsset.size).all())
+        # 转码版本同样记录在清单中，不算孤立文件
+        asset_paths.update(db.session.query(AudioVariant.path, AudioVariant.size).all())
+        
+        word_paths = {}
+        missing_words = []
+        for word_id, audio_url in word_rows:
+            path = AudioStore.path_for_url(audio_url) or os.path.basename(audio_url)
+            word_paths.setdefault(path, []).append(word_id)
+            if path not in files:
+                missing_words.append({'id': word_id, 'audio_url': audio_url})
+        
+        missing_assets = sorted(asset_paths - files.keys())
+        
+        now = time.time()
+        orphans = []
+        for path, entry in files.items():
+            if path in word_paths or path in asset_paths:
+                continue
+            # 临时目录中的文件只有超过时限（写入进程已中断）才算孤立文件
+            if path.startswith(f'{AudioStore.TMP_DIR}/') and now - entry.stat().st_mtime < orphan_min_age_seconds:
+                continue
+            orphans.append(path)
+        orphans.sort()
+        
+        duplicates = AudioStore._find_duplicates(files, asset_paths)
+        
+        report = {
+            'total_files': len(files),
+            'total_words': len(word_rows),
+            'total_assets': len(asset_paths),
+            'missing_words': missing_words,
+            'missing_assets': missing_assets,
+            'orphan_files': orphans,
+            'duplicate_groups': duplicates,
+            'queued_word_ids': [],
+            'deleted_orphans': 0
+        }
+        
+        if regenerate_missing and (missing_words or missing_assets):
+            missing_ids = [item['id'] for item in missing_words]
+            for start_index in range(0, len(missing_ids), 500):
+                for word in Word.query.filter(Word.id.in_(missing_ids[start_index:start_index + 500])).all():
+                    word.audio_url = None
+            if missing_assets:
+                AudioAsset.query.filter(AudioAsset.path.in_(missing_assets)).delete(synchronize_session=False)
+                AudioVariant.query.filter(AudioVariant.path.in_(missing_assets)).delete(synchronize_session=False)
+            db.session.commit()
+            report['queued_word_ids'] = missing_ids
+        
+        if delete_orphans:
+            for path in orphans:
+                entry = files[path]
+                if now - entry.stat().st_mtime < orphan_min_age_seconds:
+                    continue
+                try:
+                    os.remove(entry.path)
+                    report['deleted_orphans'] += 1
+                except FileNotFoundError:
+                    pass
+        
+        report['elapsed_ms'] = round((time.perf_counter() - start) * 1000, 1)
+        logger.info(
+            f"音频对账完成: 文件 {len(files)}，缺失 {len(missing_words)}，孤立 {len(orphans)}，"
+            f"重复 {len(duplicates)} 组，耗时 {report['elapsed_ms']}ms"
+        )
+        return report
+    
+    @staticmethod
+    def _scan(audio_folder, exclude=()):
+        """用 os.scandir 遍历一次音频目录（跳过 exclude 中的顶层子目录）
+        
+        Returns:
+            dict: {相对路径: DirEntry}
+        """
+        files = {}
+        if not os.path.isdir(audio_folder):
+            return files
+        
+        pending = ['']
+        while pending:
+            relative_folder = pending.pop()
+            with os.scandir(os.path.join(audio_folder, relative_folder)) as entries:
+                for entry in entries:
+                    path = f'{relative_folder}/{entry.name}' if relative_folder else entry.name
+                    if entry.is_dir(follow_symlinks=False):
+                        if path not in exclude:
+                            pending.append(path)
+                    elif entry.is_file(follow_symlinks=False):
+                        files[path] = entry
+        return files
+    
+    @staticmethod
+    def _find_duplicates(files, asset_sizes):
+        """找出内容相同的文件
+        
+        内容寻址文件的哈希直接取自文件名，大小取自清单；
+        其余文件先按大小分组，只对大小相同的文件计算哈希。
+        
+        Returns:
+            list: 每组为内容相同的相对路径列表
+        """
+        by_checksum = {}
+        by_size = {}
+        object_prefix = f'{AudioStore.OBJECTS_DIR}/'
+        
+        for path, entry in files.items():
+            if path.startswith(f'{AudioStore.TMP_DIR}/'):
+                continue
+            if path.startswith(object_prefix):
+                by_checksum.setdefault(entry.name.split('.', 1)[0], []).append(path)
+            else:
+                by_size.setdefault(entry.stat().st_size, []).append(path)
+        
+        object_sizes = {}
+        if by_size:
+            # 旧版文件也可能与存储中已有的文件内容相同
+            for checksum, paths in by_checksum.items():
+                if paths[0] in asset_sizes:
+                    object_sizes.setdefault(asset_sizes[paths[0]], []).append(checksum)
+        
+        for size, paths in by_size.items():
+            if len(paths) < 2 and size not in object_sizes:
+                continue
+            for path in paths:
+                digest = hashlib.sha256()
+                with open(files[path].path, 'rb') as f:
+                    for chunk in iter(lambda: f.read(65536), b''):
+                        digest.update(chunk)
+                by_checksum.setdefault(digest.hexdigest(), []).append(path)
+        
+        return [sorted(paths) for paths in by_checksum.values() if len(paths) > 1]
+    
+    @staticmethod
+    def import_legacy(batch_size=200):
+        """把单词引用的旧版音频文件（平铺目录或按后端分目录）移入内容寻址存储并写入清单
+        
+        Returns:
+            dict: {'imported', 'missing', 'words_updated'}
+        """
+        audio_folder = current_app.config.get('AUDIO_FOLDER', 'app/static/audio')
+        object_prefix = AudioStore.url_for_path(f'{AudioStore.OBJECTS_DIR}/')
+        
+        legacy_urls = [row[0] for row in db.session.query(Word.audio_url).filter(
+            Word.audio_url.isnot(None),
+            Word.audio_url != '',
+            ~Word.audio_url.like(f'{object_prefix}%')
+        ).distinct().all()]
+        
+        result = {'imported': 0, 'missing': 0, 'words_updated': 0}
+        # 待本批提交后删除的原文件（批次未提交就失败时原文件保留，已复制的对象由 gc 清理）
+        pending_removals = []
+        
+        def commit_batch():
+            db.session.commit()
+            for path in pending_removals:
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+            pending_removals.clear()
+        
+        for index, audio_url in enumerate(legacy_urls, 1):
+            relative_path = AudioStore.path_for_url(audio_url) or os.path.basename(audio_url)
+            source_path = os.path.join(audio_folder, *relative_path.split('/'))
+            if '..' in relative_path.split('/') or not os.path.isfile(source_path):
+                result['missing'] += 1
+                continue
+            
+            folder, filename = os.path.split(relative_path)
+            match = AudioStore.LEGACY_NAME_PATTERN.match(filename)
+            extension = filename.rsplit('.', 1)[-1] if '.' in filename else 'mp3'
+            backend_name = folder or 'gtts'
+            if match:
+                source_key = f"{backend_name}:{match.group(2)}:{match.group(1)}"
+            else:
+                source_key = f"legacy:{relative_path}"
+            
+            # 先复制进存储，本批提交后再删除原文件，中途失败不会丢失音频
+            meta = AudioStore.store_file(audio_folder, extension, lambda tmp_path: shutil.copyfile(source_path, tmp_path))
+            AudioStore.record_asset(source_key, backend_name, meta)
+            pending_removals.append(source_path)
+            result['imported'] += 1
+            
+            # 逐个对象赋值，使词库变更日志记录新的音频URL
+            new_url = AudioStore.url_for_path(meta['path'])
+            for word in Word.query.filter(Word.audio_url == audio_url).all():
+                word.audio_url = new_url
+                result['words_updated'] += 1
+            
+            if index % batch_size == 0:
+                commit_batch()
+        
+        commit_batch()
+        logger.info(f"旧版音频导入完成: {result}")
+        return result
@@ -232,6 +232,31 @@ class WordCacheService:
         from app.services.word_service import WordService
         return WordService.get_grade_units(grade)
     
+    @staticmethod
+    @CacheService.cached(ttl=1800, key_prefix='words')  # 30分钟
+    def get_catalog_word_ids():
+        """缓存词库中全部单词ID（用于批量写入时在内存中校验）"""
+        from app.models.word import Word
+        from app import db
+        return [row[0] for row in db.session.query(Word.id).all()]
+    
+    @staticmethod
+    @CacheService.cached(ttl=1800, key_prefix='words')  # 30分钟
+    def get_unit_word_counts():
+        """缓存各年级、单元的单词数 {(年级, 单元): 数量}"""
+        from app.models.word import Word
+        from app import db
+        rows = db.session.query(Word.grade, Word.unit, db.func.count(Word.id)).group_by(Word.grade, Word.unit).all()
+        return {(grade, unit): count for grade, unit, count in rows}
+    
+    @staticmethod
+    def count_words(grade=None, unit=None):
+        """根据缓存的单元单词数统计指定范围内的单词数"""
+        return sum(
+            count for (word_grade, word_unit), count in WordCacheService.get_unit_word_counts().items()
+            if (not grade or word_grade == grade) and (not unit or word_unit == unit)
+        )
+    
     @staticmethod
     def clear_word_cache():
         """清除所有单词相关缓存"""
@@ -247,9 +272,27 @@ class WordCacheService:
 class UserCacheService:
     """用户缓存服务"""
     
+    # 每个用户的缓存代数：用户数据变更时递增，按代数组成的缓存键随之失效
+    _generations = {}
+    _generation_lock = threading.Lock()
+    
+    @staticmethod
+    def get_user_generation(user_id):
+        """获取用户当前缓存代数"""
+        with UserCacheService._generation_lock:
+            return UserCacheService._generations.get(user_id, 0)
+    
+    @staticmethod
+    def bump_user_generation(user_id):
+        """递增用户缓存代数（在学习、测验、用户信息写入提交后调用）"""
+        with UserCacheService._generation_lock:
+            generation = UserCacheService._generations.get(user_id, 0) + 1
+            UserCacheService._generations[user_id] = generation
+            return generation
+    
     @staticmethod
     def get_user_progress(user_id):
-        """缓存用户学习进度"""
+        """获取用户学习进度（读取进度计数器，本身只是主键查询，不做缓存）"""
         from app.models.user import User
         user = User.query.get(user_id)
         if user:
@@ -268,6 +311,8 @@ class UserCacheService:
         cache = CacheService.get_cache()
         
         if user_id:
+            UserCacheService.bump_user_generation(user_id)
+            
             # 清除特定用户的缓存
             keys_to_delete = [key for key in cache.keys() 
                             if key.startswith('users:') and str(user_id) in key]
@@ -0,0 +1,268 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import re
+import uuid
+import time
+import zipfile
+import threading
+from datetime import datetime
+from types import SimpleNamespace
+from concurrent.futures import as_completed
+from concurrent.futures.process import BrokenProcessPool
+from flask import current_app
+from app import db
+from app.models.user import User
+from app.models.progress_counter import UserProgressCounter
+from app.models.test_daily_stat import TestDailyStat
+from app.services.export_service import ExportService
+from app.utils.process_pool import get_executor, discard_executor
+import logging
+
+logger = logging.getLogger(__name__)
+
+def render_study_report(payload):
+    """渲染单个学生的学习报告（在子进程中执行）
+    
+    模块级函数，参数和返回值都是普通数据，可以在进程间传递。
+    
+    Returns:
+        tuple: (用户ID, PDF内容, 错误信息)
+    """
+    user = SimpleNamespace(**payload['user'])
+    pdf_content, error = ExportService.export_study_report_to_pdf(user, payload['study_data'], payload['test_data'])
+    return user.id, pdf_content, error
+
+class ClassReportService:
+    """班级学习报告导出服务
+    
+    按年级或用户列表创建导出任务：后台线程分批查询学生的进度计数器和测验汇总，
+    交给进程池并行渲染PDF（reportlab 渲染受 GIL 限制，线程无法并行），
+    每完成一份就写入磁盘上的zip文件，任务进度可随时查询。
+    """
+    
+    STATS_BATCH_SIZE = 100
+    TEST_STATS_DAYS = 30
+    JOB_TTL = 24 * 3600  # 任务及其zip文件保留时间（秒）
+    
+    _jobs = {}
+    _lock = threading.Lock()
+    
+    EXECUTOR_NAME = 'class_report'
+    
+    @staticmethod
+    def start_job(grade=None, user_ids=None):
+        """创建班级报告导出任务
+        
+        Args:
+            grade (int): 年级，导出该年级全部学生
+            user_ids (list): 用户ID列表，指定时忽略年级
+        
+        Returns:
+            tuple: (任务信息, 错误信息)
+        """
+        if not grade and not user_ids:
+            return None, "请指定年级或用户列表"
+        
+        query = db.session.query(User.id, User.username, User.grade, User.current_unit)
+        if user_ids:
+            query = query.filter(User.id.in_(user_ids))
+        else:
+            query = query.filter(User.grade == grade)
+        students = [row._asdict() for row in query.order_by(User.id).all()]
+        
+        if not students:
+            return None, "没有找到符合条件的学生"
+        
+        ClassReportService._cleanup_expired()
+        
+        job_id = str(uuid.uuid4())
+        folder = current_app.config['REPORT_EXPORT_FOLDER']
+        os.makedirs(folder, exist_ok=True)
+        
+        name_parts = ['class_report', f'grade{grade}' if grade and not user_ids else 'selected']
+        name_parts.append(datetime.now().strftime('%Y%m%d'))
+        
+        job = {
+            'job_id': job_id,
+            'status': 'pending',
+            'total': len(students),
+            'completed': 0,
+            'failed': 0,
+            'errors': [],
+            'filename': '_'.join(name_parts) + '.zip',
+            'path': os.path.join(folder, f'{job_id}.zip'),
+            'created_at': time.time(),
+            'finished_at': None
+        }
+        with ClassReportService._lock:
+            ClassReportService._jobs[job_id] = job
+        
+        app = current_app._get_current_object()
+        threading.Thread(
+            target=ClassReportService._run_job,
+            args=(app, job_id, students),
+            name=f'class-report-{job_id[:8]}',
+            daemon=True
+        ).start()
+        
+        logger.info(f"班级报告任务 {job_id} 已创建，共 {len(students)} 名学生")
+        return ClassReportService.get_job(job_id), None
+    
+    @staticmethod
+    def get_job(job_id):
+        """获取任务进度（不含服务器文件路径）"""
+        with ClassReportService._lock:
+            job = ClassReportService._jobs.get(job_id)
+            if job is None:
+                return None
+            
+            done = job['completed'] + job['failed']
+            return {
+                'job_id': job['job_id'],
+                'status': job['status'],
+                'total': job['total'],
+                'completed': job['completed'],
+                'failed': job['failed'],
+                'progress': round(done / job['total'] * 100, 1) if job['total'] else 0,
+                'errors': list(job['errors']),
+                'filename': job['filename'],
+                'created_at': datetime.fromtimestamp(job['created_at']).isoformat(),
+                'finished_at': datetime.fromtimestamp(job['finished_at']).isoformat() if job['finished_at'] else None
+            }
+    
+    @staticmethod
+    def get_job_file(job_id):
+        """获取已完成任务的zip文件
+        
+        Returns:
+            tuple: ({'path', 'filename'}, 错误信息)
+        """
+        with ClassReportService._lock:
+            job = ClassReportService._jobs.get(job_id)
+            if job is None:
+                return None, "导出任务不存在"
+            if job['status'] != 'completed':
+                return None, "导出任务尚未完成"
+            return {'path': job['path'], 'filename': job['filename']}, None
+    
+    @staticmethod
+    def build_payloads(students):
+        """分批查询学生的学习进度与测验统计，生成渲染参数
+        
+        每批只执行两次查询：进度计数器按 (用户, 年级, 单元) 主键批量读取，
+        测验统计按用户分组读取每日汇总表。
+        
+        Args:
+            students (list): 学生信息字典列表，包含 id、username、grade、current_unit
+        """
+        batch_size = ClassReportService.STATS_BATCH_SIZE
+        for start in range(0, len(students), batch_size):
+            batch = students[start:start + batch_size]
+            
+            unit_keys = {student['id']: (student['grade'], student['current_unit'] or 0) for student in batch}
+            counters = UserProgressCounter.get_counters_for_users({
+                user_id: [(0, 0), unit_key] for user_id, unit_key in unit_keys.items()
+            })
+            test_stats = TestDailyStat.get_window_stats_for_users(
+                unit_keys.keys(), ClassReportService.TEST_STATS_DAYS
+            )
+            
+            for student in batch:
+                user_id = student['id']
+                yield {
+                    'user': {'id': user_id, 'username': student['username'], 'grade': student['grade']},
+                    'study_data': User.study_progress_from_counters(counters[user_id], unit_keys[user_id]),
+                    'test_data': test_stats[user_id]
+                }
+    
+    @staticmethod
+    def _run_job(app, job_id, students):
+        """后台执行导出任务：提交渲染，按完成顺序写入zip"""
+        job = ClassReportService._jobs[job_id]
+        tmp_path = f"{job['path']}.tmp"
+        usernames = {student['id']: student['username'] for student in students}
+        
+        ClassReportService._update(job_id, status='running')
+        executor = None
+        try:
+            with app.app_context():
+                executor = ClassReportService._get_executor()
+                futures = [
+                    executor.submit(render_study_report, payload)
+                    for payload in ClassReportService.build_payloads(students)
+                ]
+                # 查询结束后归还连接，渲染期间不占用数据库连接
+                db.session.remove()
+            
+            with zipfile.ZipFile(tmp_path, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+                for future in as_completed(futures):
+                    user_id, pdf_content, error = future.result()
+                    if error:
+                        ClassReportService._record_failure(job_id, user_id, error)
+                        continue
+                    
+                    archive.writestr(ClassReportService._entry_name(user_id, usernames[user_id]), pdf_content)
+                    with ClassReportService._lock:
+                        job['completed'] += 1
+            
+            os.replace(tmp_path, job['path'])
+            status = 'completed' if job['completed'] else 'failed'
+            ClassReportService._update(job_id, status=status, finished_at=time.time())
+            logger.info(f"班级报告任务 {job_id} 完成：成功 {job['completed']}，失败 {job['failed']}")
+        
+        except Exception as e:
+            if isinstance(e, BrokenProcessPool) and executor is not None:
+                discard_executor(ClassReportService.EXECUTOR_NAME, executor)
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            with ClassReportService._lock:
+                job['errors'].append({'user_id': None, 'error': str(e)})
+            ClassReportService._update(job_id, status='failed', finished_at=time.time())
+            logger.error(f"班级报告任务 {job_id} 失败: {str(e)}")
+    
+    @staticmethod
+    def _get_executor():
+        """获取渲染进程池（首次使用时创建）"""
+        return get_executor(
+            ClassReportService.EXECUTOR_NAME,
+            current_app.config.get('REPORT_RENDER_PROCESSES') or os.cpu_count() or 1
+        )
+    
+    @staticmethod
+    def _entry_name(user_id, username):
+        """zip内的文件名，去掉用户名中不能用于文件名的字符"""
+        safe_name = re.sub(r'[\\/:*?"<>|\s]+', '_', username).strip('_') or 'user'
+        return f'study_report_{safe_name}_{user_id}.pdf'
+    
+    @staticmethod
+    def _update(job_id, **fields):
+        """更新任务状态"""
+        with ClassReportService._lock:
+            ClassReportService._jobs[job_id].update(fields)
+    
+    @staticmethod
+    def _record_failure(job_id, user_id, error):
+        """记录单个学生的渲染失败，不影响其他学生"""
+        with ClassReportService._lock:
+            job = ClassReportService._jobs[job_id]
+            job['failed'] += 1
+            job['errors'].append({'user_id': user_id, 'error': error})
+        logger.warning(f"班级报告任务 {job_id} 用户 {user_id} 渲染失败: {error}")
+    
+    @staticmethod
+    def _cleanup_expired():
+        """删除过期任务及其zip文件"""
+        expire_before = time.time() - ClassReportService.JOB_TTL
+        with ClassReportService._lock:
+            expired = [
+                job for job in ClassReportService._jobs.values()
+                if job['finished_at'] and job['finished_at'] < expire_before
+            ]
+            for job in expired:
+                ClassReportService._jobs.pop(job['job_id'], None)
+        
+        for job in expired:
+            if os.path.exists(job['path']):
+                os.remove(job['path'])
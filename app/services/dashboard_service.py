@@ -0,0 +1,128 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import time
+import threading
+from sqlalchemy.orm import joinedload
+from app import db
+from app.models.user import User
+from app.models.study_record import StudyRecord
+from app.models.test_record import TestRecord
+from app.services.cache_service import CacheService, UserCacheService
+import logging
+
+logger = logging.getLogger(__name__)
+
+class DashboardService:
+    """用户仪表板服务
+    
+    每个用户的仪表板汇总为一份文档，缓存在 users:dashboard:{用户ID}:{代数} 下。
+    学习、测验和用户信息写入提交后递增用户缓存代数，旧文档自然失效；
+    重复打开仪表板只需一次缓存读取。
+    """
+    
+    CACHE_TTL = 600  # 10分钟，代数失效之外的兜底过期时间
+    RECENT_TESTS = 10
+    RECENT_STUDY = 5
+    STATS_DAYS = 30
+    
+    # 各部分构建耗时统计 {部分: {'count', 'total_ms', 'max_ms'}}
+    _section_stats = {}
+    _cache_stats = {'hits': 0, 'misses': 0}
+    _stats_lock = threading.Lock()
+    
+    @staticmethod
+    def get_dashboard(user_id):
+        """获取用户仪表板汇总
+        
+        Returns:
+            tuple: (仪表板数据, 错误信息)
+        """
+        cache = CacheService.get_cache()
+        
+        # 先读取代数再构建：构建期间若有写入，结果存在旧键下，不会被读到
+        cache_key = f"users:dashboard:{user_id}:{UserCacheService.get_user_generation(user_id)}"
+        
+        start = time.perf_counter()
+        summary = cache.get(cache_key)
+        if summary is not None:
+            DashboardService._record_cache(hit=True)
+            DashboardService._record_section('cache_read', start)
+            return summary, None
+        
+        DashboardService._record_cache(hit=False)
+        
+        summary = DashboardService._build_summary(user_id)
+        if summary is None:
+            return None, "用户不存在"
+        
+        cache.set(cache_key, summary, DashboardService.CACHE_TTL)
+        DashboardService._record_section('total', start)
+        return summary, None
+    
+    @staticmethod
+    def get_stats():
+        """获取仪表板缓存命中与各部分耗时统计"""
+        with DashboardService._stats_lock:
+            sections = {
+                name: {
+                    'count': stat['count'],
+                    'avg_ms': round(stat['total_ms'] / stat['count'], 2) if stat['count'] else 0,
+                    'max_ms': round(stat['max_ms'], 2)
+                }
+                for name, stat in DashboardService._section_stats.items()
+            }
+            return {
+                **DashboardService._cache_stats,
+                'sections': sections
+            }
+    
+    @staticmethod
+    def _build_summary(user_id):
+        """逐部分构建仪表板汇总，并记录每部分耗时"""
+        start = time.perf_counter()
+        user = db.session.get(User, user_id)
+        if not user:
+            return None
+        summary = {'user': user.to_dict()}
+        DashboardService._record_section('user', start)
+        
+        start = time.perf_counter()
+        summary['study_progress'] = user.get_study_progress()
+        DashboardService._record_section('study_progress', start)
+        
+        start = time.perf_counter()
+        summary['recent_study'] = [
+            record.to_dict() for record in StudyRecord.query.options(
+                joinedload(StudyRecord.word)
+            ).filter_by(user_id=user_id).order_by(
+                StudyRecord.studied_at.desc()
+            ).limit(DashboardService.RECENT_STUDY).all()
+        ]
+        DashboardService._record_section('recent_study', start)
+        
+        start = time.perf_counter()
+        summary['recent_tests'] = [test.to_dict() for test in user.get_recent_tests(DashboardService.RECENT_TESTS)]
+        DashboardService._record_section('recent_tests', start)
+        
+        start = time.perf_counter()
+        summary['test_statistics'] = TestRecord.get_user_test_stats(user_id, days=DashboardService.STATS_DAYS)
+        DashboardService._record_section('test_statistics', start)
+        
+        return summary
+    
+    @staticmethod
+    def _record_section(name, start):
+        """记录某部分耗时"""
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        with DashboardService._stats_lock:
+            stat = DashboardService._section_stats.setdefault(name, {'count': 0, 'total_ms': 0.0, 'max_ms': 0.0})
+            stat['count'] += 1
+            stat['total_ms'] += elapsed_ms
+            stat['max_ms'] = max(stat['max_ms'], elapsed_ms)
+    
+    @staticmethod
+    def _record_cache(hit):
+        """记录缓存命中情况"""
+        with DashboardService._stats_lock:
+            DashboardService._cache_stats['hits' if hit else 'misses'] += 1
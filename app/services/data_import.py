@@ -1,4 +1,6 @@
 import csv
+import io
+import gzip
 import json
 from io import StringIO
 from app.services.word_service import WordService
@@ -8,6 +10,10 @@ from app import db
 class DataImportService:
     """数据导入服务类"""
     
+    # NDJSON流式导入时每批写入的单词数，以及最多返回的错误条数
+    NDJSON_BATCH_SIZE = 500
+    MAX_REPORTED_ERRORS = 100
+    
     @staticmethod
     def import_from_csv(csv_content, encoding='utf-8'):
         """从CSV内容导入词库数据"""
@@ -128,6 +134,118 @@ class DataImportService:
                 'words': []
             }
     
+    @staticmethod
+    def import_from_ndjson(stream):
+        """从NDJSON字节流逐行导入词库数据（自动识别gzip压缩）
+        
+        按批查询已存在的单词并提交，内存占用与文件大小无关；
+        已存在（单词、年级、单元相同）的单词更新其余字段，其余新建。
+        结果不包含导入的单词列表，只返回计数。
+        
+        Args:
+            stream: 二进制文件对象（上传文件或请求体）
+        """
+        created_count = 0
+        updated_count = 0
+        error_count = 0
+        errors = []
+        
+        def add_error(message):
+            nonlocal error_count
+            error_count += 1
+            if len(errors) < DataImportService.MAX_REPORTED_ERRORS:
+                errors.append(message)
+        
+        try:
+            if not hasattr(stream, 'peek'):
+                stream = io.BufferedReader(stream)
+            if stream.peek(2)[:2] == b'\x1f\x8b':
+                stream = gzip.GzipFile(fileobj=stream, mode='rb')
+            
+            batch = []
+            for line_num, line in enumerate(io.TextIOWrapper(stream, encoding='utf-8-sig'), start=1):
+                if not line.strip():
+                    continue
+                try:
+                    batch.append(DataImportService._validate_word_data(json.loads(line)))
+                except Exception as e:
+                    add_error(f"第{line_num}行: {str(e)}")
+                    continue
+                
+                if len(batch) >= DataImportService.NDJSON_BATCH_SIZE:
+                    created, updated = DataImportService._upsert_word_batch(batch)
+                    created_count += created
+                    updated_count += updated
+                    batch = []
+            
+            if batch:
+                created, updated = DataImportService._upsert_word_batch(batch)
+                created_count += created
+                updated_count += updated
+        
+        except (OSError, EOFError, UnicodeDecodeError) as e:
+            db.session.rollback()
+            return {
+                'success': False,
+                'error': f"NDJSON读取错误: {str(e)}",
+                'imported_count': created_count + updated_count,
+                'created_count': created_count,
+                'updated_count': updated_count,
+                'error_count': error_count,
+                'errors': errors
+            }
+        finally:
+            if created_count or updated_count:
+                from app.services.cache_service import WordCacheService
+                WordCacheService.clear_word_cache()
+        
+        return {
+            'success': True,
+            'imported_count': created_count + updated_count,
+            'created_count': created_count,
+            'updated_count': updated_count,
+            'error_count': error_count,
+            'errors': errors
+        }
+    
+    @staticmethod
+    def _upsert_word_batch(batch):
+        """一次查询找出批内已存在的单词，更新或新建后统一提交
+        
+        Returns:
+            tuple: (新建数, 更新数)
+        """
+        keys = {(data['word'], data['grade'], data['unit']) for data in batch}
+        existing = {
+            (word.word, word.grade, word.unit): word
+            for word in Word.query.filter(db.tuple_(Word.word, Word.grade, Word.unit).in_(keys)).all()
+        }
+        
+        created = updated = 0
+        for data in batch:
+            key = (data['word'], data['grade'], data['unit'])
+            word = existing.get(key)
+            if word is None:
+                word = Word(**data)
+                db.session.add(word)
+                existing[key] = word
+                created += 1
+            else:
+                for field, value in data.items():
+                    setattr(word, field, value)
+                updated += 1
+        
+        db.session.commit()
+        return created, updated
+    
+    @staticmethod
+    def _optional_text(data, field, default=''):
+        """可选文本字段：缺失时取默认值，值为 None 时返回 None，其余转为去除首尾空白的字符串"""
+        value = data.get(field, default)
+        if value is None:
+            return None
+        return str(value).strip()
+    
     @staticmethod
     def _validate_word_data(data):
         """验证和清洗单词数据"""
@@ -161,12 +279,12 @@ class DataImportService:
         except (ValueError, TypeError):
             raise ValueError("单元必须是有效的数字")
         
-        # 可选字段
-        phonetic = str(data.get('phonetic', '')).strip()
-        phonics_breakdown = str(data.get('phonics_breakdown', '')).strip()
-        memory_method = str(data.get('memory_method', '')).strip()
-        book_version = str(data.get('book_version', 'PEP')).strip()
-        audio_url = str(data.get('audio_url', '')).strip()
+        # 可选字段（NDJSON/JSON 导出中的 null 保留为空值，不能转成字符串 'None'）
+        phonetic = DataImportService._optional_text(data, 'phonetic')
+        phonics_breakdown = DataImportService._optional_text(data, 'phonics_breakdown')
+        memory_method = DataImportService._optional_text(data, 'memory_method')
+        book_version = DataImportService._optional_text(data, 'book_version', 'PEP') or 'PEP'
+        audio_url = DataImportService._optional_text(data, 'audio_url')
         
         return {
             'word': word,
@@ -4,6 +4,8 @@
 import csv
 import io
 import json
+import codecs
+import zlib
 from datetime import datetime
 from flask import current_app
 import os
@@ -26,6 +28,16 @@ except ImportError:
 class ExportService:
     """数据导出服务"""
     
+    # 流式导出时每批读取和编码的行数
+    STREAM_BATCH_SIZE = 1000
+    
+    WORD_CSV_HEADERS = [
+        '单词', '中文含义', '音标', '拼读拆分', '记忆方法',
+        '年级', '单元', '教材版本', '音频链接', '创建时间'
+    ]
+    STUDY_RECORD_CSV_HEADERS = ['学习时间', '单词', '中文含义', '年级', '单元', '掌握程度']
+    SCHOOL_STUDY_RECORD_CSV_HEADERS = ['用户', '用户年级'] + STUDY_RECORD_CSV_HEADERS
+    
     @staticmethod
     def export_words_to_csv(words, include_headers=True):
         """导出单词到CSV格式"""
@@ -34,26 +46,10 @@ class ExportService:
             writer = csv.writer(output, quoting=csv.QUOTE_ALL)
             
             if include_headers:
-                headers = [
-                    '单词', '中文含义', '音标', '拼读拆分', '记忆方法',
-                    '年级', '单元', '教材版本', '音频链接', '创建时间'
-                ]
-                writer.writerow(headers)
+                writer.writerow(ExportService.WORD_CSV_HEADERS)
             
             for word in words:
-                row = [
-                    word.word,
-                    word.chinese_meaning,
-                    word.phonetic or '',
-                    word.phonics_breakdown or '',
-                    word.memory_method or '',
-                    word.grade,
-                    word.unit,
-                    word.book_version,
-                    word.audio_url or '',
-                    word.created_at.strftime('%Y-%m-%d %H:%M:%S') if word.created_at else ''
-                ]
-                writer.writerow(row)
+                writer.writerow(ExportService._word_csv_row(word))
             
             csv_content = output.getvalue()
             output.close()
@@ -67,8 +63,173 @@ class ExportService:
             return None, error_msg
     
     @staticmethod
-    def export_words_to_pdf(words, title="单词列表"):
-        """导出单词到PDF格式"""
+    def iter_csv(rows, headers=None):
+        """把行迭代器逐批编码为CSV字节块，首块带BOM以支持Excel
+        
+        每批只在内存中保留一个小缓冲区，导出任意行数时内存占用恒定。
+        """
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, quoting=csv.QUOTE_ALL)
+        
+        yield codecs.BOM_UTF8
+        
+        if headers:
+            writer.writerow(headers)
+        
+        for index, row in enumerate(rows, 1):
+            writer.writerow(row)
+            if index % ExportService.STREAM_BATCH_SIZE == 0:
+                yield buffer.getvalue().encode('utf-8')
+                buffer.seek(0)
+                buffer.truncate(0)
+        
+        yield buffer.getvalue().encode('utf-8')
+    
+    @staticmethod
+    def iter_ndjson(records, compress=False):
+        """把字典迭代器逐批编码为NDJSON（每行一个JSON对象），可选边编码边gzip压缩
+        
+        与 iter_csv 一样每批只保留一个小缓冲区；压缩时输出标准gzip格式，可直接用 gunzip 解压。
+        """
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None  # wbits=31 表示gzip头
+        buffer = io.StringIO()
+        
+        def encode(text):
+            data = text.encode('utf-8')
+            return compressor.compress(data) if compressor else data
+        
+        for index, record in enumerate(records, 1):
+            buffer.write(json.dumps(record, ensure_ascii=False))
+            buffer.write('\n')
+            if index % ExportService.STREAM_BATCH_SIZE == 0:
+                chunk = encode(buffer.getvalue())
+                buffer.seek(0)
+                buffer.truncate(0)
+                if chunk:
+                    yield chunk
+        
+        chunk = encode(buffer.getvalue())
+        if compressor:
+            chunk += compressor.flush()
+        if chunk:
+            yield chunk
+    
+    @staticmethod
+    def iter_word_records(grade=None, unit=None):
+        """分批读取单词并生成字典（字段与JSON导出一致）"""
+        from app.models.word import Word
+        
+        query = Word.query
+        if grade:
+            query = query.filter_by(grade=grade)
+        if unit:
+            query = query.filter_by(unit=unit)
+        
+        for word in query.order_by(Word.grade, Word.unit, Word.id).yield_per(ExportService.STREAM_BATCH_SIZE):
+            yield word.to_dict()
+    
+    @staticmethod
+    def iter_word_rows(grade=None, unit=None):
+        """分批读取单词并生成CSV行"""
+        from app.models.word import Word
+        
+        query = Word.query
+        if grade:
+            query = query.filter_by(grade=grade)
+        if unit:
+            query = query.filter_by(unit=unit)
+        
+        for word in query.order_by(Word.grade, Word.unit, Word.id).yield_per(ExportService.STREAM_BATCH_SIZE):
+            yield ExportService._word_csv_row(word)
+    
+    @staticmethod
+    def iter_study_record_rows(user_id=None, grade=None):
+        """按 (学习时间, ID) 键集分页读取学习记录并生成CSV行
+        
+        Args:
+            user_id (int): 只导出该用户，None 表示全校导出（行首增加用户名和用户年级）
+            grade (int): 全校导出时按用户年级筛选
+        """
+        from app import db
+        from app.models.study_record import StudyRecord
+        from app.models.word import Word
+        from app.models.user import User
+        
+        columns = [
+            StudyRecord.id,
+            StudyRecord.studied_at,
+            Word.word,
+            Word.chinese_meaning,
+            Word.grade,
+            Word.unit,
+            StudyRecord.mastery_level
+        ]
+        if user_id is None:
+            columns = [User.username, User.grade] + columns
+        
+        # 没有学习时间的记录无法排序，不导出
+        base_query = db.session.query(*columns).join(
+            Word, Word.id == StudyRecord.word_id
+        ).filter(StudyRecord.studied_at.isnot(None))
+        
+        if user_id is not None:
+            base_query = base_query.filter(StudyRecord.user_id == user_id)
+        else:
+            base_query = base_query.join(User, User.id == StudyRecord.user_id)
+            if grade:
+                base_query = base_query.filter(User.grade == grade)
+        
+        last_studied_at, last_id = None, None
+        while True:
+            query = base_query
+            if last_id is not None:
+                query = query.filter(db.or_(
+                    StudyRecord.studied_at > last_studied_at,
+                    db.and_(StudyRecord.studied_at == last_studied_at, StudyRecord.id > last_id)
+                ))
+            
+            rows = query.order_by(StudyRecord.studied_at, StudyRecord.id).limit(
+                ExportService.STREAM_BATCH_SIZE
+            ).all()
+            if not rows:
+                return
+            
+            for row in rows:
+                *user_columns, record_id, studied_at, word, meaning, word_grade, word_unit, mastery_level = row
+                yield user_columns + [
+                    studied_at.strftime('%Y-%m-%d %H:%M:%S'),
+                    word,
+                    meaning,
+                    word_grade,
+                    word_unit,
+                    mastery_level
+                ]
+            
+            last_studied_at, last_id = rows[-1].studied_at, rows[-1].id
+    
+    @staticmethod
+    def _word_csv_row(word):
+        """单词CSV行"""
+        return [
+            word.word,
+            word.chinese_meaning,
+            word.phonetic or '',
+            word.phonics_breakdown or '',
+            word.memory_method or '',
+            word.grade,
+            word.unit,
+            word.book_version,
+            word.audio_url or '',
+            word.created_at.strftime('%Y-%m-%d %H:%M:%S') if word.created_at else ''
+        ]
+    
+    @staticmethod
+    def export_words_to_pdf(words, title="单词列表", catalog_version=None):
+        """导出单词到PDF格式
+        
+        指定词库版本时，页眉显示词库版本而不是生成时间，并以 reportlab 的 invariant 模式输出
+        （不写入创建时间和随机文档ID），相同内容总是得到相同的字节，便于按内容哈希缓存。
+        """
         if not REPORTLAB_AVAILABLE:
             return None, "PDF功能不可用，请安装reportlab库"
         
@@ -83,7 +244,8 @@ class ExportService:
                 rightMargin=0.5*inch,
                 leftMargin=0.5*inch,
                 topMargin=0.75*inch,
-                bottomMargin=0.5*inch
+                bottomMargin=0.5*inch,
+                invariant=1 if catalog_version else None
             )
             
             # 获取样式
@@ -108,7 +270,10 @@ class ExportService:
                 textColor=colors.grey,
                 alignment=1
             )
-            story.append(Paragraph(f"生成时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}", time_style))
+            if catalog_version:
+                story.append(Paragraph(f"词库版本: {catalog_version}", time_style))
+            else:
+                story.append(Paragraph(f"生成时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}", time_style))
             story.append(Spacer(1, 20))
             
             # 统计信息
@@ -0,0 +1,228 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import time
+import hashlib
+import threading
+from types import SimpleNamespace
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from flask import current_app
+from app import db
+from app.models.word import Word
+from app.services.export_service import ExportService
+import logging
+
+logger = logging.getLogger(__name__)
+
+class PdfCacheService:
+    """单词表PDF缓存服务
+    
+    渲染结果按内容哈希存放在磁盘上（objects/ab/abcdef....pdf），
+    并以 (年级, 单元, 词库版本, 模板版本) 为键记录指向内容哈希的引用文件。
+    词库版本是范围内单词（PDF用到的字段）的摘要，单词变化后自动生成新键；
+    未命中时在工作线程池中渲染，同一键的并发请求共享一次渲染。
+    PDF中只写入词库版本、不写入生成时间，相同内容的渲染结果字节相同，不同键可以共用同一文件。
+    """
+    
+    # 修改PDF版式后递增，使已缓存的文件全部失效
+    TEMPLATE_VERSION = 1
+    
+    # PDF中用到的单词字段，词库版本由这些字段计算
+    WORD_COLUMNS = ('id', 'word', 'chinese_meaning', 'grade', 'unit', 'phonics_breakdown', 'memory_method')
+    
+    _executor = None
+    _inflight = {}
+    _lock = threading.Lock()
+    _store_lock = threading.Lock()  # 本进程内写入与清理串行执行
+    
+    # 未被引用的文件超过该时间（秒）才清理：其他进程可能刚写入文件、尚未写入引用
+    ORPHAN_MIN_AGE_SECONDS = 3600
+    
+    @staticmethod
+    def get_word_list_pdf(grade=None, unit=None):
+        """获取单词表PDF文件，必要时渲染
+        
+        Returns:
+            tuple: ({'path', 'etag'}, 错误信息)；渲染超时时返回 (None, None)，调用方应稍后重试
+        """
+        words = PdfCacheService._load_words(grade, unit)
+        if not words:
+            return None, "没有找到符合条件的单词"
+        
+        scope = PdfCacheService._scope(grade, unit)
+        key = f"{scope}__{PdfCacheService.get_catalog_version(words)}_t{PdfCacheService.TEMPLATE_VERSION}"
+        cache_folder = current_app.config['PDF_CACHE_FOLDER']
+        
+        cached = PdfCacheService._lookup(cache_folder, key)
+        if cached:
+            return cached, None
+        
+        future = PdfCacheService._submit_render(cache_folder, scope, key, words, PdfCacheService._title(grade, unit))
+        try:
+            return future.result(timeout=current_app.config.get('PDF_RENDER_TIMEOUT', 30))
+        except FutureTimeoutError:
+            return None, None
+    
+    @staticmethod
+    def get_catalog_version(words):
+        """根据PDF中用到的单词字段计算词库版本号，任何单词增删改都会得到新版本"""
+        digest = hashlib.sha1()
+        for word in words:
+            digest.update(repr(tuple(getattr(word, column) for column in PdfCacheService.WORD_COLUMNS)).encode('utf-8'))
+        return digest.hexdigest()[:12]
+    
+    @staticmethod
+    def _load_words(grade, unit):
+        """只读取PDF中用到的单词字段（普通对象，可交给工作线程使用）"""
+        query = db.session.query(*[getattr(Word, column) for column in PdfCacheService.WORD_COLUMNS])
+        if grade:
+            query = query.filter(Word.grade == grade)
+        if unit:
+            query = query.filter(Word.unit == unit)
+        
+        return [
+            SimpleNamespace(**row._asdict())
+            for row in query.order_by(Word.grade, Word.unit, Word.id).all()
+        ]
+    
+    @staticmethod
+    def _scope(grade, unit):
+        """缓存范围名"""
+        return f"words_g{grade or 'all'}_u{unit or 'all'}"
+    
+    @staticmethod
+    def _lookup(cache_folder, key):
+        """按键查找已缓存的PDF"""
+        ref_path = os.path.join(cache_folder, 'refs', f'{key}.ref')
+        try:
+            with open(ref_path, 'r', encoding='utf-8') as f:
+                digest = f.read().strip()
+        except FileNotFoundError:
+            return None
+        
+        path = PdfCacheService._object_path(cache_folder, digest)
+        if not os.path.exists(path):
+            return None
+        return {'path': path, 'etag': digest}
+    
+    @staticmethod
+    def _object_path(cache_folder, digest):
+        """内容哈希对应的文件路径"""
+        return os.path.join(cache_folder, 'objects', digest[:2], f'{digest}.pdf')
+    
+    @staticmethod
+    def _submit_render(cache_folder, scope, key, words, title):
+        """提交渲染任务；同一键已有任务在渲染时复用其结果"""
+        with PdfCacheService._lock:
+            future = PdfCacheService._inflight.get(key)
+            if future is not None:
+                return future
+            
+            future = PdfCacheService._get_executor().submit(
+                PdfCacheService._render_and_store, cache_folder, scope, key, words, title
+            )
+            PdfCacheService._inflight[key] = future
+            future.add_done_callback(lambda _: PdfCacheService._finish(key))
+            return future
+    
+    @staticmethod
+    def _finish(key):
+        """渲染结束后移出进行中列表"""
+        with PdfCacheService._lock:
+            PdfCacheService._inflight.pop(key, None)
+    
+    @staticmethod
+    def _get_executor():
+        """延迟创建渲染线程池"""
+        if PdfCacheService._executor is None:
+            PdfCacheService._executor = ThreadPoolExecutor(
+                max_workers=current_app.config.get('PDF_RENDER_WORKERS', 2),
+                thread_name_prefix='pdf-render'
+            )
+        return PdfCacheService._executor
+    
+    @staticmethod
+    def _title(grade, unit):
+        """PDF标题"""
+        title_parts = ['单词列表']
+        if grade:
+            title_parts.append(f'{grade}年级')
+        if unit:
+            title_parts.append(f'第{unit}单元')
+        return ' - '.join(title_parts)
+    
+    @staticmethod
+    def _render_and_store(cache_folder, scope, key, words, title):
+        """渲染PDF并按内容哈希写入磁盘（在工作线程中执行）"""
+        pdf_content, error = ExportService.export_words_to_pdf(
+            words, title, catalog_version=PdfCacheService.get_catalog_version(words)
+        )
+        if error:
+            return None, error
+        
+        digest = hashlib.sha256(pdf_content).hexdigest()
+        path = PdfCacheService._object_path(cache_folder, digest)
+        
+        with PdfCacheService._store_lock:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            
+            # 先写临时文件再原子替换，读取方不会看到写了一半的文件；
+            # 文件已存在时更新修改时间，其他进程清理时按时间保留它
+            try:
+                os.utime(path)
+            except FileNotFoundError:
+                tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+                with open(tmp_path, 'wb') as f:
+                    f.write(pdf_content)
+                os.replace(tmp_path, path)
+            
+            refs_folder = os.path.join(cache_folder, 'refs')
+            os.makedirs(refs_folder, exist_ok=True)
+            tmp_ref = os.path.join(refs_folder, f'{key}.ref.tmp')
+            with open(tmp_ref, 'w', encoding='utf-8') as f:
+                f.write(digest)
+            os.replace(tmp_ref, os.path.join(refs_folder, f'{key}.ref'))
+            
+            PdfCacheService._prune_scope(cache_folder, scope, key)
+        
+        logger.info(f"单词表PDF已缓存: {key} -> {digest[:12]}")
+        return {'path': path, 'etag': digest}, None
+    
+    @staticmethod
+    def _prune_scope(cache_folder, scope, current_key):
+        """删除同一范围下旧版本的引用，以及不再被引用的PDF文件
+        
+        清理在各进程中独立执行（进程内的锁对其他进程无效），只删除修改时间早于
+        ORPHAN_MIN_AGE_SECONDS 的未引用文件，与音频存储的垃圾回收一样，不会删除其他进程刚写入、尚未写入引用的文件。
+        """
+        refs_folder = os.path.join(cache_folder, 'refs')
+        
+        referenced = set()
+        for name in os.listdir(refs_folder):
+            if not name.endswith('.ref'):
+                continue
+            ref_path = os.path.join(refs_folder, name)
+            # 其他进程可能同时清理了同一引用
+            try:
+                if name.startswith(f'{scope}__') and name != f'{current_key}.ref':
+                    os.remove(ref_path)
+                    continue
+                with open(ref_path, 'r', encoding='utf-8') as f:
+                    referenced.add(f.read().strip())
+            except FileNotFoundError:
+                continue
+        
+        cutoff = time.time() - PdfCacheService.ORPHAN_MIN_AGE_SECONDS
+        objects_folder = os.path.join(cache_folder, 'objects')
+        for prefix in os.listdir(objects_folder):
+            prefix_folder = os.path.join(objects_folder, prefix)
+            for name in os.listdir(prefix_folder):
+                if not name.endswith('.pdf') or name[:-4] in referenced:
+                    continue
+                path = os.path.join(prefix_folder, name)
+                try:
+                    if os.path.getmtime(path) < cutoff:
+                        os.remove(path)
+                except FileNotFoundError:
+                    pass
@@ -0,0 +1,352 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import json
+import time
+import atexit
+import threading
+from datetime import datetime
+import logging
+
+logger = logging.getLogger(__name__)
+
+class StudyProgressBuffer:
+    """学习进度写缓冲（write-behind）
+    
+    学习进度先追加到本地溢出文件（落盘后才确认），并在内存中按 (用户, 单词) 合并，
+    只保留最后一次写入；后台线程每隔 N 毫秒或累计 M 条事件时，在一个事务中批量写入数据库。
+    进程崩溃后，启动时会重放未写入数据库的溢出文件，已确认的进度不会丢失。
+    
+    落盘采用组提交：fsync 在全局锁之外执行，一次 fsync 确认它开始前已写入的所有事件，
+    并发请求不必各自排队等待一次 fsync。
+    """
+    
+    SPILL_PREFIX = 'study_progress_'
+    ACTIVE_SUFFIX = '.active.jsonl'
+    FLUSHING_SUFFIX = '.flushing.jsonl'
+    
+    def __init__(self):
+        self.app = None
+        self.enabled = False
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        self._written_seq = 0
+        self._synced_seq = 0
+        self._started_pid = None
+        self._flush_event = threading.Event()
+        self._events_since_flush = 0
+        self._spill_file = None
+        self._spill_path = None
+        self._unflushed_segments = []
+        self._stats = {
+            'events': 0,
+            'flushes': 0,
+            'flushed_rows': 0,
+            'failed_flushes': 0,
+            'last_flush_at': None
+        }
+    
+    def init_app(self, app):
+        """根据配置启用写缓冲"""
+        app.extensions['study_buffer'] = self
+        
+        if not app.config.get('STUDY_WRITE_BEHIND'):
+            return
+        
+        # 全局单例：同一进程多次创建应用时只启动一个刷新线程（fork 出的子进程重新启动）
+        if self._started_pid == os.getpid():
+            logger.info("学习进度写缓冲已在本进程启用，沿用已有的刷新线程")
+            return
+        self._started_pid = os.getpid()
+        
+        self.app = app
+        self.enabled = True
+        self.flush_interval = app.config.get('STUDY_FLUSH_INTERVAL_MS', 500) / 1000.0
+        self.flush_max_events = app.config.get('STUDY_FLUSH_MAX_EVENTS', 200)
+        self.spill_folder = app.config['STUDY_SPILL_FOLDER']
+        self.fsync = app.config.get('STUDY_SPILL_FSYNC', True)
+        
+        os.makedirs(self.spill_folder, exist_ok=True)
+        
+        # 先认领并重放崩溃前遗留的溢出文件，再开启本进程的溢出文件
+        self._replay_orphan_segments()
+        self._open_spill_file()
+        
+        thread = threading.Thread(target=self._flush_loop, name='study-progress-flusher', daemon=True)
+        thread.start()
+        
+        atexit.register(self.flush)
+        logger.info(f"学习进度写缓冲已启用: 间隔 {self.flush_interval * 1000:.0f}ms, 批量 {self.flush_max_events} 条")
+    
+    def add(self, user_id, word_id, mastery_level, studied_at=None):
+        """追加一条学习进度事件，落盘后返回即视为已确认"""
+        event = {
+            'user_id': user_id,
+            'word_id': word_id,
+            'mastery_level': mastery_level,
+            'studied_at': (studied_at or datetime.utcnow()).isoformat()
+        }
+        line = json.dumps(event, ensure_ascii=False) + '\n'
+        
+        with self._lock:
+            self._spill_file.write(line)
+            self._spill_file.flush()
+            self._written_seq += 1
+            seq = self._written_seq
+            
+            self._merge_event(event)
+            self._stats['events'] += 1
+            self._events_since_flush += 1
+            
+            if self._events_since_flush >= self.flush_max_events:
+                self._flush_event.set()
+        
+        if self.fsync:
+            self._sync(seq)
+        return event
+    
+    def _sync(self, seq):
+        """确保第 seq 条事件已落盘（组提交）
+        
+        等待 _sync_lock 期间其他线程的 fsync 可能已经覆盖了本事件，此时直接返回；
+        否则对当前活动文件的副本描述符 fsync（不持有 _lock，期间可以继续追加和轮转文件）。
+        """
+        with self._sync_lock:
+            with self._lock:
+                if self._synced_seq >= seq:
+                    return
+                target = self._written_seq
+                fd = os.dup(self._spill_file.fileno())
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+            with self._lock:
+                self._synced_seq = max(self._synced_seq, target)
+    
+    def flush(self):
+        """把缓冲中的学习进度在一个事务中写入数据库
+        
+        Returns:
+            int: 写入的学习记录数
+        """
+        if not self.enabled:
+            return 0
+        
+        with self._flush_lock:
+            with self._lock:
+                if not self._pending:
+                    return 0
+                
+                batch = self._pending
+                self._pending = {}
+                self._events_since_flush = 0
+                segment = self._rotate_spill_file()
+            
+            try:
+                written = self._write_batch(batch)
+            except Exception as e:
+                logger.error(f"学习进度批量写入失败，稍后重试: {str(e)}")
+                
+                # 放回缓冲区，但不覆盖期间新到的事件；溢出段保留到成功写入后再删除
+                with self._lock:
+                    self._stats['failed_flushes'] += 1
+                    for event in batch.values():
+                        self._merge_event(event)
+                    self._unflushed_segments.append(segment)
+                return 0
+            
+            for path in self._unflushed_segments + [segment]:
+                self._remove_segment(path)
+            self._unflushed_segments = []
+            
+            with self._lock:
+                self._stats['flushes'] += 1
+                self._stats['flushed_rows'] += written
+                self._stats['last_flush_at'] = datetime.utcnow().isoformat()
+            return written
+    
+    def stats(self):
+        """获取写缓冲统计信息"""
+        with self._lock:
+            return {
+                'enabled': self.enabled,
+                'pending': len(self._pending),
+                **self._stats
+            }
+    
+    def _merge_event(self, event):
+        """按 (用户, 单词) 合并事件，只保留最后一次学习"""
+        key = (event['user_id'], event['word_id'])
+        current = self._pending.get(key)
+        if current is None or event['studied_at'] >= current['studied_at']:
+            self._pending[key] = event
+    
+    def _write_batch(self, batch):
+        """按用户分组批量写入，所有用户在同一事务中提交"""
+        from app import db
+        from app.models.study_record import StudyRecord
+        from app.services.cache_service import UserCacheService
+        
+        items_by_user = {}
+        replayed_by_user = {}
+        for event in batch.values():
+            item = {
+                'word_id': event['word_id'],
+                'mastery_level': event['mastery_level'],
+                'studied_at': datetime.fromisoformat(event['studied_at'])
+            }
+            items_by_user.setdefault(event['user_id'], []).append(item)
+            if event.get('replayed'):
+                replayed_by_user.setdefault(event['user_id'], []).append(item)
+        
+        with self.app.app_context():
+            try:
+                StudyProgressBuffer._drop_applied(items_by_user, replayed_by_user)
+                written = 0
+                for user_id, items in items_by_user.items():
+                    if not items:
+                        continue
+                    written += StudyRecord.bulk_upsert(user_id, items, commit=False)
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                raise
+        
+        # 提交后使相关用户的缓存失效
+        for user_id, items in items_by_user.items():
+            if not items:
+                continue
+            UserCacheService.bump_user_generation(user_id)
+        
+        return written
+    
+    @staticmethod
+    def _drop_applied(items_by_user, replayed_by_user):
+        """去掉重放事件中已经写入数据库的部分（就地修改 items_by_user）
+        
+        进程在事务提交之后、删除溢出段之前崩溃时，重启后会重放同一批事件；
+        学习事件日志与学习记录在同一事务中写入，已有相同 (用户, 单词, 时间) 的事件说明已经写入过，
+        再次写入会让复习间隔多推进一次、单词统计和事件日志重复计数。
+        """
+        from app import db
+        from app.models.study_event import StudyEvent
+        
+        for user_id, replayed in replayed_by_user.items():
+            applied = set(db.session.query(StudyEvent.word_id, StudyEvent.ts).filter(
+                StudyEvent.user_id == user_id,
+                StudyEvent.word_id.in_({item['word_id'] for item in replayed}),
+                StudyEvent.ts.in_({item['studied_at'] for item in replayed})
+            ).all())
+            if applied:
+                items_by_user[user_id] = [
+                    item for item in items_by_user[user_id]
+                    if (item['word_id'], item['studied_at']) not in applied
+                ]
+    
+    def _flush_loop(self):
+        """后台定时刷新"""
+        while True:
+            self._flush_event.wait(self.flush_interval)
+            self._flush_event.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"学习进度刷新线程异常: {str(e)}")
+    
+    def _open_spill_file(self):
+        """打开本进程的活动溢出文件"""
+        self._spill_path = os.path.join(
+            self.spill_folder,
+            f"{self.SPILL_PREFIX}{os.getpid()}_{time.time_ns()}{self.ACTIVE_SUFFIX}"
+        )
+        self._spill_file = open(self._spill_path, 'a', encoding='utf-8')
+    
+    def _rotate_spill_file(self):
+        """把当前溢出文件转为待写入段，并开启新的活动文件（需持有 _lock）"""
+        if self.fsync:
+            # 关闭前落盘，文件中的事件全部视为已确认
+            os.fsync(self._spill_file.fileno())
+            self._synced_seq = self._written_seq
+        self._spill_file.close()
+        segment = self._spill_path[:-len(self.ACTIVE_SUFFIX)] + self.FLUSHING_SUFFIX
+        os.replace(self._spill_path, segment)
+        self._open_spill_file()
+        return segment
+    
+    def _remove_segment(self, path):
+        """删除已写入数据库的溢出段"""
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.warning(f"删除溢出文件失败: {path}, {str(e)}")
+    
+    def _replay_orphan_segments(self):
+        """认领并重放其他（已退出）进程遗留的溢出文件"""
+        replayed = 0
+        
+        for name in sorted(os.listdir(self.spill_folder)):
+            if not name.startswith(self.SPILL_PREFIX) or name.endswith('.claimed.jsonl'):
+                continue
+            
+            path = os.path.join(self.spill_folder, name)
+            
+            # 溢出文件名中包含进程号，仍在运行的进程的活动文件不处理
+            pid = self._parse_pid(name)
+            if pid and pid != os.getpid() and self._process_alive(pid):
+                continue
+            
+            # 通过原子重命名认领，避免多个进程同时重放同一文件
+            claimed = os.path.join(
+                self.spill_folder,
+                f"{self.SPILL_PREFIX}{os.getpid()}_{time.time_ns()}.claimed.jsonl"
+            )
+            try:
+                os.replace(path, claimed)
+            except FileNotFoundError:
+                continue
+            
+            with open(claimed, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        event = json.loads(line)
+                        event['replayed'] = True
+                        self._merge_event(event)
+                        replayed += 1
+                    except (json.JSONDecodeError, KeyError):
+                        # 崩溃时可能留下不完整的最后一行，该事件未被确认
+                        continue
+            
+            # 重放的事件保留在认领文件中，直到成功写入数据库后删除
+            self._unflushed_segments.append(claimed)
+        
+        if replayed:
+            logger.info(f"重放了 {replayed} 条未写入的学习进度")
+            self._flush_event.set()
+    
+    @staticmethod
+    def _parse_pid(name):
+        """从溢出文件名解析进程号"""
+        try:
+            return int(name[len(StudyProgressBuffer.SPILL_PREFIX):].split('_', 1)[0])
+        except ValueError:
+            return None
+    
+    @staticmethod
+    def _process_alive(pid):
+        """判断进程是否仍在运行"""
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        except (PermissionError, OSError):
+            return True
+        return True
+
+# 全局写缓冲实例
+study_buffer = StudyProgressBuffer()
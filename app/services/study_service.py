@@ -1,13 +1,29 @@
 from app.models.user import User
 from app.models.study_record import StudyRecord
+from app.models.word import Word
+from app.models.due_count import UserDueCount
+from app.models.study_event import StudyEvent
 from app.services.word_service import WordService
+from app.services.study_buffer import study_buffer
+from app.services.cache_service import UserCacheService
 from app import db
-from datetime import datetime, timedelta
+from sqlalchemy import inspect
+from sqlalchemy.orm import joinedload
+from app.utils.param_helpers import safe_int
+from datetime import datetime, timedelta, timezone
 import random
 
 class StudyService:
     """学习服务类"""
     
+    # 学习顺序分组
+    BUCKET_UNMASTERED = 0
+    BUCKET_UNSTUDIED = 1
+    BUCKET_MASTERED = 2
+    
+    # 批量记录学习进度的单次上限
+    MAX_BATCH_SIZE = 500
+    
     @staticmethod
     def start_study_session(user_id, grade, unit=None):
         """开始学习会话"""
@@ -15,42 +31,50 @@ class StudyService:
         if not user:
             return None, "用户不存在"
         
-        # 获取学习单词列表
-        words = WordService.get_words_by_criteria(grade=grade, unit=unit)
-        if not words:
+        # 单次 LEFT JOIN 获取单词及该用户的掌握程度，并直接按学习顺序分组排序：
+        # 未掌握的单词 -> 未学习的单词 -> 已掌握的单词
+        rows = StudyService._query_study_order(user_id, grade, unit)
+        if not rows:
             return None, "没有找到符合条件的单词"
         
-        # 获取用户的学习记录，优先显示未掌握的单词
-        studied_word_ids = [r.word_id for r in 
-                           StudyRecord.query.filter_by(user_id=user_id).all()]
-        
-        # 分为已学习和未学习的单词
-        unstudied_words = [w for w in words if w.id not in studied_word_ids]
-        studied_words = [w for w in words if w.id in studied_word_ids]
-        
-        # 获取未掌握的单词（掌握程度<4）
-        unmastered_records = StudyRecord.query.filter(
-            StudyRecord.user_id == user_id,
-            StudyRecord.word_id.in_([w.id for w in studied_words]),
-            StudyRecord.mastery_level < 4
-        ).all()
-        
-        unmastered_word_ids = [r.word_id for r in unmastered_records]
-        unmastered_words = [w for w in studied_words if w.id in unmastered_word_ids]
-        
-        # 学习顺序：未掌握的单词 -> 未学习的单词 -> 已掌握的单词
-        study_order = unmastered_words + unstudied_words + \
-                     [w for w in studied_words if w.id not in unmastered_word_ids]
+        study_order = [word for word, _ in rows]
+        unmastered_count = sum(1 for _, bucket in rows if bucket == StudyService.BUCKET_UNMASTERED)
+        unstudied_count = sum(1 for _, bucket in rows if bucket == StudyService.BUCKET_UNSTUDIED)
         
         return {
             'session_id': f"study_{user_id}_{datetime.now().timestamp()}",
             'user': user.to_dict(),
             'words': [w.to_dict() for w in study_order],
             'total_count': len(study_order),
-            'unstudied_count': len(unstudied_words),
-            'unmastered_count': len(unmastered_words)
+            'unstudied_count': unstudied_count,
+            'unmastered_count': unmastered_count
         }, None
     
+    @staticmethod
+    def _query_study_order(user_id, grade, unit=None):
+        """查询学习顺序
+        
+        Returns:
+            list: (单词对象, 分组) 元组列表，已按分组和单元、ID排序
+        """
+        # 同一单词可能存在多条历史记录，任一记录未掌握即视为未掌握
+        mastery_level = db.func.min(StudyRecord.mastery_level)
+        bucket = db.case(
+            (mastery_level.is_(None), StudyService.BUCKET_UNSTUDIED),
+            (mastery_level < 4, StudyService.BUCKET_UNMASTERED),
+            else_=StudyService.BUCKET_MASTERED
+        ).label('bucket')
+        
+        query = db.session.query(Word, bucket).outerjoin(
+            StudyRecord,
+            db.and_(StudyRecord.word_id == Word.id, StudyRecord.user_id == user_id)
+        ).filter(Word.grade == grade)
+        
+        if unit:
+            query = query.filter(Word.unit == unit)
+        
+        return query.group_by(Word.id).order_by(bucket, Word.unit, Word.id).all()
+    
     @staticmethod
     def record_study_progress(user_id, word_id, mastery_level):
         """记录学习进度"""
@@ -65,11 +89,109 @@ class StudyService:
         if not word:
             return None, "单词不存在"
         
+        # 启用写缓冲时只确认入队，由后台线程批量写入
+        if study_buffer.enabled:
+            event = study_buffer.add(user_id, word_id, mastery_level)
+            return {**event, 'queued': True}, None
+        
         # 更新或创建学习记录
         record = StudyRecord.update_or_create(user_id, word_id, mastery_level)
+        UserCacheService.bump_user_generation(user_id)
+        
+        # 提交后对象已过期，一次查询连同单词一起重新加载，避免序列化时再懒加载单词
+        record = db.session.get(
+            StudyRecord, inspect(record).identity,
+            options=[joinedload(StudyRecord.word)],
+            populate_existing=True
+        )
         
         return record.to_dict(), None
     
+    @staticmethod
+    def record_study_progress_batch(user_id, items):
+        """批量记录学习进度
+        
+        Args:
+            user_id (int): 用户ID
+            items (list): {'word_id', 'mastery_level', 'studied_at'(可选, ISO格式)} 字典列表
+        
+        Returns:
+            tuple: (写入结果, 错误信息)
+        """
+        from app.services.cache_service import WordCacheService
+        
+        if not isinstance(items, list) or not items:
+            return None, "请提供学习进度列表"
+        
+        if len(items) > StudyService.MAX_BATCH_SIZE:
+            return None, f"单次最多提交{StudyService.MAX_BATCH_SIZE}条学习进度"
+        
+        user = User.query.get(user_id)
+        if not user:
+            return None, "用户不存在"
+        
+        # 在内存中对照词库校验，不逐条查询数据库
+        catalog_word_ids = set(WordCacheService.get_catalog_word_ids())
+        now = datetime.utcnow()
+        
+        valid_items = []
+        rejected = []
+        for index, item in enumerate(items):
+            item = item if isinstance(item, dict) else {}
+            word_id = safe_int(item.get('word_id'))
+            mastery_level = safe_int(item.get('mastery_level'))
+            
+            if word_id not in catalog_word_ids:
+                rejected.append({'index': index, 'error': '单词不存在'})
+                continue
+            if mastery_level is None or not (1 <= mastery_level <= 5):
+                rejected.append({'index': index, 'error': '掌握程度必须在1-5之间'})
+                continue
+            
+            studied_at = StudyService._parse_studied_at(item.get('studied_at'), now)
+            if studied_at is None:
+                rejected.append({'index': index, 'error': '学习时间格式无效'})
+                continue
+            
+            valid_items.append({
+                'word_id': word_id,
+                'mastery_level': mastery_level,
+                'studied_at': studied_at
+            })
+        
+        if study_buffer.enabled:
+            for item in valid_items:
+                study_buffer.add(user_id, item['word_id'], item['mastery_level'], item['studied_at'])
+            written = 0
+        else:
+            written = StudyRecord.bulk_upsert(user_id, valid_items)
+            UserCacheService.bump_user_generation(user_id)
+        
+        return {
+            'accepted_count': len(valid_items),
+            'written_count': written,
+            'rejected_count': len(rejected),
+            'rejected': rejected,
+            'queued': study_buffer.enabled
+        }, None
+    
+    @staticmethod
+    def _parse_studied_at(value, now):
+        """解析客户端提交的学习时间（转为UTC，不晚于当前时间）"""
+        if not value:
+            return now
+        
+        try:
+            studied_at = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+        except ValueError:
+            return None
+        
+        if studied_at.tzinfo is not None:
+            studied_at = studied_at.astimezone(timezone.utc).replace(tzinfo=None)
+        
+        # 客户端时钟可能超前，最多记到当前时间
+        return min(studied_at, now)
+    
     @staticmethod
     def get_study_progress(user_id, grade=None, unit=None):
         """获取学习进度"""
@@ -80,7 +202,8 @@ class StudyService:
         progress_data = StudyRecord.get_user_progress(user_id, grade, unit)
         
         # 获取最近学习的单词
-        recent_records = StudyRecord.query.filter_by(user_id=user_id)\
+        recent_records = StudyRecord.query.options(joinedload(StudyRecord.word))\
+            .filter_by(user_id=user_id)\
             .order_by(StudyRecord.studied_at.desc())\
             .limit(10).all()
         
@@ -97,72 +220,86 @@ class StudyService:
         if not user:
             return [], "用户不存在"
         
-        # 获取用户未掌握的单词（掌握程度<4）
-        unmastered_records = StudyRecord.query.filter(
-            StudyRecord.user_id == user_id,
-            StudyRecord.mastery_level < 4
-        ).order_by(StudyRecord.studied_at.asc()).limit(count).all()
-        
-        recommended_words = [r.word for r in unmastered_records if r.word]
+        # 优先推荐到期待复习的单词（按到期时间先后）
+        due_records = StudyRecord.get_due_records(user_id, limit=count)
+        recommended_words = [r.word for r in due_records if r.word]
         
-        # 如果未掌握的单词不够，补充该年级的新单词
+        # 如果到期单词不够，补充该年级尚未学习的新单词
         if len(recommended_words) < count:
-            studied_word_ids = [r.word_id for r in 
-                               StudyRecord.query.filter_by(user_id=user_id).all()]
-            
-            new_words = WordService.get_words_by_criteria(
-                grade=user.grade,
-                limit=count - len(recommended_words)
+            recommended_words.extend(
+                StudyService._get_unstudied_words(user_id, user.grade, count - len(recommended_words))
             )
-            
-            for word in new_words:
-                if word.id not in studied_word_ids:
-                    recommended_words.append(word)
-                    if len(recommended_words) >= count:
-                        break
         
         return [w.to_dict() for w in recommended_words], None
     
+    @staticmethod
+    def _get_unstudied_words(user_id, grade, limit):
+        """获取用户尚未学习的单词"""
+        studied = db.session.query(StudyRecord.id).filter(
+            StudyRecord.user_id == user_id,
+            StudyRecord.word_id == Word.id
+        ).exists()
+        
+        return Word.query.filter(Word.grade == grade, ~studied)\
+            .order_by(Word.unit, Word.id)\
+            .limit(limit).all()
+    
+    @staticmethod
+    def get_due_words(user_id, count=10):
+        """获取接下来到期的N个复习单词（含音频地址）"""
+        user = User.query.get(user_id)
+        if not user:
+            return None, "用户不存在"
+        
+        now = datetime.utcnow()
+        due_records = StudyRecord.get_due_records(user_id, limit=count, now=now)
+        
+        words = []
+        for record in due_records:
+            if not record.word:
+                continue
+            word_data = record.word.to_dict()
+            word_data.update({
+                'mastery_level': record.mastery_level,
+                'due_at': record.due_at.isoformat() if record.due_at else None,
+                'interval_days': record.interval_days,
+                'ease': record.ease
+            })
+            words.append(word_data)
+        
+        # 当天的待复习总数优先读取夜间预计算结果
+        precomputed = UserDueCount.get_for_user(user_id, now)
+        
+        return {
+            'words': words,
+            'count': len(words),
+            'due_now': StudyRecord.count_due(user_id, now),
+            'due_today': precomputed.due_count if precomputed else None
+        }, None
+    
     @staticmethod
     def get_study_statistics(user_id, days=7):
-        """获取学习统计"""
+        """获取学习统计（按天统计来自学习事件日志，在数据库中分组）"""
         user = User.query.get(user_id)
         if not user:
             return None, "用户不存在"
         
+        # 统计包含今天在内的最近N个自然日
         end_date = datetime.utcnow()
-        start_date = end_date - timedelta(days=days)
+        start_day = end_date.date() - timedelta(days=max(days, 1) - 1)
         
-        # 获取时间段内的学习记录
-        records = StudyRecord.query.filter(
-            StudyRecord.user_id == user_id,
-            StudyRecord.studied_at >= start_date
-        ).all()
-        
-        # 按日期统计
-        daily_stats = {}
-        for record in records:
-            date_key = record.studied_at.strftime('%Y-%m-%d')
-            if date_key not in daily_stats:
-                daily_stats[date_key] = {
-                    'date': date_key,
-                    'studied_count': 0,
-                    'mastered_count': 0
-                }
-            
-            daily_stats[date_key]['studied_count'] += 1
-            if record.mastery_level >= 4:
-                daily_stats[date_key]['mastered_count'] += 1
+        daily_stats = StudyEvent.get_daily_stats(user_id, start_day, end_date.date())
         
         # 总体统计
         total_progress = StudyRecord.get_user_progress(user_id)
         
         return {
             'user': user.to_dict(),
-            'daily_stats': list(daily_stats.values()),
+            'daily_stats': daily_stats,
+            'streak_days': StudyEvent.get_streak(user_id, end_date),
             'total_progress': total_progress,
             'period': {
-                'start_date': start_date.strftime('%Y-%m-%d'),
+                'start_date': start_day.strftime('%Y-%m-%d'),
                 'end_date': end_date.strftime('%Y-%m-%d'),
                 'days': days
             }
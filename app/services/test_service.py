@@ -1,8 +1,10 @@
 from app.models.test_record import TestRecord
 from app.models.user import User
-from app.models.test_record import TestRecord
+from app.models.word_stat import WordStat
 from app.services.word_service import WordService
+from app.services.cache_service import UserCacheService
 from app import db
+import heapq
 import random
 import uuid
 from datetime import datetime
@@ -14,7 +16,8 @@ class TestService:
     _test_sessions = {}
     
     @staticmethod
-    def generate_test(user_id, test_type, grade=None, unit=None, question_count=10):
+    def generate_test(user_id, test_type, grade=None, unit=None, question_count=10,
+                      weight_by_difficulty=False):
         """生成测验"""
         # 安全处理参数
         if question_count is None or question_count <= 0:
@@ -41,8 +44,11 @@ class TestService:
         if question_count == 0:
             return None, "没有找到符合条件的单词"
         
-        # 随机选择单词
-        test_words = random.sample(words, question_count)
+        # 随机选择单词（可按难度加权，难词更容易被抽中）
+        if weight_by_difficulty:
+            test_words = TestService._weighted_sample_by_difficulty(words, question_count)
+        else:
+            test_words = random.sample(words, question_count)
         
         # 生成测验ID
         test_id = str(uuid.uuid4())
@@ -83,6 +89,19 @@ class TestService:
             'questions': [TestService._format_question_for_client(q) for q in questions]
         }, None
     
+    @staticmethod
+    def _weighted_sample_by_difficulty(words, count):
+        """按单词难度加权的无放回抽样（Efraimidis-Spirakis算法）"""
+        difficulty_map = WordStat.get_difficulty_map([w.id for w in words])
+        default_difficulty = WordStat.compute_difficulty(0, 0)
+        
+        keyed_words = []
+        for word in words:
+            weight = difficulty_map.get(word.id, default_difficulty)
+            keyed_words.append((random.random() ** (1.0 / max(weight, 0.01)), word))
+        
+        return [word for _, word in heapq.nlargest(count, keyed_words, key=lambda item: item[0])]
+    
     @staticmethod
     def _generate_cn_to_en_question(correct_word, all_words):
         """生成中译英题目"""
@@ -145,6 +164,14 @@ class TestService:
         # 保存答案
         session['answers'][str(question_id)] = answer
         
+        # 记录首次作答用时（距上一次作答或测验开始）
+        now = datetime.now()
+        answer_times = session.setdefault('answer_times', {})
+        if str(question_id) not in answer_times:
+            last_answer_at = session.get('last_answer_at', session['start_time'])
+            answer_times[str(question_id)] = int((now - last_answer_at).total_seconds() * 1000)
+        session['last_answer_at'] = now
+        
         return {'success': True}, None
     
     @staticmethod
@@ -162,8 +189,11 @@ class TestService:
         questions = session['questions']
         answers = session['answers']
         
+        answer_times = session.get('answer_times', {})
+        
         correct_count = 0
         wrong_word_ids = []
+        word_attempts = []
         
         for question in questions:
             question_id = str(question['id'])
@@ -181,13 +211,19 @@ class TestService:
                 else:
                     wrong_word_ids.append(question['word_id'])
             else:
+                is_correct = False
                 wrong_word_ids.append(question['word_id'])
+            
+            word_attempts.append((question['word_id'], not is_correct, answer_times.get(question_id)))
 
         
         # 计算测试时长
         end_time = datetime.now()
         duration = int((end_time - session['start_time']).total_seconds())
         
+        # 累加单词难度统计，与测验记录在同一事务中提交
+        WordStat.record_attempts(word_attempts)
+        
         # 保存测验记录到数据库
         test_record = TestRecord.create_test_record(
             user_id=session['user_id'],
@@ -199,6 +235,7 @@ class TestService:
             grade=session['grade'],
             unit=session['unit']
         )
+        UserCacheService.bump_user_generation(session['user_id'])
         
         # 更新会话状态
         session['status'] = 'completed'
@@ -253,11 +290,10 @@ class TestService:
         if not user:
             return None, "用户不存在"
         
-        # 最近30天的统计
-        stats_30days = TestRecord.get_user_test_stats(user_id, days=30)
-        
-        # 最近7天的统计
-        stats_7days = TestRecord.get_user_test_stats(user_id, days=7)
+        # 最近30天和最近7天的统计（一次汇总表查询）
+        window_stats = TestRecord.get_user_test_stats_windows(user_id, (30, 7))
+        stats_30days = window_stats[30]
+        stats_7days = window_stats[7]
         
         # 获取最近的测验记录用于趋势分析
         recent_tests = TestRecord.query.filter_by(user_id=user_id)\
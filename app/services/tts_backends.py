@@ -0,0 +1,109 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import shutil
+import subprocess
+from flask import current_app
+import logging
+
+logger = logging.getLogger(__name__)
+
+class TTSBackend:
+    """语音合成后端接口
+    
+    合成结果按内容哈希存入共享的对象目录（objects/），音频清单 audio_assets 以
+    AudioStore.source_key（后端名、语言和文本）为键记录来源，后端名即缓存命名空间：
+    切换后端会重新合成，内容相同的音频只保存一份。
+    """
+    
+    name = None
+    extension = 'mp3'
+    
+    def synthesize(self, text, lang, file_path):
+        """合成语音并写入 file_path，失败时抛出异常"""
+        raise NotImplementedError
+    
+    def is_available(self):
+        """后端在当前环境中是否可用"""
+        return True
+
+class GTTSBackend(TTSBackend):
+    """Google 在线语音合成（需要网络）"""
+    
+    name = 'gtts'
+    extension = 'mp3'
+    
+    def synthesize(self, text, lang, file_path):
+        from gtts import gTTS
+        
+        gTTS(text=text, lang=lang, slow=False).save(file_path)
+    
+    def is_available(self):
+        try:
+            import gtts  # noqa: F401
+            return True
+        except ImportError:
+            return False
+
+class EspeakBackend(TTSBackend):
+    """espeak-ng 本地离线语音合成（子进程调用，无需网络）"""
+    
+    name = 'espeak'
+    extension = 'wav'
+    
+    # 语言代码到 espeak-ng 发音人的映射
+    VOICES = {'en': 'en-us', 'zh': 'cmn'}
+    
+    def __init__(self, command=None, voice=None, speed=None, timeout=None):
+        self.command = command or 'espeak-ng'
+        self.voice = voice
+        self.speed = speed or 140
+        self.timeout = timeout or 10
+    
+    def _executable(self):
+        """查找 espeak-ng 可执行文件，找不到时兼容旧版 espeak"""
+        return shutil.which(self.command) or shutil.which('espeak')
+    
+    def synthesize(self, text, lang, file_path):
+        executable = self._executable()
+        if not executable:
+            raise RuntimeError(f"未找到语音合成程序: {self.command}")
+        
+        voice = self.voice or self.VOICES.get(lang, lang)
+        # 文本作为独立参数传入，不经过shell；'--' 之后的内容不会被当作选项
+        result = subprocess.run(
+            [executable, '-v', voice, '-s', str(self.speed), '-w', file_path, '--', text],
+            capture_output=True,
+            timeout=self.timeout
+        )
+        if result.returncode != 0:
+            raise RuntimeError(result.stderr.decode('utf-8', 'replace').strip() or f"退出码 {result.returncode}")
+    
+    def is_available(self):
+        return self._executable() is not None
+
+BACKENDS = {
+    GTTSBackend.name: GTTSBackend,
+    EspeakBackend.name: EspeakBackend
+}
+
+def get_backend(name=None):
+    """按名称（默认读取 TTS_BACKEND 配置）创建语音合成后端
+    
+    Raises:
+        ValueError: 后端名称未知
+    """
+    config = current_app.config
+    name = name or config.get('TTS_BACKEND', GTTSBackend.name)
+    
+    if name == EspeakBackend.name:
+        return EspeakBackend(
+            command=config.get('TTS_ESPEAK_COMMAND'),
+            voice=config.get('TTS_ESPEAK_VOICE'),
+            speed=config.get('TTS_ESPEAK_SPEED'),
+            timeout=config.get('TTS_ESPEAK_TIMEOUT')
+        )
+    if name in BACKENDS:
+        return BACKENDS[name]()
+    
+    raise ValueError(f"未知的语音合成后端: {name}")
@@ -2,23 +2,63 @@
 # -*- coding: utf-8 -*-
 
 import os
-import hashlib
-from gtts import gTTS
+import time
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from flask import current_app
+from app.services.tts_backends import get_backend
+from app.services.audio_store import AudioStore
 import logging
 
 logger = logging.getLogger(__name__)
 
+class TokenBucket:
+    """令牌桶限流器（线程安全）
+    
+    以固定速率补充令牌，最多积累 capacity 个，允许短时突发；
+    取不到令牌时阻塞等待。
+    """
+    
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity or max(1, rate))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def acquire(self):
+        """取一个令牌，必要时等待"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
 class TTSService:
-    """文本转语音服务"""
+    """文本转语音服务
+    
+    合成由可替换的后端完成（TTS_BACKEND 配置）；音频按内容哈希存入 AudioStore，
+    清单以 (后端, 语言, 文本) 为键，不同后端的缓存互不复用。
+    """
+    
+    AUDIO_URL_PREFIX = AudioStore.URL_PREFIX
     
     @staticmethod
-    def generate_audio(text, lang='en'):
-        """生成音频文件
+    def generate_audio(text, lang='en', backend=None, force=False):
+        """生成音频文件（写入音频清单，不提交事务，由调用方提交）
         
         Args:
             text (str): 要转换的文本
             lang (str): 语言代码，默认为英语
+            backend (TTSBackend): 语音合成后端，默认按配置创建
+            force (bool): 忽略清单中已有的音频，重新合成
         
         Returns:
             tuple: (音频文件URL, 错误信息)
@@ -27,28 +67,27 @@ class TTSService:
             if not text or not text.strip():
                 return None, "文本不能为空"
             
-            # 生成文件名（基于文本内容的哈希值）
-            text_hash = hashlib.md5(text.encode('utf-8')).hexdigest()
-            filename = f"{text_hash}_{lang}.mp3"
-            
-            audio_folder = current_app.config.get('AUDIO_FOLDER', 'app/static/audio')
-            file_path = os.path.join(audio_folder, filename)
+            backend = backend or get_backend()
+            source_key = AudioStore.source_key(backend.name, text, lang)
             
-            # 检查文件是否已存在
-            if os.path.exists(file_path):
-                audio_url = f"/static/audio/{filename}"
-                return audio_url, None
+            # 检查清单中是否已有该文本的音频
+            if not force:
+                asset = AudioStore.find_assets([source_key]).get(source_key)
+                if asset:
+                    return AudioStore.url_for_path(asset.path), None
             
-            # 确保音频目录存在
-            os.makedirs(audio_folder, exist_ok=True)
+            if not backend.is_available():
+                return None, f"语音合成后端不可用: {backend.name}"
             
             # 生成音频文件
-            tts = gTTS(text=text, lang=lang, slow=False)
-            tts.save(file_path)
+            audio_folder = current_app.config.get('AUDIO_FOLDER', 'app/static/audio')
+            meta = AudioStore.store_file(
+                audio_folder, backend.extension, lambda tmp_path: backend.synthesize(text, lang, tmp_path)
+            )
+            AudioStore.record_asset(source_key, backend.name, meta)
             
-            # 返回音频URL
-            audio_url = f"/static/audio/{filename}"
-            logger.info(f"成功生成音频文件: {filename}")
+            audio_url = AudioStore.url_for_path(meta['path'])
+            logger.info(f"成功生成音频文件: {audio_url}")
             
             return audio_url, None
             
@@ -58,11 +97,12 @@ class TTSService:
             return None, error_msg
     
     @staticmethod
-    def generate_word_audio(word):
+    def generate_word_audio(word, force=False):
         """为单词生成音频文件
         
         Args:
             word (Word): 单词对象
+            force (bool): 忽略已有音频，重新合成
         
         Returns:
             tuple: (音频文件URL, 错误信息)
@@ -70,47 +110,156 @@ class TTSService:
         if not word or not word.word:
             return None, "无效的单词对象"
         
-        return TTSService.generate_audio(word.word, 'en')
+        return TTSService.generate_audio(word.word, 'en', force=force)
     
     @staticmethod
-    def batch_generate_audio(words):
-        """批量生成音频文件
+    def batch_generate_audio(words, backend=None):
+        """并发批量生成音频文件
+        
+        相同文本只合成一次；合成在有界线程池中执行，每次请求合成引擎前从令牌桶取令牌限流，
+        失败后按指数退避重试。清单中已有的文本不再合成；
+        工作线程只写音频文件，音频清单和单词的音频URL在调用线程中更新（由调用方提交）。
         
         Args:
             words (list): 单词对象列表
+            backend (TTSBackend): 语音合成后端，默认按配置创建；
+                                  可替换为基准测试用的模拟引擎
         
         Returns:
-            dict: 生成结果统计
+            dict: 生成结果统计，results 为逐个单词的结果
         """
+        config = current_app.config
+        audio_folder = config.get('AUDIO_FOLDER', 'app/static/audio')
+        
+        backend = backend or get_backend()
+        if not backend.is_available():
+            return {
+                'success_count': 0,
+                'error_count': len(words),
+                'errors': [f"语音合成后端不可用: {backend.name}"],
+                'results': []
+            }
+        
+        bucket = TokenBucket(config.get('TTS_RATE_LIMIT', 5), config.get('TTS_RATE_BURST', 5))
+        max_retries = config.get('TTS_MAX_RETRIES', 3)
+        retry_delay = config.get('TTS_RETRY_BASE_DELAY', 0.5)
+        
+        start = time.perf_counter()
+        
+        source_keys = {}
+        for word in words:
+            if word and word.word and word.word.strip():
+                source_keys.setdefault(word.word, AudioStore.source_key(backend.name, word.word, 'en'))
+        
+        # 一次查询找出清单中已有音频的文本
+        existing = AudioStore.find_assets(source_keys.values())
+        texts = {}
+        for text, source_key in source_keys.items():
+            if source_key in existing:
+                texts[text] = {
+                    'status': 'cached',
+                    'audio_url': AudioStore.url_for_path(existing[source_key].path),
+                    'attempts': 0,
+                    'error': None
+                }
+        
+        with ThreadPoolExecutor(max_workers=config.get('TTS_MAX_WORKERS', 4), thread_name_prefix='tts') as executor:
+            futures = {
+                text: executor.submit(
+                    TTSService._synthesize_with_retry,
+                    text, 'en', audio_folder, backend, bucket, max_retries, retry_delay
+                )
+                for text in source_keys if text not in texts
+            }
+            for text, future in futures.items():
+                outcome = future.result()
+                meta = outcome.pop('meta', None)
+                if meta:
+                    AudioStore.record_asset(source_keys[text], backend.name, meta)
+                texts[text] = outcome
+        
         results = {
             'success_count': 0,
             'error_count': 0,
-            'errors': []
+            'errors': [],
+            'results': []
         }
         
         for word in words:
+            outcome = texts.get(word.word) if word and word.word else None
+            if outcome is None:
+                outcome = {'status': 'failed', 'audio_url': None, 'attempts': 0, 'error': '文本不能为空'}
+            
+            results['results'].append({'word_id': word.id, 'word': word.word, **outcome})
+            
+            if outcome['status'] == 'failed':
+                results['error_count'] += 1
+                results['errors'].append(f"单词 '{word.word}': {outcome['error']}")
+            else:
+                word.audio_url = outcome['audio_url']
+                results['success_count'] += 1
+        
+        results['elapsed_ms'] = round((time.perf_counter() - start) * 1000, 1)
+        return results
+    
+    @staticmethod
+    def _synthesize_with_retry(text, lang, audio_folder, backend, bucket, max_retries, retry_delay):
+        """合成单个文本，失败后指数退避重试（在工作线程中执行，不访问应用上下文）
+        
+        Returns:
+            dict: {'status': created/failed, 'audio_url', 'attempts', 'error', 'meta'}，meta 为存储元数据
+        """
+        error = None
+        for attempt in range(1, max_retries + 2):
+            bucket.acquire()
             try:
-                audio_url, error = TTSService.generate_word_audio(word)
+                meta = AudioStore.store_file(
+                    audio_folder, backend.extension, lambda tmp_path: backend.synthesize(text, lang, tmp_path)
+                )
+                return {
+                    'status': 'created',
+                    'audio_url': AudioStore.url_for_path(meta['path']),
+                    'attempts': attempt,
+                    'error': None,
+                    'meta': meta
+                }
+            except Exception as e:
+                error = str(e)
+                if attempt > max_retries:
+                    break
+                # 指数退避并加入随机抖动，避免并发重试同时打到合成服务
+                time.sleep(retry_delay * (2 ** (attempt - 1)) * random.uniform(0.5, 1.5))
                 
-                if error:
-                    results['error_count'] += 1
-                    results['errors'].append(f"单词 '{word.word}': {error}")
-                else:
-                    # 更新单词的音频URL
-                    if audio_url and not word.audio_url:
-                        word.audio_url = audio_url
-                        results['success_count'] += 1
+        logger.warning(f"音频生成失败（已尝试 {max_retries + 1} 次）: {text}: {error}")
+        return {'status': 'failed', 'audio_url': None, 'attempts': max_retries + 1, 'error': f"音频生成失败: {error}"}
                 
-            except Exception as e:
-                results['error_count'] += 1
-                results['errors'].append(f"单词 '{word.word}': {str(e)}")
+    @staticmethod
+    def get_audio_path(audio_url):
+        """把音频URL解析为音频目录中的文件路径
         
-        return results
+        兼容旧版直接存放在音频目录下的文件；URL不在音频目录内时返回None。
+        """
+        if not audio_url:
+            return None
+        
+        relative_path = audio_url.split('?', 1)[0]
+        if relative_path.startswith(TTSService.AUDIO_URL_PREFIX):
+            relative_path = relative_path[len(TTSService.AUDIO_URL_PREFIX):]
+        else:
+            relative_path = os.path.basename(relative_path)
+        
+        audio_folder = os.path.abspath(current_app.config.get('AUDIO_FOLDER', 'app/static/audio'))
+        file_path = os.path.abspath(os.path.join(audio_folder, *relative_path.split('/')))
+        if os.path.commonpath([audio_folder, file_path]) != audio_folder or file_path == audio_folder:
+            return None
+        return file_path
     
     @staticmethod
     def delete_audio_file(audio_url):
         """删除音频文件
         
+        内容寻址存储中的文件可能被多个单词共用，不在这里删除，由垃圾回收清理。
+        
         Args:
             audio_url (str): 音频文件URL
         
@@ -118,17 +267,15 @@ class TTSService:
             bool: 删除是否成功
         """
         try:
-            if not audio_url:
+            if not audio_url or AudioStore.is_object_url(audio_url):
                 return True
             
-            # 从URL获取文件名
-            filename = os.path.basename(audio_url)
-            audio_folder = current_app.config.get('AUDIO_FOLDER', 'app/static/audio')
-            file_path = os.path.join(audio_folder, filename)
+            # 从URL获取文件路径
+            file_path = TTSService.get_audio_path(audio_url)
             
-            if os.path.exists(file_path):
+            if file_path and os.path.exists(file_path):
                 os.remove(file_path)
-                logger.info(f"成功删除音频文件: {filename}")
+                logger.info(f"成功删除音频文件: {audio_url}")
             
             return True
             
@@ -138,7 +285,7 @@ class TTSService:
     
     @staticmethod
     def get_audio_info(audio_url):
-        """获取音频文件信息
+        """获取音频文件信息（读取音频清单，旧版文件读取文件状态）
         
         Args:
             audio_url (str): 音频文件URL
@@ -150,17 +297,29 @@ class TTSService:
             if not audio_url:
                 return None
             
-            filename = os.path.basename(audio_url)
-            audio_folder = current_app.config.get('AUDIO_FOLDER', 'app/static/audio')
-            file_path = os.path.join(audio_folder, filename)
+            if AudioStore.is_object_url(audio_url):
+                asset = AudioStore.get_asset_by_url(audio_url)
+                if not asset:
+                    return None
+                return {
+                    'filename': asset.path.rsplit('/', 1)[-1],
+                    'size': asset.size,
+                    'created_time': asset.created_at.timestamp() if asset.created_at else None,
+                    'url': audio_url,
+                    'duration_ms': asset.duration_ms,
+                    'backend': asset.backend,
+                    'checksum': asset.checksum
+                }
+            
+            file_path = TTSService.get_audio_path(audio_url)
             
-            if not os.path.exists(file_path):
+            if not file_path or not os.path.exists(file_path):
                 return None
             
             stat = os.stat(file_path)
             
             return {
-                'filename': filename,
+                'filename': os.path.basename(file_path),
                 'size': stat.st_size,
                 'created_time': stat.st_ctime,
                 'url': audio_url
@@ -189,36 +189,14 @@ class UserService:
     
     @staticmethod
     def get_user_detailed_info(user_id):
-        """获取用户详细信息"""
-        user = UserService.get_user_by_id(user_id)
-        if not user:
-            raise NotFoundError('用户不存在')
+        """获取用户详细信息（与仪表板共用按用户缓存的汇总文档）"""
+        from app.services.dashboard_service import DashboardService
         
-        # 尝试使用缓存获取学习进度
-        try:
-            from app.services.cache_service import UserCacheService
-            cached_progress = UserCacheService.get_user_progress(user_id)
-            if cached_progress:
-                study_progress = cached_progress
-            else:
-                study_progress = user.get_study_progress()
-        except Exception as e:
-            logger.warning(f"缓存查询失败，使用数据库查询: {str(e)}")
-            study_progress = user.get_study_progress()
-        
-        # 获取最近测验记录
-        recent_tests = user.get_recent_tests(10)
-        
-        # 获取测验统计
-        from app.models.test_record import TestRecord
-        test_stats = TestRecord.get_user_test_stats(user_id, days=30)
+        summary, error = DashboardService.get_dashboard(user_id)
+        if error:
+            raise NotFoundError(error)
         
-        return {
-            'user': user.to_dict(),
-            'study_progress': study_progress,
-            'recent_tests': [test.to_dict() for test in recent_tests],
-            'test_statistics': test_stats
-        }
+        return summary
     
     @staticmethod
     def update_user_study_progress(user_id, unit=None):
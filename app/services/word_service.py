@@ -1,4 +1,8 @@
 from app.models.word import Word
+from app.models.study_record import StudyRecord
+from app.models.progress_counter import UserProgressCounter
+from app.models.word_change import WordChange
+from app.models.audio_asset import AudioAsset
 from app import db
 from sqlalchemy import func
 import random
@@ -169,13 +173,24 @@ class WordService:
         if not word:
             return None
         
+        old_location = (word.grade, word.unit)
+        
         # 更新字段
         for key, value in word_data.items():
             if hasattr(word, key) and key != 'id':
                 setattr(word, key, value)
         
         word.updated_at = db.func.now()
+        
+        # 单词调整年级或单元后，重建学过该单词的用户的进度计数器
+        learner_ids = []
+        if (word.grade, word.unit) != old_location:
+            db.session.flush()
+            learner_ids = WordService._get_learner_ids(word_id)
+            UserProgressCounter.rebuild(learner_ids, commit=False)
+        
         db.session.commit()
+        WordService._invalidate_learners(learner_ids)
         
         # 清除相关缓存
         try:
@@ -193,8 +208,15 @@ class WordService:
         if not word:
             return False
         
+        learner_ids = WordService._get_learner_ids(word_id)
+        
         db.session.delete(word)
+        db.session.flush()
+        
+        # 学习记录随单词级联删除，重建相关用户的进度计数器
+        UserProgressCounter.rebuild(learner_ids, commit=False)
         db.session.commit()
+        WordService._invalidate_learners(learner_ids)
         
         # 清除相关缓存
         try:
@@ -205,6 +227,20 @@ class WordService:
         
         return True
     
+    @staticmethod
+    def _get_learner_ids(word_id):
+        """获取学习过该单词的用户ID"""
+        return [row[0] for row in db.session.query(StudyRecord.user_id).filter(
+            StudyRecord.word_id == word_id
+        ).distinct().all()]
+    
+    @staticmethod
+    def _invalidate_learners(learner_ids):
+        """学习进度计数器重建后，使相关用户的缓存失效"""
+        from app.services.cache_service import UserCacheService
+        for user_id in learner_ids:
+            UserCacheService.bump_user_generation(user_id)
+    
     @staticmethod
     def bulk_create_words(words_data):
         """批量创建单词"""
@@ -235,6 +271,43 @@ class WordService:
         
         return words
     
+    @staticmethod
+    def get_changes(since=0, limit=500):
+        """获取某版本之后的词库变更（增量同步）
+        
+        Args:
+            since (int): 客户端已同步到的版本号，0 表示首次同步
+            limit (int): 本次最多返回的变更数
+        
+        Returns:
+            dict: {'changes', 'next_since', 'latest_version', 'has_more', 'reset'}；
+                  reset 为 True 表示客户端版本号超出服务器记录（如数据库被重建），
+                  客户端应清空本地词库，本次从头返回
+        """
+        latest_version = WordChange.get_latest_version()
+        reset = since > latest_version
+        if reset:
+            since = 0
+        
+        rows = WordChange.get_changes_since(since, limit + 1)
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        
+        changes = []
+        for change, word in rows:
+            if change.op == WordChange.OP_UPSERT and word is not None:
+                changes.append({'version': change.version, 'op': WordChange.OP_UPSERT, 'word': word.to_dict()})
+            else:
+                changes.append({'version': change.version, 'op': WordChange.OP_DELETE, 'word_id': change.word_id})
+        
+        return {
+            'changes': changes,
+            'next_since': rows[-1][0].version if rows else since,
+            'latest_version': latest_version,
+            'has_more': has_more,
+            'reset': reset
+        }
+    
     @staticmethod
     def get_word_statistics():
         """获取词库统计信息"""
@@ -259,6 +332,21 @@ class WordService:
             'unit_stats': [{'grade': g, 'unit': u, 'count': c} for g, u, c in unit_stats]
         }
     
+    @staticmethod
+    def get_hardest_words(grade=None, limit=20):
+        """获取难度最高的单词（基于增量维护的单词难度统计）"""
+        from app.models.word_stat import WordStat
+        
+        stats = WordStat.get_hardest_words(grade=grade, limit=limit)
+        
+        results = []
+        for stat in stats:
+            item = stat.to_dict()
+            item['word'] = stat.word.to_dict() if stat.word else None
+            results.append(item)
+        
+        return results
+    
     @staticmethod
     def generate_word_audio(word_id):
         """为单词生成音频文件"""
@@ -272,8 +360,8 @@ class WordService:
         if word.audio_url:
             TTSService.delete_audio_file(word.audio_url)
         
-        # 生成新的音频文件
-        audio_url, error = TTSService.generate_word_audio(word)
+        # 重新合成音频文件（忽略音频清单中已有的结果）
+        audio_url, error = TTSService.generate_word_audio(word, force=True)
         
         if error:
             return None, error
@@ -348,40 +436,45 @@ class WordService:
     
     @staticmethod
     def validate_audio_files():
-        """验证数据库中的音频文件是否存在
+        """根据音频清单验证单词的音频是否存在（一次查询，不逐个访问文件系统）
+        
+        不在清单中的旧版音频标记为 unindexed，可运行 flask import-audio 导入存储。
         
         Returns:
             dict: 验证结果
         """
-        import os
-        from flask import current_app
+        from app.services.audio_store import AudioStore
         
-        words_with_audio = Word.query.filter(
+        audio_path = db.func.substr(Word.audio_url, len(AudioStore.URL_PREFIX) + 1)
+        indexed = db.exists().where(AudioAsset.path == audio_path)
+        
+        rows = db.session.query(Word.id, Word.word, Word.audio_url, indexed).filter(
             Word.audio_url.isnot(None),
             Word.audio_url != ''
-        ).all()
+        ).order_by(Word.id).all()
         
         results = {
-            'total_checked': len(words_with_audio),
+            'total_checked': len(rows),
             'valid_count': 0,
             'invalid_count': 0,
+            'unindexed_count': 0,
             'invalid_words': []
         }
         
-        audio_folder = current_app.config.get('AUDIO_FOLDER', 'app/static/audio')
-        
-        for word in words_with_audio:
-            filename = os.path.basename(word.audio_url)
-            file_path = os.path.join(audio_folder, filename)
-            
-            if os.path.exists(file_path):
+        for word_id, word, audio_url, is_indexed in rows:
+            if is_indexed and AudioStore.is_object_url(audio_url):
                 results['valid_count'] += 1
-            else:
-                results['invalid_count'] += 1
-                results['invalid_words'].append({
-                    'id': word.id,
-                    'word': word.word,
-                    'audio_url': word.audio_url
-                })
+                continue
+        
+            reason = 'missing' if AudioStore.is_object_url(audio_url) else 'unindexed'
+            results['invalid_count'] += 1
+            if reason == 'unindexed':
+                results['unindexed_count'] += 1
+            results['invalid_words'].append({
+                'id': word_id,
+                'word': word,
+                'audio_url': audio_url,
+                'reason': reason
+            })
         
         return results
\ No newline at end of file
@@ -67,12 +67,80 @@ window.AudioPlayer = {
         });
     },
     
+    // 合集音频对象（按URL缓存，同一合集只请求一次）
+    bundleAudios: {},
+    
+    // 定时停止片段播放的计时器
+    segmentTimer: null,
+    
+    // 播放合集中的一个片段（起始与时长单位为毫秒）
+    playSegment: function(bundleUrl, startMs, durationMs, options = {}) {
+        return new Promise((resolve, reject) => {
+            try {
+                this.stop();
+                
+                let audio = this.bundleAudios[bundleUrl];
+                if (!audio) {
+                    audio = new Audio(bundleUrl);
+                    audio.preload = 'auto';
+                    this.bundleAudios[bundleUrl] = audio;
+                }
+                
+                audio.volume = options.volume || 1.0;
+                audio.playbackRate = options.speed || 1.0;
+                this.currentAudio = audio;
+                
+                const endTime = (startMs + durationMs) / 1000;
+                
+                const finish = () => {
+                    if (this.currentAudio !== audio) return;
+                    this.stop();
+                    if (options.onEnded) options.onEnded();
+                    resolve();
+                };
+                
+                // 播放到片段结尾时停止；timeupdate 触发间隔较大，再用计时器兜底
+                audio.ontimeupdate = () => {
+                    if (audio.currentTime >= endTime) finish();
+                };
+                audio.onended = finish;
+                audio.onplay = () => {
+                    if (options.onPlay) options.onPlay();
+                    clearTimeout(this.segmentTimer);
+                    const remaining = (endTime - audio.currentTime) * 1000 / audio.playbackRate;
+                    this.segmentTimer = setTimeout(finish, Math.max(0, remaining));
+                };
+                audio.onerror = (error) => {
+                    console.error('合集音频加载失败:', error);
+                    delete this.bundleAudios[bundleUrl];
+                    if (this.currentAudio === audio) this.currentAudio = null;
+                    if (options.onError) options.onError(error);
+                    reject(error);
+                };
+                
+                audio.currentTime = startMs / 1000;
+                audio.play().catch(error => {
+                    console.error('音频播放失败:', error);
+                    if (this.currentAudio === audio) this.currentAudio = null;
+                    reject(error);
+                });
+                
+            } catch (error) {
+                console.error('播放合集片段失败:', error);
+                reject(error);
+            }
+        });
+    },
+    
     // 停止播放
     stop: function() {
+        clearTimeout(this.segmentTimer);
         if (this.currentAudio) {
-            this.currentAudio.pause();
-            this.currentAudio.currentTime = 0;
+            const audio = this.currentAudio;
             this.currentAudio = null;
+            audio.ontimeupdate = null;
+            audio.onplay = null;
+            audio.pause();
         }
     },
     
@@ -125,6 +193,54 @@ window.AudioPlayer = {
 
 // 单词音频播放器
 window.WordAudioPlayer = {
+    // 单元音频合集索引（按 年级-单元 缓存请求结果）
+    bundles: {},
+    
+    // 加载单元音频合集索引，失败时返回 null（改为逐个播放单词音频）
+    loadUnitBundle: function(grade, unit) {
+        const key = `${grade}-${unit}`;
+        if (!this.bundles[key]) {
+            this.bundles[key] = ApiClient.request(`/words/audio/bundle?grade=${grade}&unit=${unit}`, {
+                method: 'GET',
+                showErrorNotification: false
+            })
+                .then(response => response.success ? response.data : null)
+                .catch(() => null);
+        }
+        return this.bundles[key];
+    },
+    
+    // 单元音频转码版本（按 年级-单元 缓存请求结果）
+    variants: {},
+    
+    // 加载单元内单词的转码版本，失败时返回 null（播放原始音频）
+    loadUnitVariants: function(grade, unit) {
+        const key = `${grade}-${unit}`;
+        if (!this.variants[key]) {
+            this.variants[key] = ApiClient.request(`/words/audio/variants?grade=${grade}&unit=${unit}`, {
+                method: 'GET',
+                showErrorNotification: false
+            })
+                .then(response => response.success ? response.data : null)
+                .catch(() => null);
+        }
+        return this.variants[key];
+    },
+    
+    // 选择浏览器可以播放的转码版本URL，没有时返回 null
+    pickVariant: function(variants, word) {
+        const urls = variants && variants.words[word.id];
+        if (!urls) return null;
+        
+        const probe = document.createElement('audio');
+        for (const [format, mimetype] of Object.entries(variants.mimetypes)) {
+            if (urls[format] && probe.canPlayType(mimetype)) {
+                return urls[format];
+            }
+        }
+        return null;
+    },
+    
     // 播放单词音频
     playWord: function(word, buttonElement) {
         // 显示加载状态
@@ -132,6 +248,20 @@ window.WordAudioPlayer = {
             this.setButtonState(buttonElement, 'loading');
         }
         
+        // 单词所在单元有音频合集时，在合集中定位播放；否则优先播放浏览器支持的转码版本
+        if (word.audio_url && word.grade && word.unit) {
+            const playSingle = () => this.loadUnitVariants(word.grade, word.unit)
+                .then(variants => this.playAudio(this.pickVariant(variants, word) || word.audio_url, buttonElement));
+            
+            return this.loadUnitBundle(word.grade, word.unit).then(bundle => {
+                const offset = bundle && bundle.words[word.id];
+                if (!offset) {
+                    return playSingle();
+                }
+                return this.playBundleSegment(bundle, offset, buttonElement).catch(playSingle);
+            });
+        }
+        
         // 如果单词有音频URL，直接播放
         if (word.audio_url) {
             return this.playAudio(word.audio_url, buttonElement);
@@ -163,6 +293,22 @@ window.WordAudioPlayer = {
         });
     },
     
+    // 播放合集中的单词片段
+    playBundleSegment: function(bundle, offset, buttonElement) {
+        return AudioPlayer.playSegment(bundle.url, offset[0], offset[1], {
+            onPlay: () => {
+                if (buttonElement) {
+                    this.setButtonState(buttonElement, 'playing');
+                }
+            },
+            onEnded: () => {
+                if (buttonElement) {
+                    this.setButtonState(buttonElement, 'ready');
+                }
+            }
+        });
+    },
+    
     // 生成并播放音频
     generateAndPlayAudio: function(word, buttonElement) {
         return ApiClient.post(`/words/${word.id}/audio`)
@@ -269,8 +415,14 @@ document.addEventListener('DOMContentLoaded', function() {
             const audioUrl = button.dataset.audio;
             
             if (audioUrl) {
-                // 直接播放音频
-                WordAudioPlayer.playAudio(audioUrl, button);
+                // 有年级和单元时优先使用单元音频合集
+                const word = {
+                    id: wordId,
+                    audio_url: audioUrl,
+                    grade: button.dataset.grade,
+                    unit: button.dataset.unit
+                };
+                WordAudioPlayer.playWord(word, button);
             } else if (wordId) {
                 // 生成并播放音频
                 const word = { id: wordId };
@@ -8,18 +8,12 @@ from flask import jsonify, request, current_app
 from datetime import datetime
 import uuid
 
-# 配置日志
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('app.log', encoding='utf-8'),
-        logging.StreamHandler()
-    ]
-)
-
+# 日志处理器由 app.utils.logging_config 在创建应用时配置
 logger = logging.getLogger(__name__)
 
+# 每个请求的开始/结束日志使用独立的日志器，生产环境可按名称抽样或关闭
+request_logger = logging.getLogger('app.request')
+
 class ErrorHandler:
     """统一错误处理类"""
     
@@ -56,14 +50,20 @@ class ErrorHandler:
             start_time = datetime.now()
             
             # 记录请求开始
-            logger.info(f"API请求开始 - ID: {request_id}, 路径: {request.path}, 方法: {request.method}, IP: {request.remote_addr}")
+            request_logger.info(
+                f"API请求开始 - ID: {request_id}, 路径: {request.path}, 方法: {request.method}, IP: {request.remote_addr}",
+                extra=ErrorHandler._request_fields(request_id, kwargs)
+            )
             
             try:
                 result = func(*args, **kwargs)
                 
                 # 记录成功响应
                 duration = (datetime.now() - start_time).total_seconds()
-                logger.info(f"API请求成功 - ID: {request_id}, 耗时: {duration:.3f}s")
+                request_logger.info(
+                    f"API请求成功 - ID: {request_id}, 耗时: {duration:.3f}s",
+                    extra=ErrorHandler._request_fields(request_id, kwargs, duration_ms=round(duration * 1000, 1))
+                )
                 
                 return result
                 
@@ -80,10 +80,23 @@ class ErrorHandler:
         
         return wrapper
     
+    @staticmethod
+    def _request_fields(request_id, view_kwargs, **fields):
+        """请求日志的结构化字段（JSON 日志中逐项输出）"""
+        user_id = view_kwargs.get('user_id') or request.args.get('user_id', type=int)
+        return {
+            'request_id': request_id,
+            'path': request.path,
+            'method': request.method,
+            'ip': request.remote_addr,
+            'user_id': user_id,
+            **fields
+        }
+    
     @staticmethod
     def _handle_validation_error(error, request_id):
         """处理验证错误"""
-        logger.warning(f"验证错误 - ID: {request_id}, 错误: {str(error)}")
+        logger.warning(f"验证错误 - ID: {request_id}, 错误: {str(error)}", extra={'request_id': request_id})
         
         return jsonify({
             'success': False,
@@ -95,7 +108,7 @@ class ErrorHandler:
     @staticmethod
     def _handle_not_found_error(error, request_id):
         """处理资源不存在错误"""
-        logger.warning(f"资源不存在 - ID: {request_id}, 错误: {str(error)}")
+        logger.warning(f"资源不存在 - ID: {request_id}, 错误: {str(error)}", extra={'request_id': request_id})
         
         return jsonify({
             'success': False,
@@ -107,7 +120,7 @@ class ErrorHandler:
     @staticmethod
     def _handle_permission_error(error, request_id):
         """处理权限错误"""
-        logger.warning(f"权限错误 - ID: {request_id}, 错误: {str(error)}")
+        logger.warning(f"权限错误 - ID: {request_id}, 错误: {str(error)}", extra={'request_id': request_id})
         
         return jsonify({
             'success': False,
@@ -119,7 +132,7 @@ class ErrorHandler:
     @staticmethod
     def _handle_conflict_error(error, request_id):
         """处理冲突错误"""
-        logger.warning(f"冲突错误 - ID: {request_id}, 错误: {str(error)}")
+        logger.warning(f"冲突错误 - ID: {request_id}, 错误: {str(error)}", extra={'request_id': request_id})
         
         return jsonify({
             'success': False,
@@ -134,7 +147,10 @@ class ErrorHandler:
         duration = (datetime.now() - start_time).total_seconds()
         error_details = traceback.format_exc()
         
-        logger.error(f"未处理的错误 - ID: {request_id}, 耗时: {duration:.3f}s, 错误: {str(error)}, 堆栈: {error_details}")
+        logger.error(
+            f"未处理的错误 - ID: {request_id}, 耗时: {duration:.3f}s, 错误: {str(error)}, 堆栈: {error_details}",
+            extra={'request_id': request_id, 'path': request.path, 'duration_ms': round(duration * 1000, 1)}
+        )
         
         # 在开发环境显示详细错误信息
         if current_app.debug:
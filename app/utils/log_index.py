@@ -0,0 +1,375 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+日志索引：在日志旁的 SQLite 文件中记录每个时间桶、每个级别的日志所在的字节范围，以及 request_id 所在的偏移，
+按时间、级别和 request_id 查询时只读取命中的字节范围，不扫描整个日志
+"""
+
+import re
+import time
+import sqlite3
+import hashlib
+import threading
+from datetime import datetime
+from app.utils.log_reader import rotated_files, complete_end, ENTRY_START
+
+HEADER_PATTERNS = (
+    re.compile(rb'^(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})(?:,(\d{3}))? - \S+ - (DEBUG|INFO|WARNING|ERROR|CRITICAL) - '),
+    re.compile(rb'^\{"ts": "(\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2})(?:\.(\d{3}))?", "level": "(\w+)"')
+)
+REQUEST_ID_PATTERNS = (
+    re.compile(rb'"request_id": "([^"]+)"'),
+    re.compile(rb'ID: ([0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12})')
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    fingerprint TEXT NOT NULL UNIQUE,
+    path TEXT NOT NULL,
+    indexed_offset INTEGER NOT NULL DEFAULT 0,
+    first_ts REAL,
+    last_ts REAL
+);
+CREATE TABLE IF NOT EXISTS buckets (
+    file_id INTEGER NOT NULL,
+    bucket INTEGER NOT NULL,
+    level TEXT NOT NULL,
+    start_offset INTEGER NOT NULL,
+    end_offset INTEGER NOT NULL,
+    entries INTEGER NOT NULL,
+    PRIMARY KEY (level, bucket, file_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS request_ids (
+    request_id TEXT NOT NULL,
+    file_id INTEGER NOT NULL,
+    offset INTEGER NOT NULL,
+    PRIMARY KEY (request_id, file_id, offset)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_buckets_file ON buckets (file_id);
+CREATE INDEX IF NOT EXISTS idx_request_ids_file ON request_ids (file_id);
+"""
+
+# 文件指纹只取首行（包含毫秒时间戳），首行不足该长度时整行参与计算
+FINGERPRINT_BYTES = 1024
+
+def parse_header(line):
+    """解析日志条目首行
+    
+    Returns:
+        tuple: (时间戳秒数, 级别)，不是条目首行时返回None
+    """
+    for pattern in HEADER_PATTERNS:
+        match = pattern.match(line)
+        if match:
+            stamp, millis, level = match.groups()
+            seconds = _parse_seconds(stamp)
+            return seconds + (int(millis) / 1000 if millis else 0), level.decode('ascii')
+    return None
+
+_seconds_cache = {}
+
+def _parse_seconds(stamp):
+    """按秒缓存时间戳解析结果（同一秒内的日志很多，strptime 较慢）"""
+    seconds = _seconds_cache.get(stamp)
+    if seconds is None:
+        if len(_seconds_cache) > 10000:
+            _seconds_cache.clear()
+        text = stamp.decode('ascii').replace('T', ' ')
+        seconds = time.mktime(time.strptime(text, '%Y-%m-%d %H:%M:%S'))
+        _seconds_cache[stamp] = seconds
+    return seconds
+
+def parse_request_id(line):
+    """条目首行中的 request_id（JSON 字段或文本日志中的 "ID: <uuid>"）"""
+    for pattern in REQUEST_ID_PATTERNS:
+        match = pattern.search(line)
+        if match:
+            return match.group(1).decode('utf-8', 'replace')
+    return None
+
+def file_fingerprint(path):
+    """按文件首行计算指纹：轮转改名后指纹不变，清空后重新写入的文件指纹不同
+    
+    首行尚未写完时返回None。
+    """
+    with open(path, 'rb') as f:
+        head = f.read(FINGERPRINT_BYTES)
+    newline = head.find(b'\n')
+    if newline < 0 and len(head) < FINGERPRINT_BYTES:
+        return None
+    return hashlib.sha1(head[:newline] if newline >= 0 else head).hexdigest()
+
+class LogIndex:
+    """日志文件（含轮转文件）的 SQLite 旁路索引
+    
+    增量建立：每个文件记录已索引到的字节偏移，更新时只解析新写入的部分；
+    文件按首行指纹识别，轮转改名后沿用原有索引，已删除的轮转文件的索引一并清理。
+    """
+    
+    _lock = threading.Lock()
+    
+    def __init__(self, log_file, index_file=None, bucket_seconds=60):
+        self.log_file = log_file
+        self.index_file = index_file or f'{log_file}.idx.sqlite'
+        self.bucket_seconds = bucket_seconds
+    
+    def _connect(self):
+        connection = sqlite3.connect(self.index_file, timeout=30, isolation_level=None)
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.execute('PRAGMA synchronous=NORMAL')
+        connection.executescript(SCHEMA)
+        return connection
+    
+    def update(self):
+        """把所有日志文件中新写入的完整行加入索引
+        
+        Returns:
+            dict: {'files', 'indexed_bytes', 'entries', 'removed_files', 'elapsed_ms'}
+        """
+        start = time.perf_counter()
+        result = {'files': 0, 'indexed_bytes': 0, 'entries': 0, 'removed_files': 0}
+        
+        # 进程内用锁串行，多进程之间由 BEGIN IMMEDIATE 的写锁串行
+        with LogIndex._lock:
+            connection = self._connect()
+            try:
+                connection.execute('BEGIN IMMEDIATE')
+                seen = set()
+                for path in rotated_files(self.log_file):
+                    try:
+                        fingerprint = file_fingerprint(path)
+                    except OSError:
+                        continue
+                    if fingerprint is None:
+                        continue
+                    seen.add(fingerprint)
+                    result['files'] += 1
+                    indexed_bytes, entries = self._update_file(connection, path, fingerprint)
+                    result['indexed_bytes'] += indexed_bytes
+                    result['entries'] += entries
+                
+                result['removed_files'] = self._remove_missing(connection, seen)
+                connection.execute('COMMIT')
+            except Exception:
+                connection.execute('ROLLBACK')
+                raise
+            finally:
+                connection.close()
+        
+        result['elapsed_ms'] = round((time.perf_counter() - start) * 1000, 1)
+        return result
+    
+    def _update_file(self, connection, path, fingerprint):
+        """索引单个文件中上次偏移之后的完整行"""
+        row = connection.execute(
+            'SELECT id, indexed_offset FROM files WHERE fingerprint = ?', (fingerprint,)
+        ).fetchone()
+        if row is None:
+            file_id = connection.execute(
+                'INSERT INTO files (fingerprint, path) VALUES (?, ?)', (fingerprint, path)
+            ).lastrowid
+            offset = 0
+        else:
+            file_id, offset = row
+            connection.execute('UPDATE files SET path = ? WHERE id = ?', (path, file_id))
+        
+        end = complete_end(path)
+        if end <= offset:
+            return 0, 0
+        
+        buckets = {}
+        postings = []
+        first_ts = last_ts = None
+        entries = 0
+        
+        with open(path, 'rb') as f:
+            f.seek(offset)
+            position = offset
+            while position < end:
+                line = f.readline()
+                if not line:
+                    break
+                line_start = position
+                position += len(line)
+                
+                # 续行（异常堆栈等）不单独索引，查询时随所属条目一起读取
+                header = parse_header(line) if ENTRY_START.match(line) else None
+                if header is None:
+                    continue
+                
+                timestamp, level = header
+                entries += 1
+                first_ts = timestamp if first_ts is None else first_ts
+                last_ts = timestamp
+                key = (int(timestamp // self.bucket_seconds), level)
+                bucket = buckets.get(key)
+                if bucket is None:
+                    buckets[key] = [line_start, position, 1]
+                else:
+                    bucket[1] = position
+                    bucket[2] += 1
+                
+                request_id = parse_request_id(line)
+                if request_id:
+                    postings.append((request_id, file_id, line_start))
+        
+        connection.executemany(
+            """INSERT INTO buckets (file_id, bucket, level, start_offset, end_offset, entries)
+               VALUES (?, ?, ?, ?, ?, ?)
+               ON CONFLICT (level, bucket, file_id) DO UPDATE SET
+                   start_offset = MIN(start_offset, excluded.start_offset),
+                   end_offset = MAX(end_offset, excluded.end_offset),
+                   entries = entries + excluded.entries""",
+            [(file_id, bucket, level, start, stop, count) for (bucket, level), (start, stop, count) in buckets.items()]
+        )
+        connection.executemany('INSERT OR IGNORE INTO request_ids VALUES (?, ?, ?)', postings)
+        connection.execute(
+            'UPDATE files SET indexed_offset = ?, first_ts = COALESCE(first_ts, ?), last_ts = COALESCE(?, last_ts) WHERE id = ?',
+            (end, first_ts, last_ts, file_id)
+        )
+        return end - offset, entries
+    
+    def _remove_missing(self, connection, seen):
+        """删除已不存在（轮转时删除或被清空）的文件的索引"""
+        missing = [
+            file_id for file_id, fingerprint in connection.execute('SELECT id, fingerprint FROM files')
+            if fingerprint not in seen
+        ]
+        for file_id in missing:
+            connection.execute('DELETE FROM buckets WHERE file_id = ?', (file_id,))
+            connection.execute('DELETE FROM request_ids WHERE file_id = ?', (file_id,))
+            connection.execute('DELETE FROM files WHERE id = ?', (file_id,))
+        return len(missing)
+    
+    def search(self, level=None, start=None, end=None, request_id=None, limit=500, refresh=True):
+        """按级别、时间范围和 request_id 查询日志
+        
+        有 request_id 时直接读取倒排记录中的偏移；否则读取时间范围内对应级别的时间桶字节范围，
+        再按条目的准确时间和级别过滤。
+        
+        Args:
+            level (str): 级别（不区分大小写），为空或 'all' 时不限
+            start (float): 起始时间戳（含）
+            end (float): 结束时间戳（不含）
+            request_id (str): 请求ID
+            limit (int): 最多返回的条数（按时间顺序取最早的若干条）
+            refresh (bool): 查询前先增量更新索引
+        
+        Returns:
+            dict: {'entries', 'truncated', 'scanned_bytes', 'elapsed_ms'}
+        """
+        started = time.perf_counter()
+        if refresh:
+            self.update()
+        
+        level = level.upper() if level and level.lower() != 'all' else None
+        connection = self._connect()
+        try:
+            files = {
+                file_id: (path, first_ts or 0)
+                for file_id, path, first_ts in connection.execute('SELECT id, path, first_ts FROM files')
+            }
+            if request_id:
+                targets = [
+                    (file_id, offset, None)
+                    for file_id, offset in connection.execute(
+                        'SELECT file_id, offset FROM request_ids WHERE request_id = ?', (request_id,)
+                    )
+                ]
+            else:
+                targets = self._bucket_ranges(connection, level, start, end)
+        finally:
+            connection.close()
+        
+        # 按文件的时间先后、文件内的偏移顺序读取
+        targets.sort(key=lambda item: (files[item[0]][1], item[1]))
+        
+        result = {'entries': [], 'truncated': False, 'scanned_bytes': 0}
+        for file_id, range_start, range_end in targets:
+            path = files[file_id][0]
+            for timestamp, entry_level, text, size in self._read_entries(path, range_start, range_end):
+                result['scanned_bytes'] += size
+                if level and entry_level != level:
+                    continue
+                if (start is not None and timestamp < start) or (end is not None and timestamp >= end):
+                    continue
+                if len(result['entries']) >= limit:
+                    result['truncated'] = True
+                    break
+                result['entries'].append({
+                    'timestamp': datetime.fromtimestamp(timestamp).isoformat(timespec='milliseconds'),
+                    'level': entry_level,
+                    'text': text
+                })
+            if result['truncated']:
+                break
+        
+        result['elapsed_ms'] = round((time.perf_counter() - started) * 1000, 1)
+        return result
+    
+    def _bucket_ranges(self, connection, level, start, end):
+        """时间范围内命中的字节范围，同一文件中相邻或重叠的范围合并
+        
+        Returns:
+            list: [(文件ID, 起始偏移, 结束偏移), ...]
+        """
+        conditions = []
+        params = []
+        if level:
+            conditions.append('level = ?')
+            params.append(level)
+        if start is not None:
+            conditions.append('bucket >= ?')
+            params.append(int(start // self.bucket_seconds))
+        if end is not None:
+            conditions.append('bucket <= ?')
+            params.append(int(end // self.bucket_seconds))
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+        
+        rows = connection.execute(
+            f'SELECT file_id, start_offset, end_offset FROM buckets {where} ORDER BY file_id, start_offset',
+            params
+        ).fetchall()
+        
+        ranges = []
+        for file_id, range_start, range_end in rows:
+            if ranges and ranges[-1][0] == file_id and range_start <= ranges[-1][2]:
+                ranges[-1][2] = max(ranges[-1][2], range_end)
+            else:
+                ranges.append([file_id, range_start, range_end])
+        return [tuple(item) for item in ranges]
+    
+    @staticmethod
+    def _read_entries(path, start, end=None):
+        """从 start 开始顺序读取条目，直到 end 之后的第一个条目首行（end 为None时只读一条）
+        
+        Returns:
+            generator: (时间戳, 级别, 条目文本, 读取的字节数)
+        """
+        try:
+            f = open(path, 'rb')
+        except FileNotFoundError:
+            return
+        
+        with f:
+            f.seek(start)
+            position = start
+            entry = None
+            while True:
+                line = f.readline()
+                header = parse_header(line) if line and ENTRY_START.match(line) else None
+                if not line or header is not None:
+                    if entry is not None:
+                        timestamp, level, lines, entry_start = entry
+                        text = b''.join(lines).rstrip(b'\r\n').decode('utf-8', 'replace')
+                        yield timestamp, level, text, position - entry_start
+                        if end is None:
+                            return
+                    if not line or (end is not None and position >= end):
+                        return
+                    entry = (header[0], header[1], [line], position)
+                elif entry is not None:
+                    entry[2].append(line)
+                position += len(line)
@@ -0,0 +1,175 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+日志读取工具：从文件末尾按块倒序扫描，取到所需条数即停止，不读取整个日志文件
+"""
+
+import os
+import re
+
+BLOCK_SIZE = 64 * 1024
+
+LEVELS = ('DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL')
+
+# 日志条目首行：文本格式以时间戳开头，JSON Lines 格式以 ts 字段开头；
+# 不以此开头的行（文本格式的异常堆栈等）属于上一条日志
+ENTRY_START = re.compile(rb'^(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}|\{"ts": ")')
+LEVEL_PATTERN = re.compile(rb' - (DEBUG|INFO|WARNING|ERROR|CRITICAL) - |^\{"ts": "[^"]*", "level": "(\w+)"')
+
+# 轮转文件后缀：RotatingFileHandler 的序号，或 TimedRotatingFileHandler 的日期时间
+ROTATED_SUFFIX = re.compile(r'^(\d+|\d{4}-\d{2}-\d{2}(_\d{2}(-\d{2}){0,2})?)$')
+
+def rotated_files(log_file):
+    """日志文件及其轮转文件，按从新到旧排列（不存在的文件不返回）"""
+    directory, base = os.path.split(os.path.abspath(log_file))
+    files = [os.path.abspath(log_file)] if os.path.isfile(log_file) else []
+    
+    if os.path.isdir(directory):
+        rotated = []
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if entry.name.startswith(base + '.') and ROTATED_SUFFIX.match(entry.name[len(base) + 1:]) \
+                        and entry.is_file():
+                    rotated.append((entry.stat().st_mtime, entry.path))
+        files.extend(path for _, path in sorted(rotated, reverse=True))
+    return files
+
+def entry_level(line):
+    """日志条目首行中的级别名，无法识别时返回None"""
+    match = LEVEL_PATTERN.search(line)
+    if not match:
+        return None
+    return (match.group(1) or match.group(2)).decode('ascii')
+
+def iter_lines_reversed(path, start=0, end=None, block_size=BLOCK_SIZE):
+    """从 end（默认文件末尾）向前按块读取，逐行产出 (行起始偏移, 行内容)，读到 start 为止
+    
+    每次只把一个块和上一块剩下的不完整行放在内存中。
+    """
+    with open(path, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        end = f.tell() if end is None else min(end, f.tell())
+        position = end
+        remainder = b''
+        
+        while position > start:
+            size = min(block_size, position - start)
+            position -= size
+            f.seek(position)
+            lines = (f.read(size) + remainder).split(b'\n')
+            
+            # 块的第一行可能不完整，留到读取前一个块时拼接
+            remainder = lines[0]
+            offset = position + len(remainder) + 1
+            offsets = []
+            for line in lines[1:]:
+                offsets.append(offset)
+                offset += len(line) + 1
+            
+            for line_offset, line in zip(reversed(offsets), reversed(lines[1:])):
+                yield line_offset, line
+        
+        yield start, remainder
+
+def complete_end(path, block_size=BLOCK_SIZE):
+    """文件中最后一个完整行的结束位置（不含正在写入、尚无换行符的行）"""
+    with open(path, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        position = f.tell()
+        while position > 0:
+            size = min(block_size, position)
+            f.seek(position - size)
+            index = f.read(size).rfind(b'\n')
+            if index >= 0:
+                return position - size + index + 1
+            position -= size
+    return 0
+
+def _file_id(path):
+    return os.stat(path).st_ino
+
+def make_cursor(path, offset):
+    """增量读取游标：文件标识（inode，轮转改名后不变）和已读到的字节偏移"""
+    return f'{_file_id(path)}:{offset}'
+
+def parse_cursor(cursor):
+    """解析游标，格式不正确时返回None"""
+    try:
+        file_id, offset = cursor.split(':', 1)
+        return int(file_id), int(offset)
+    except (AttributeError, ValueError):
+        return None
+
+def tail_log(log_file, limit=100, level=None, since=None, include_rotated=True, block_size=BLOCK_SIZE):
+    """读取日志末尾的 limit 条日志
+    
+    从最新的文件末尾倒序扫描，扫描过程中按级别筛选，取够 limit 条即停止；
+    当前文件不够时继续扫描轮转文件。多行日志（异常堆栈）作为一条返回。
+    
+    Args:
+        log_file (str): 日志文件路径
+        limit (int): 最多返回的条数
+        level (str): 只返回该级别的日志（不区分大小写），为空或 'all' 时不筛选
+        since (str): 上次返回的游标，只返回游标之后新写入的日志（包括游标所在文件轮转后新建的文件）
+        include_rotated (bool): 当前文件不够时是否继续读取轮转文件
+    
+    Returns:
+        dict: {'entries': 按时间顺序的日志, 'cursor': 下次增量读取的游标,
+               'truncated': 取够条数后提前停止（可能还有更早的日志）, 'scanned_bytes': 扫描的字节数}
+    """
+    level = level.upper() if level and level.lower() != 'all' else None
+    files = rotated_files(log_file) if include_rotated else [os.path.abspath(log_file)]
+    files = [path for path in files if os.path.isfile(path)]
+    
+    result = {'entries': [], 'cursor': None, 'truncated': False, 'scanned_bytes': 0}
+    if not files:
+        return result
+    
+    current_end = complete_end(files[0], block_size)
+    result['cursor'] = make_cursor(files[0], current_end)
+    
+    # 确定每个文件的扫描范围：游标所在文件从游标偏移开始，更早的文件不再读取
+    ranges = []
+    cursor = parse_cursor(since) if since else None
+    for index, path in enumerate(files):
+        end = current_end if index == 0 else None
+        if cursor and _file_id(path) == cursor[0]:
+            offset = cursor[1]
+            size = current_end if index == 0 else os.path.getsize(path)
+            # 文件被清空后偏移超过文件大小，从头读取
+            ranges.append((path, offset if offset <= size else 0, end))
+            break
+        ranges.append((path, 0, end))
+    
+    entries = []
+    for path, start, end in ranges:
+        continuation = []
+        for offset, line in iter_lines_reversed(path, start, end, block_size):
+            line = line.rstrip(b'\r')
+            if not line:
+                continue
+            result['scanned_bytes'] += len(line) + 1
+            
+            if not ENTRY_START.match(line):
+                continuation.append(line)
+                continue
+            
+            lines = [line] + continuation[::-1]
+            continuation = []
+            if level and entry_level(line) != level:
+                continue
+            
+            entries.append(b'\n'.join(lines).decode('utf-8', 'replace'))
+            if len(entries) >= limit:
+                result['truncated'] = True
+                break
+        
+        # 文件开头没有时间戳的行单独作为一条
+        if continuation and not level and len(entries) < limit:
+            entries.append(b'\n'.join(continuation[::-1]).decode('utf-8', 'replace'))
+        if result['truncated']:
+            break
+    
+    result['entries'] = entries[::-1]
+    return result
@@ -0,0 +1,216 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+日志配置：请求线程只把日志记录放入内存队列，由后台监听线程写入文件和控制台
+"""
+
+import os
+import copy
+import json
+import time
+import queue
+import atexit
+import zlib
+import logging
+import threading
+from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+# LogRecord 的标准属性，其余属性来自 extra 参数，作为结构化字段输出
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime'}
+
+_listener = None
+
+class JsonFormatter(logging.Formatter):
+    """JSON Lines 格式：每条日志一行 JSON，extra 传入的字段（request_id、path、duration_ms、user_id 等）原样输出"""
+    
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage()
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith('_'):
+                entry[key] = value
+        
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exc'] = record.exc_text
+        if record.stack_info:
+            entry['stack'] = self.formatStack(record.stack_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+class SizeAndTimeRotatingFileHandler(RotatingFileHandler):
+    """文件超过大小上限或距上次轮转超过时间间隔时轮转（app.log -> app.log.1 -> ...）
+    
+    文件名与 RotatingFileHandler 相同，日志读取工具可以统一识别轮转文件。
+    """
+    
+    def __init__(self, filename, max_bytes=0, interval_seconds=0, backup_count=0, encoding='utf-8', on_rollover=None):
+        super().__init__(filename, maxBytes=max_bytes, backupCount=backup_count, encoding=encoding)
+        self.interval_seconds = interval_seconds
+        self.on_rollover = on_rollover
+        # 与 TimedRotatingFileHandler 相同，从现有文件的修改时间推算下次轮转时间
+        start = os.stat(self.baseFilename).st_mtime if os.path.exists(self.baseFilename) else time.time()
+        self.rollover_at = self._next_rollover(start)
+    
+    def _next_rollover(self, start):
+        """start 之后的下一个轮转时间：从当天零点起按间隔对齐（间隔为24小时即每天零点）"""
+        if self.interval_seconds <= 0:
+            return None
+        day = time.localtime(start)
+        day_start = time.mktime((day.tm_year, day.tm_mon, day.tm_mday, 0, 0, 0, 0, 0, -1))
+        return day_start + ((start - day_start) // self.interval_seconds + 1) * self.interval_seconds
+    
+    def shouldRollover(self, record):
+        if self.rollover_at is not None and time.time() >= self.rollover_at:
+            # 空文件不按时间轮转
+            if self.stream is None or self.stream.tell() > 0:
+                return True
+            self.rollover_at = self._next_rollover(time.time())
+        return super().shouldRollover(record)
+    
+    def doRollover(self):
+        super().doRollover()
+        self.rollover_at = self._next_rollover(time.time())
+        if self.on_rollover:
+            try:
+                self.on_rollover(self.baseFilename)
+            except Exception:
+                logging.getLogger(__name__).exception("日志轮转回调执行失败")
+
+class SamplingFilter(logging.Filter):
+    """按日志器名称对 WARNING 以下的日志抽样（WARNING 及以上始终保留）
+    
+    带 request_id 的日志按 request_id 的哈希决定去留，同一请求的开始和结束日志同时保留或丢弃。
+    """
+    
+    def __init__(self, rates):
+        super().__init__()
+        self.rates = rates
+    
+    def _rate(self, name):
+        while name:
+            if name in self.rates:
+                return self.rates[name]
+            name = name.rpartition('.')[0]
+        return 1.0
+    
+    def filter(self, record):
+        if record.levelno >= logging.WARNING or not self.rates:
+            return True
+        rate = self._rate(record.name)
+        if rate >= 1.0:
+            return True
+        if rate <= 0.0:
+            return False
+        
+        key = getattr(record, 'request_id', None) or f'{record.created}:{record.thread}'
+        return zlib.crc32(str(key).encode('utf-8')) % 10000 < rate * 10000
+
+class _PreparedQueueHandler(QueueHandler):
+    """入队前合并消息参数并把异常格式化为文本，但不套用格式（格式由监听线程中的处理器决定）"""
+    
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+def parse_mapping(value, convert=str):
+    """解析 "名称=值,名称=值" 格式的配置，值按 convert 转换；已是字典时直接返回"""
+    if isinstance(value, dict):
+        return {name: convert(item) for name, item in value.items()}
+    
+    mapping = {}
+    for item in (value or '').split(','):
+        name, sep, setting = item.partition('=')
+        if sep and name.strip():
+            mapping[name.strip()] = convert(setting.strip())
+    return mapping
+
+def _index_updater(config):
+    """轮转后在后台线程中把轮转文件的剩余部分加入日志索引（不阻塞日志写入线程）"""
+    if not config.get('LOG_INDEX_ENABLED', True):
+        return None
+    
+    def update(log_file):
+        from app.utils.log_index import LogIndex
+        
+        def run():
+            try:
+                LogIndex(
+                    log_file,
+                    index_file=config.get('LOG_INDEX_FILE'),
+                    bucket_seconds=config.get('LOG_INDEX_BUCKET_SECONDS', 60)
+                ).update()
+            except Exception:
+                logging.getLogger(__name__).exception("轮转后更新日志索引失败")
+        
+        threading.Thread(target=run, name='log-index-update', daemon=True).start()
+    
+    return update
+
+def configure_logging(app):
+    """按应用配置设置日志：根日志器只挂一个队列处理器，文件和控制台输出在后台线程中完成
+    
+    重复调用（例如测试中多次创建应用）时先停止上一次的监听线程再重新配置。
+    """
+    global _listener
+    config = app.config
+    
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+    
+    file_handler = SizeAndTimeRotatingFileHandler(
+        config.get('LOG_FILE', 'app.log'),
+        max_bytes=config.get('LOG_MAX_BYTES', 0),
+        interval_seconds=config.get('LOG_ROTATE_INTERVAL_HOURS', 0) * 3600,
+        backup_count=config.get('LOG_BACKUP_COUNT', 0),
+        on_rollover=_index_updater(config)
+    )
+    if config.get('LOG_FORMAT', 'text') == 'json':
+        file_handler.setFormatter(JsonFormatter())
+    else:
+        file_handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+    
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+    
+    log_queue = queue.SimpleQueue()
+    queue_handler = _PreparedQueueHandler(log_queue)
+    queue_handler.addFilter(SamplingFilter(parse_mapping(config.get('LOG_SAMPLING'), float)))
+    
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+        if not isinstance(handler, QueueHandler):
+            handler.close()
+    root.addHandler(queue_handler)
+    root.setLevel(config.get('LOG_LEVEL', 'INFO').upper())
+    
+    for name, level in parse_mapping(config.get('LOG_LEVELS')).items():
+        logging.getLogger(name).setLevel(level.upper())
+    
+    _listener = QueueListener(log_queue, file_handler, stream_handler, respect_handler_level=True)
+    _listener.start()
+    return _listener
+
+@atexit.register
+def _stop_listener():
+    """进程退出前写完队列中剩余的日志"""
+    if _listener is not None:
+        _listener.stop()
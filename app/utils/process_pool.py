@@ -0,0 +1,54 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+进程池工厂：CPU 密集型任务（班级报告PDF渲染、音频转码）共用的进程池创建与重置
+"""
+
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+_lock = threading.Lock()
+_executors = {}
+
+def _context():
+    """子进程启动方式：优先 forkserver，否则 spawn
+    
+    不使用 fork：应用进程中已有日志队列监听、学习进度刷新、缓存清理等线程，
+    fork 出的子进程可能继承被其他线程持有的锁而死锁，子进程写入的日志也会进入没有线程读取的继承队列。
+    forkserver 和 spawn 的子进程启动时都会以 __mp_main__ 重新导入主模块（python run.py 时会再次执行
+    create_app），create_app 通过 in_worker_process 判断后不启动日志监听和学习进度缓冲。
+    任务函数必须是模块级函数，参数和返回值可以序列化。
+    """
+    if 'forkserver' in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context('forkserver')
+        context.set_forkserver_preload([])
+        return context
+    return multiprocessing.get_context('spawn')
+
+def in_worker_process():
+    """当前进程是否为 multiprocessing 启动的子进程（进程池工作进程）
+    
+    子进程重新导入主模块时 parent_process() 尚未设置，进程名已设置为 SpawnProcess-N 等，按进程名判断。
+    """
+    return multiprocessing.current_process().name != 'MainProcess'
+
+def get_executor(name, max_workers):
+    """按名称获取进程池，首次获取时创建（加锁，并发请求只会创建一个）"""
+    with _lock:
+        executor = _executors.get(name)
+        if executor is None:
+            executor = ProcessPoolExecutor(max_workers=max_workers, mp_context=_context())
+            _executors[name] = executor
+        return executor
+
+def discard_executor(name, executor):
+    """丢弃已损坏（子进程异常退出）的进程池，下次获取时重新创建
+    
+    只在登记的仍是该实例时移除，避免并发时误删其他线程刚重新创建的进程池。
+    """
+    with _lock:
+        if _executors.get(name) is executor:
+            del _executors[name]
+    executor.shutdown(wait=False, cancel_futures=True)
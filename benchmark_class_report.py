@@ -0,0 +1,61 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+班级报告导出性能基准：40名学生时，
+对比逐个串行渲染学习报告与进程池并行渲染的耗时
+"""
+
+import os
+import sys
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app import create_app, db
+from app.models.user import User
+from app.services.class_report import ClassReportService, render_study_report
+
+STUDENT_COUNT = 40
+GRADE = 3
+
+def seed_data():
+    """生成基准数据：同一年级的40名学生"""
+    db.session.add_all([
+        User(username=f'student_{index}', grade=GRADE, current_unit=1)
+        for index in range(STUDENT_COUNT)
+    ])
+    db.session.commit()
+
+def main():
+    app = create_app('testing')
+    
+    with app.app_context():
+        db.create_all()
+        seed_data()
+        
+        students = [
+            row._asdict() for row in
+            db.session.query(User.id, User.username, User.grade, User.current_unit).order_by(User.id).all()
+        ]
+        payloads = list(ClassReportService.build_payloads(students))
+        
+        start = time.perf_counter()
+        for payload in payloads:
+            render_study_report(payload)
+        serial_ms = (time.perf_counter() - start) * 1000
+        
+        # 预热进程池，不把子进程启动时间计入渲染耗时
+        executor = ClassReportService._get_executor()
+        list(executor.map(render_study_report, payloads[:executor._max_workers]))
+        
+        start = time.perf_counter()
+        results = list(executor.map(render_study_report, payloads))
+        parallel_ms = (time.perf_counter() - start) * 1000
+        
+        assert all(error is None for _, _, error in results), '存在渲染失败的报告'
+        
+        print(f"学生数: {len(payloads)}, 渲染进程数: {executor._max_workers}")
+        print(f"串行 {serial_ms:.1f}ms, 进程池 {parallel_ms:.1f}ms, 加速 {serial_ms / parallel_ms:.1f}x")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+学习进度写缓冲落盘性能基准：多个请求线程并发追加事件时，
+对比旧实现（持有全局锁逐条 fsync）与组提交（锁外 fsync，一次确认多条事件）的吞吐量
+"""
+
+import os
+import sys
+import time
+import shutil
+import tempfile
+import threading
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.services.study_buffer import StudyProgressBuffer
+
+THREADS = 8
+EVENTS_PER_THREAD = 300
+
+class LegacyBuffer(StudyProgressBuffer):
+    """旧实现：每条事件在全局锁内 fsync"""
+    
+    def add(self, user_id, word_id, mastery_level, studied_at=None):
+        import json
+        from datetime import datetime
+        
+        event = {
+            'user_id': user_id,
+            'word_id': word_id,
+            'mastery_level': mastery_level,
+            'studied_at': (studied_at or datetime.utcnow()).isoformat()
+        }
+        with self._lock:
+            self._spill_file.write(json.dumps(event) + '\n')
+            self._spill_file.flush()
+            os.fsync(self._spill_file.fileno())
+            self._merge_event(event)
+        return event
+
+def make_buffer(cls, folder):
+    """不连接数据库、不启动刷新线程，只测量追加和落盘"""
+    buffer = cls()
+    buffer.enabled = True
+    buffer.fsync = True
+    buffer.flush_max_events = 10 ** 9
+    buffer.spill_folder = folder
+    buffer._open_spill_file()
+    return buffer
+
+def measure(cls):
+    """并发追加事件，返回每秒确认的事件数"""
+    folder = tempfile.mkdtemp(prefix='study_spill_')
+    try:
+        buffer = make_buffer(cls, folder)
+        
+        def worker(user_id):
+            for word_id in range(EVENTS_PER_THREAD):
+                buffer.add(user_id, word_id, 3)
+        
+        threads = [threading.Thread(target=worker, args=(user_id,)) for user_id in range(1, THREADS + 1)]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+        
+        buffer._spill_file.close()
+        return THREADS * EVENTS_PER_THREAD / elapsed
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+
+def main():
+    legacy = measure(LegacyBuffer)
+    grouped = measure(StudyProgressBuffer)
+    print(f"{THREADS} 个线程各追加 {EVENTS_PER_THREAD} 条事件（每条确认前落盘）:")
+    print(f"  逐条 fsync: {legacy:.0f} 条/秒")
+    print(f"  组提交:     {grouped:.0f} 条/秒，提升 {grouped / legacy:.1f}x")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+学习会话排序性能基准：每个用户1万条学习记录时，
+对比旧的列表过滤实现与新的 LEFT JOIN 实现
+"""
+
+import os
+import sys
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app import create_app, db
+from app.models.user import User
+from app.models.word import Word
+from app.models.study_record import StudyRecord
+from app.services.study_service import StudyService
+from app.services.word_service import WordService
+
+RECORD_COUNT = 10000
+GRADES = [3, 4, 5, 6]
+UNITS = 12
+ROUNDS = 20
+
+def legacy_study_order(user_id, grade, unit=None):
+    """旧实现：加载用户全部学习记录后在Python中逐个过滤"""
+    words = WordService.get_words_by_criteria(grade=grade, unit=unit)
+    
+    studied_word_ids = [r.word_id for r in
+                       StudyRecord.query.filter_by(user_id=user_id).all()]
+    
+    unstudied_words = [w for w in words if w.id not in studied_word_ids]
+    studied_words = [w for w in words if w.id in studied_word_ids]
+    
+    unmastered_records = StudyRecord.query.filter(
+        StudyRecord.user_id == user_id,
+        StudyRecord.word_id.in_([w.id for w in studied_words]),
+        StudyRecord.mastery_level < 4
+    ).all()
+    
+    unmastered_word_ids = [r.word_id for r in unmastered_records]
+    unmastered_words = [w for w in studied_words if w.id in unmastered_word_ids]
+    
+    return unmastered_words + unstudied_words + \
+        [w for w in studied_words if w.id not in unmastered_word_ids]
+
+def seed_data():
+    """生成基准数据：1万个单词，用户学习过其中全部单词"""
+    per_unit = RECORD_COUNT // (len(GRADES) * UNITS) + 1
+    
+    words = []
+    for grade in GRADES:
+        for unit in range(1, UNITS + 1):
+            for index in range(per_unit):
+                words.append(Word(
+                    word=f'word_{grade}_{unit}_{index}',
+                    chinese_meaning=f'单词{grade}-{unit}-{index}',
+                    grade=grade,
+                    unit=unit
+                ))
+    db.session.add_all(words)
+    
+    user = User(username='benchmark', grade=GRADES[0])
+    db.session.add(user)
+    db.session.commit()
+    
+    word_ids = [row[0] for row in db.session.query(Word.id).order_by(Word.id).limit(RECORD_COUNT).all()]
+    db.session.bulk_insert_mappings(StudyRecord, [
+        {'user_id': user.id, 'word_id': word_id, 'mastery_level': word_id % 5 + 1}
+        for word_id in word_ids
+    ])
+    db.session.commit()
+    
+    return user
+
+def measure(func, *args):
+    """多轮执行取平均耗时（毫秒）"""
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        result = func(*args)
+    return (time.perf_counter() - start) / ROUNDS * 1000, result
+
+def main():
+    app = create_app('testing')
+    
+    with app.app_context():
+        db.create_all()
+        user = seed_data()
+        
+        print(f"学习记录数: {StudyRecord.query.filter_by(user_id=user.id).count()}")
+        
+        for grade, unit in [(3, 1), (3, None)]:
+            legacy_ms, legacy_words = measure(legacy_study_order, user.id, grade, unit)
+            join_ms, rows = measure(StudyService._query_study_order, user.id, grade, unit)
+            
+            assert [w.id for w in legacy_words] == [w.id for w, _ in rows], '两种实现的学习顺序不一致'
+            
+            scope = f"{grade}年级" + (f"第{unit}单元" if unit else "全部单元")
+            print(f"{scope} ({len(rows)} 个单词): 旧实现 {legacy_ms:.1f}ms, LEFT JOIN {join_ms:.1f}ms, "
+                  f"加速 {legacy_ms / join_ms:.1f}x")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+批量音频生成性能基准：使用带人工延迟和随机失败的模拟合成引擎，
+对比串行生成（单线程、不限流）与并发流水线（线程池、令牌桶限流、指数退避重试）的耗时
+"""
+
+import os
+import sys
+import time
+import random
+import tempfile
+import threading
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app import create_app, db
+from app.models.word import Word
+from app.models.audio_asset import AudioAsset
+from app.services.tts_service import TTSService
+from app.services.tts_backends import TTSBackend
+
+WORD_COUNT = 60
+LATENCY = 0.2       # 模拟每次合成请求的网络往返（秒）
+FAILURE_RATE = 0.1  # 模拟合成服务偶发失败的比例
+
+class StubEngine(TTSBackend):
+    """模拟合成引擎：固定延迟后写入假音频，按比例随机失败，并记录最大并发数"""
+    
+    name = 'stub'
+    extension = 'mp3'
+    
+    def __init__(self, latency, failure_rate):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.calls = 0
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+    
+    def synthesize(self, text, lang, file_path):
+        with self._lock:
+            self.calls += 1
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        try:
+            time.sleep(self.latency)
+            if random.random() < self.failure_rate:
+                raise RuntimeError('模拟合成服务错误')
+            with open(file_path, 'wb') as f:
+                f.write(f'{lang}:{text}'.encode('utf-8'))
+        finally:
+            with self._lock:
+                self.active -= 1
+
+def run(app, words, **config):
+    """使用给定配置在空的音频目录中生成一次，返回 (耗时毫秒, 结果, 引擎)"""
+    with tempfile.TemporaryDirectory() as audio_folder:
+        app.config.update(AUDIO_FOLDER=audio_folder, **config)
+        # 清空音频清单，每轮都从头合成
+        AudioAsset.query.delete()
+        db.session.commit()
+        engine = StubEngine(LATENCY, FAILURE_RATE)
+        
+        start = time.perf_counter()
+        results = TTSService.batch_generate_audio(words, backend=engine)
+        return (time.perf_counter() - start) * 1000, results, engine
+
+def main():
+    random.seed(42)
+    app = create_app('testing')
+    
+    with app.app_context():
+        db.create_all()
+        db.session.add_all([
+            Word(word=f'word{index}', chinese_meaning=f'单词{index}', grade=3, unit=1)
+            for index in range(WORD_COUNT)
+        ])
+        db.session.commit()
+        words = Word.query.order_by(Word.id).all()
+        
+        serial_ms, serial, serial_engine = run(
+            app, words, TTS_MAX_WORKERS=1, TTS_RATE_LIMIT=1000, TTS_RATE_BURST=1000,
+            TTS_MAX_RETRIES=3, TTS_RETRY_BASE_DELAY=0.05
+        )
+        pool_ms, pooled, pool_engine = run(
+            app, words, TTS_MAX_WORKERS=8, TTS_RATE_LIMIT=20, TTS_RATE_BURST=8,
+            TTS_MAX_RETRIES=3, TTS_RETRY_BASE_DELAY=0.05
+        )
+        
+        print(f"单词数: {WORD_COUNT}, 模拟延迟: {LATENCY * 1000:.0f}ms, 失败率: {FAILURE_RATE:.0%}")
+        for name, elapsed, results, engine in [
+            ('串行', serial_ms, serial, serial_engine),
+            ('并发', pool_ms, pooled, pool_engine)
+        ]:
+            print(f"{name}: {elapsed:.0f}ms, 成功 {results['success_count']}, 失败 {results['error_count']}, "
+                  f"合成请求 {engine.calls} 次, 最大并发 {engine.max_active}")
+        print(f"加速 {serial_ms / pool_ms:.1f}x")
+
+if __name__ == '__main__':
+    main()
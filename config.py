@@ -22,6 +22,85 @@ class Config:
     # 音频文件配置
     AUDIO_FOLDER = os.path.join(basedir, 'static', 'audio')
     
+    AUDIO_GC_MIN_AGE_HOURS = int(os.environ.get('AUDIO_GC_MIN_AGE_HOURS', 24))  # 垃圾回收只清理创建超过该时长的音频
+    
+    # 音频文件缓存：文件名含内容摘要的音频（存储对象、单元合集）按不可变资源缓存的时长（秒）
+    AUDIO_CACHE_MAX_AGE = int(os.environ.get('AUDIO_CACHE_MAX_AGE', 365 * 24 * 3600))
+    # 部署在反向代理之后时交给代理发送文件：x-sendfile（Apache/lighttpd）或 x-accel-redirect（nginx），为空时由应用发送
+    AUDIO_SENDFILE = os.environ.get('AUDIO_SENDFILE', '').lower()
+    # nginx 中映射到音频目录的 internal location 前缀
+    AUDIO_ACCEL_REDIRECT_PREFIX = os.environ.get('AUDIO_ACCEL_REDIRECT_PREFIX', '/internal-audio/')
+    
+    # 单元音频合集：格式（mp3 需要 ffmpeg，wav 无需外部程序）、压缩码率、单词之间的静音间隔（毫秒）
+    AUDIO_BUNDLE_FORMAT = os.environ.get('AUDIO_BUNDLE_FORMAT', 'mp3')
+    AUDIO_BUNDLE_BITRATE = os.environ.get('AUDIO_BUNDLE_BITRATE', '64k')
+    AUDIO_BUNDLE_GAP_MS = int(os.environ.get('AUDIO_BUNDLE_GAP_MS', 300))
+    # 页面请求触发的后台生成失败后，同一单元内容在该时间（秒）内不再重试
+    AUDIO_BUNDLE_RETRY_SECONDS = int(os.environ.get('AUDIO_BUNDLE_RETRY_SECONDS', 600))
+    
+    # 音频后处理：转码格式（opus、aac，逗号分隔，需要 ffmpeg）、码率、目标平均响度与峰值上限（dBFS）、
+    # 静音判定阈值（dBFS）、去静音后保留的首尾余量（毫秒）、进程池大小（0 表示CPU核数）
+    AUDIO_VARIANT_FORMATS = os.environ.get('AUDIO_VARIANT_FORMATS', 'opus')
+    AUDIO_VARIANT_BITRATE = os.environ.get('AUDIO_VARIANT_BITRATE', '24k')
+    AUDIO_TARGET_DBFS = float(os.environ.get('AUDIO_TARGET_DBFS', -20.0))
+    AUDIO_PEAK_DBFS = float(os.environ.get('AUDIO_PEAK_DBFS', -1.0))
+    AUDIO_SILENCE_THRESH = float(os.environ.get('AUDIO_SILENCE_THRESH', -45.0))
+    AUDIO_TRIM_PADDING_MS = int(os.environ.get('AUDIO_TRIM_PADDING_MS', 50))
+    AUDIO_PROCESS_WORKERS = int(os.environ.get('AUDIO_PROCESS_WORKERS', 0))
+    
+    # 语音合成后端：gtts（在线）或 espeak（本地 espeak-ng，适合无外网的服务器）
+    TTS_BACKEND = os.environ.get('TTS_BACKEND', 'gtts')
+    TTS_ESPEAK_COMMAND = os.environ.get('TTS_ESPEAK_COMMAND', 'espeak-ng')
+    TTS_ESPEAK_VOICE = os.environ.get('TTS_ESPEAK_VOICE')  # 为空时按语言选择发音人
+    TTS_ESPEAK_SPEED = int(os.environ.get('TTS_ESPEAK_SPEED', 140))  # 每分钟词数
+    TTS_ESPEAK_TIMEOUT = int(os.environ.get('TTS_ESPEAK_TIMEOUT', 10))
+    
+    # 批量音频生成配置：线程池大小、令牌桶限流（每秒请求数与突发上限）、失败重试次数与退避基数（秒）
+    TTS_MAX_WORKERS = int(os.environ.get('TTS_MAX_WORKERS', 4))
+    TTS_RATE_LIMIT = float(os.environ.get('TTS_RATE_LIMIT', 5))
+    TTS_RATE_BURST = int(os.environ.get('TTS_RATE_BURST', 5))
+    TTS_MAX_RETRIES = int(os.environ.get('TTS_MAX_RETRIES', 3))
+    TTS_RETRY_BASE_DELAY = float(os.environ.get('TTS_RETRY_BASE_DELAY', 0.5))
+    
+    # 学习进度写缓冲配置：先落盘到溢出文件并在内存合并，再定时批量写入数据库
+    STUDY_WRITE_BEHIND = os.environ.get('STUDY_WRITE_BEHIND', 'false').lower() in ('1', 'true', 'yes')
+    STUDY_FLUSH_INTERVAL_MS = int(os.environ.get('STUDY_FLUSH_INTERVAL_MS', 500))
+    STUDY_FLUSH_MAX_EVENTS = int(os.environ.get('STUDY_FLUSH_MAX_EVENTS', 200))
+    STUDY_SPILL_FOLDER = os.environ.get('STUDY_SPILL_FOLDER') or os.path.join(basedir, 'spill')
+    # 事件fsync后才确认，保证崩溃（含断电）后不丢失；并发事件共用一次fsync（组提交）。
+    # 关闭后只写入操作系统页缓存，进程崩溃不丢失，断电可能丢失最近的事件
+    STUDY_SPILL_FSYNC = os.environ.get('STUDY_SPILL_FSYNC', 'true').lower() in ('1', 'true', 'yes')
+    
+    # PDF缓存配置：渲染结果按内容哈希存放，未命中时在线程池中渲染
+    PDF_CACHE_FOLDER = os.environ.get('PDF_CACHE_FOLDER') or os.path.join(basedir, 'cache', 'pdf')
+    PDF_RENDER_WORKERS = int(os.environ.get('PDF_RENDER_WORKERS', 2))
+    PDF_RENDER_TIMEOUT = int(os.environ.get('PDF_RENDER_TIMEOUT', 30))  # 请求等待渲染的秒数，超时返回202
+    
+    # 学习事件日志保留策略：超过压缩期限的事件按 (用户, 单词, 日期) 只保留一条，超过保留期限的删除（0表示永久保留）
+    STUDY_EVENT_COMPACT_AFTER_DAYS = int(os.environ.get('STUDY_EVENT_COMPACT_AFTER_DAYS', 30))
+    STUDY_EVENT_RETENTION_DAYS = int(os.environ.get('STUDY_EVENT_RETENTION_DAYS', 730))
+    
+    # 班级报告导出配置：在进程池中并行渲染，结果打包为zip存放在磁盘上
+    REPORT_EXPORT_FOLDER = os.environ.get('REPORT_EXPORT_FOLDER') or os.path.join(basedir, 'cache', 'reports')
+    REPORT_RENDER_PROCESSES = int(os.environ.get('REPORT_RENDER_PROCESSES', 0))  # 0表示使用CPU核数
+    
+    # 日志配置：text 为可读文本，json 为 JSON Lines（每行一条，带 request_id、path、duration_ms 等字段）
+    LOG_FILE = os.environ.get('LOG_FILE', 'app.log')
+    LOG_FORMAT = os.environ.get('LOG_FORMAT', 'text')
+    LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO')
+    # 文件超过大小上限（字节）或距上次轮转超过间隔（小时，0表示不按时间轮转）时轮转，保留的历史文件数
+    LOG_MAX_BYTES = int(os.environ.get('LOG_MAX_BYTES', 50 * 1024 * 1024))
+    LOG_ROTATE_INTERVAL_HOURS = int(os.environ.get('LOG_ROTATE_INTERVAL_HOURS', 24))
+    LOG_BACKUP_COUNT = int(os.environ.get('LOG_BACKUP_COUNT', 14))
+    # 按日志器设置级别，例如 "app.request=WARNING" 关闭每个请求的 INFO 日志
+    LOG_LEVELS = os.environ.get('LOG_LEVELS', '')
+    # 按日志器对 WARNING 以下的日志抽样，例如 "app.request=0.1" 保留约10%的请求日志
+    LOG_SAMPLING = os.environ.get('LOG_SAMPLING', '')
+    # 日志索引（SQLite 旁路文件）：按时间桶和级别记录字节范围、按 request_id 记录偏移，轮转时和查询时增量更新
+    LOG_INDEX_ENABLED = os.environ.get('LOG_INDEX_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+    LOG_INDEX_FILE = os.environ.get('LOG_INDEX_FILE')  # 为空时为日志文件名加 .idx.sqlite
+    LOG_INDEX_BUCKET_SECONDS = int(os.environ.get('LOG_INDEX_BUCKET_SECONDS', 60))
+    
     @staticmethod
     def init_app(app):
         pass
@@ -40,6 +119,8 @@ class TestingConfig(Config):
 class ProductionConfig(Config):
     """生产环境配置"""
     DEBUG = False
+    LOG_FORMAT = os.environ.get('LOG_FORMAT', 'json')
+    LOG_SAMPLING = os.environ.get('LOG_SAMPLING', 'app.request=0.1')
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or \
         'sqlite:///' + os.path.join(basedir, 'data.sqlite')
 
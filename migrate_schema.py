@@ -0,0 +1,141 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+数据库结构迁移脚本：为已有的SQLite数据库补充新增的列和索引
+- 新表由 db.create_all() 创建，本脚本只处理已有表上的变更
+- 每一步都可重复执行
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app import create_app, db
+from app.models.study_record import StudyRecord
+from sqlalchemy import text
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def get_table_columns(table_name):
+    """获取表的现有列名"""
+    rows = db.session.execute(text(f'PRAGMA table_info({table_name})')).fetchall()
+    return {row[1] for row in rows}
+
+def add_study_schedule_columns():
+    """为学习记录添加间隔重复调度列，并根据现有掌握程度回填下次复习时间"""
+    columns = get_table_columns('study_records')
+    
+    new_columns = {
+        'due_at': 'DATETIME',
+        'interval_days': 'FLOAT NOT NULL DEFAULT 0',
+        'ease': f'FLOAT NOT NULL DEFAULT {StudyRecord.DEFAULT_EASE}',
+        'repetitions': 'INTEGER NOT NULL DEFAULT 0'
+    }
+    
+    for name, definition in new_columns.items():
+        if name not in columns:
+            db.session.execute(text(f'ALTER TABLE study_records ADD COLUMN {name} {definition}'))
+            logger.info(f"已添加列: study_records.{name}")
+    
+    db.session.execute(text(
+        'CREATE INDEX IF NOT EXISTS idx_study_records_user_due ON study_records (user_id, due_at)'
+    ))
+    db.session.commit()
+    
+    # 把现有记录视为一次复习，按掌握程度安排下次复习时间
+    backfilled = 0
+    records = StudyRecord.query.filter(StudyRecord.due_at.is_(None)).yield_per(1000)
+    for record in records:
+        record.schedule_review(record.mastery_level, record.studied_at)
+        backfilled += 1
+    
+    db.session.commit()
+    logger.info(f"已回填 {backfilled} 条学习记录的复习计划")
+
+def add_study_record_unique_constraint():
+    """为学习记录的 (user_id, word_id) 建立唯一约束，先合并历史重复记录"""
+    # 每个 (用户, 单词) 保留最近学习的一条，其余删除
+    duplicates = db.session.execute(text('''
+        DELETE FROM study_records
+        WHERE id NOT IN (
+            SELECT id FROM (
+                SELECT id, ROW_NUMBER() OVER (
+                    PARTITION BY user_id, word_id
+                    ORDER BY studied_at DESC, id DESC
+                ) AS row_num
+                FROM study_records
+            ) WHERE row_num = 1
+        )
+    ''')).rowcount
+    if duplicates:
+        logger.info(f"已删除 {duplicates} 条重复的学习记录")
+    
+    db.session.execute(text('DROP INDEX IF EXISTS idx_study_records_user_word'))
+    db.session.execute(text(
+        'CREATE UNIQUE INDEX IF NOT EXISTS uq_study_records_user_word ON study_records (user_id, word_id)'
+    ))
+    db.session.commit()
+    logger.info("已建立学习记录唯一约束")
+
+def backfill_progress_counters():
+    """首次创建学习进度计数器表时，根据已有学习记录回填"""
+    from app.models.progress_counter import UserProgressCounter
+    
+    if UserProgressCounter.query.first() is not None:
+        return
+    
+    count = UserProgressCounter.rebuild()
+    logger.info(f"已回填 {count} 条学习进度计数器")
+
+def backfill_test_daily_stats():
+    """首次创建测验每日汇总表时，根据已有测验记录回填"""
+    from app.models.test_daily_stat import TestDailyStat
+    
+    if TestDailyStat.query.first() is not None:
+        return
+    
+    count = TestDailyStat.rebuild()
+    logger.info(f"已回填 {count} 条测验每日汇总")
+
+def backfill_study_events():
+    """首次创建学习事件表时，用已有学习记录初始化"""
+    from app.models.study_event import StudyEvent
+    
+    if StudyEvent.query.first() is not None:
+        return
+    
+    count = StudyEvent.backfill_from_records()
+    logger.info(f"已用学习记录初始化 {count} 条学习事件")
+
+def backfill_word_changes():
+    """首次创建词库变更日志时，为已有单词各写入一条变更"""
+    from app.models.word_change import WordChange
+    
+    if WordChange.query.first() is not None:
+        return
+    
+    count = WordChange.backfill_from_words()
+    logger.info(f"已用现有单词初始化 {count} 条词库变更")
+
+def migrate():
+    """执行全部迁移步骤"""
+    app = create_app()
+    
+    with app.app_context():
+        # 创建新增的表
+        db.create_all()
+        
+        add_study_schedule_columns()
+        add_study_record_unique_constraint()
+        backfill_test_daily_stats()
+        backfill_progress_counters()
+        backfill_study_events()
+        backfill_word_changes()
+        
+        logger.info("数据库结构迁移完成")
+
+if __name__ == '__main__':
+    migrate()
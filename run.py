@@ -2,6 +2,7 @@
 # -*- coding: utf-8 -*-
 
 import os
+import click
 from flask_migrate import upgrade
 from app import create_app, db
 
@@ -45,6 +46,113 @@ def init_db():
         
         print("数据库初始化完成")
 
+@app.cli.command()
+def rebuild_stats():
+    """根据明细记录重建统计汇总表"""
+    with app.app_context():
+        db.create_all()
+        
+        from app.models.test_daily_stat import TestDailyStat
+        count = TestDailyStat.rebuild()
+        print(f"测验每日汇总重建完成，共 {count} 条")
+        
+        from app.models.progress_counter import UserProgressCounter
+        count = UserProgressCounter.rebuild()
+        print(f"学习进度计数器重建完成，共 {count} 条")
+
+@app.cli.command()
+def precompute_due_counts():
+    """预计算各用户当天待复习单词数（建议每晚定时运行）"""
+    with app.app_context():
+        from app.models.due_count import UserDueCount
+        count = UserDueCount.refresh()
+        print(f"待复习单词数预计算完成，共 {count} 个用户")
+
+@app.cli.command()
+def compact_study_events():
+    """按保留策略压缩和清理学习事件日志（建议每晚定时运行）"""
+    from datetime import datetime, timedelta
+    
+    with app.app_context():
+        from app.models.study_event import StudyEvent
+        now = datetime.utcnow()
+        
+        compact_after = app.config['STUDY_EVENT_COMPACT_AFTER_DAYS']
+        compacted = StudyEvent.compact(now - timedelta(days=compact_after))
+        print(f"已压缩 {compact_after} 天前的学习事件，删除 {compacted} 条")
+        
+        retention = app.config['STUDY_EVENT_RETENTION_DAYS']
+        if retention:
+            purged = StudyEvent.purge(now - timedelta(days=retention))
+            print(f"已删除 {retention} 天前的学习事件 {purged} 条")
+
+@app.cli.command()
+def import_audio():
+    """把旧版音频文件导入内容寻址存储并写入音频清单"""
+    with app.app_context():
+        from app.services.audio_store import AudioStore
+        from app.services.cache_service import AudioCacheService, WordCacheService
+        result = AudioStore.import_legacy()
+        AudioCacheService.clear_audio_cache()
+        WordCacheService.clear_word_cache()
+        print(f"旧版音频导入完成: 导入 {result['imported']} 个文件，更新 {result['words_updated']} 个单词，"
+              f"缺失 {result['missing']} 个")
+
+@app.cli.command()
+def gc_audio():
+    """删除没有单词引用的音频清单记录和文件（建议每晚定时运行）"""
+    with app.app_context():
+        from app.services.audio_store import AudioStore
+        result = AudioStore.collect_garbage(app.config['AUDIO_GC_MIN_AGE_HOURS'])
+        print(f"音频垃圾回收完成: 删除清单记录 {result['assets_removed']} 条，转码版本 {result['variants_removed']} 条，"
+              f"文件 {result['files_removed']} 个，释放 {result['bytes_freed']} 字节")
+
+@app.cli.command()
+@click.option('--grade', type=int, help='只处理指定年级')
+@click.option('--force', is_flag=True, help='重新处理已有转码版本的音频')
+def postprocess_audio(grade, force):
+    """去除音频首尾静音、归一化响度并转码为低码率格式，按单元报告节省的字节数"""
+    with app.app_context():
+        from app.services.audio_postprocess import AudioPostprocessService
+        report, error = AudioPostprocessService.process_units(grade=grade, force=force)
+        if error:
+            print(error)
+            return
+        
+        for item in report['units']:
+            saved = '，'.join(f"{name} 节省 {item['bytes_saved'][name]} 字节" for name in report['formats'])
+            print(f"{item['grade']}年级第{item['unit']}单元: 已转码 {item['converted']}/{item['files']}，"
+                  f"原始 {item['original_bytes']} 字节，{saved}")
+        print(f"音频后处理完成: 处理 {report['processed']} 个，跳过 {report['skipped']} 个，失败 {report['failed']} 个，"
+              f"耗时 {report['elapsed_ms']}ms")
+        for error in report['errors']:
+            print(f"  {error}")
+
+@app.cli.command()
+def build_audio_bundles():
+    """生成各单元的音频合集（已是最新的单元跳过，建议批量生成音频后运行）"""
+    with app.app_context():
+        from app.services.audio_bundle import AudioBundleService
+        result = AudioBundleService.build_all()
+        print(f"单元音频合集生成完成: 新生成 {result['built']} 个，已是最新 {result['up_to_date']} 个，"
+              f"失败 {result['failed']} 个")
+        for error in result['errors']:
+            print(f"  {error}")
+
+@app.cli.command()
+def index_logs():
+    """增量更新日志索引（含轮转文件，日志轮转时也会自动更新）"""
+    with app.app_context():
+        from app.utils.log_index import LogIndex
+        index = LogIndex(
+            app.config['LOG_FILE'],
+            index_file=app.config.get('LOG_INDEX_FILE'),
+            bucket_seconds=app.config['LOG_INDEX_BUCKET_SECONDS']
+        )
+        result = index.update()
+        print(f"日志索引更新完成: 文件 {result['files']} 个，新索引 {result['indexed_bytes']} 字节、"
+              f"{result['entries']} 条日志，清理 {result['removed_files']} 个已删除文件，耗时 {result['elapsed_ms']}ms")
+
 def get_sample_words():
     """获取完整的词库数据 - 3-6年级，每年级12个单元"""
     from complete_words_data import get_all_words
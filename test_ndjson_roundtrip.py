@@ -0,0 +1,71 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+NDJSON 导出/导入往返检查：导出的单词清空后重新导入，除 ID 和时间戳外所有字段保持不变
+（包括导出为 null 的可选字段，不能变成字符串 'None'）
+"""
+
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app import create_app, db
+from app.models.word import Word
+
+# 比较时忽略的字段：重新导入后会重新生成
+IGNORED_FIELDS = ('id', 'created_at', 'updated_at')
+
+def seed_words():
+    """一个字段齐全的单词和一个可选字段全部为空的单词"""
+    db.session.add_all([
+        Word(
+            word='apple',
+            chinese_meaning='苹果',
+            phonetic='/ˈæpl/',
+            phonics_breakdown='ap-ple',
+            memory_method='a 苹果',
+            grade=3,
+            unit=1,
+            book_version='PEP',
+            audio_url='/static/audio/objects/ab/cd/abcd.mp3'
+        ),
+        Word(word='banana', chinese_meaning='香蕉', grade=3, unit=2)
+    ])
+    db.session.commit()
+
+def snapshot():
+    """按单词排序的字段快照"""
+    return [
+        {key: value for key, value in word.to_dict().items() if key not in IGNORED_FIELDS}
+        for word in Word.query.order_by(Word.word).all()
+    ]
+
+def main():
+    app = create_app('testing')
+    client = app.test_client()
+    
+    with app.app_context():
+        db.create_all()
+        seed_words()
+        before = snapshot()
+        
+        for compress in ('false', 'true'):
+            response = client.get(f'/api/export/words/ndjson?gzip={compress}')
+            assert response.status_code == 200, f'导出失败: {response.status_code}'
+            body = response.get_data()
+            
+            Word.query.delete()
+            db.session.commit()
+            
+            response = client.post('/api/words/import/ndjson', data=body)
+            result = response.get_json()
+            assert result['success'] and result['created_count'] == len(before), f'导入失败: {result}'
+            
+            db.session.expire_all()
+            after = snapshot()
+            assert after == before, f'往返后字段不一致:\n导出前 {before}\n导入后 {after}'
+            print(f"✅ NDJSON 往返（gzip={compress}）: {len(after)} 个单词字段一致")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+进程池工作进程检查：工作进程会以 __mp_main__ 重新导入主模块，
+像 run.py 一样在模块级创建应用时，工作进程中不能启动日志队列监听和学习进度缓冲线程
+"""
+
+import os
+import sys
+import logging
+import tempfile
+import threading
+from logging.handlers import QueueHandler
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+# 与 run.py 相同：模块级创建应用（工作进程导入本模块时会再次执行）
+os.environ.setdefault('STUDY_WRITE_BEHIND', 'true')
+os.environ.setdefault('STUDY_SPILL_FOLDER', tempfile.mkdtemp(prefix='study_spill_'))
+
+from app import create_app
+from app.utils import logging_config
+from app.services.study_buffer import study_buffer
+from app.utils.process_pool import get_executor, discard_executor
+
+app = create_app('testing')
+
+EXECUTOR_NAME = 'process_pool_check'
+
+def process_state():
+    """在进程内收集后台线程和日志处理器状态"""
+    return {
+        'pid': os.getpid(),
+        'log_listener': logging_config._listener is not None,
+        'study_buffer': study_buffer.enabled,
+        'flusher_thread': any(thread.name == 'study-progress-flusher' for thread in threading.enumerate()),
+        'queue_handler': any(isinstance(handler, QueueHandler) for handler in logging.getLogger().handlers)
+    }
+
+def main():
+    parent = process_state()
+    assert parent['log_listener'], f'主进程应启动日志监听: {parent}'
+
+    executor = get_executor(EXECUTOR_NAME, max_workers=1)
+    try:
+        worker = executor.submit(process_state).result(timeout=60)
+    finally:
+        discard_executor(EXECUTOR_NAME, executor)
+
+    assert worker['pid'] != parent['pid'], '任务未在工作进程中执行'
+    started = [key for key in ('log_listener', 'study_buffer', 'flusher_thread', 'queue_handler') if worker[key]]
+    assert not started, f'工作进程启动了 {started}: {worker}'
+    print(f"✅ 工作进程 {worker['pid']} 未启动日志监听和学习进度缓冲（主进程 {parent['pid']}）")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+查询次数检查：学习记录序列化时预加载单词，学习报告CSV导出、学习进度API（最近学习的单词）
+和复习页面执行的SQL语句数不随学习记录数增长（没有 N+1 查询）
+"""
+
+import os
+import sys
+from datetime import datetime, timedelta
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import event
+from app import create_app, db
+from app.models.user import User
+from app.models.word import Word
+from app.models.study_record import StudyRecord
+
+RECORD_COUNTS = [5, 50, 500]  # 最小值低于复习页面（20条）和最近学习（10条）的显示上限，N+1 时次数会随之变化
+GRADE = 3
+UNITS = 24
+WORDS_PER_UNIT = 25
+
+class StatementCounter:
+    """用 before_cursor_execute 事件统计执行的SQL语句数"""
+    
+    def __init__(self, engine):
+        self.count = 0
+        event.listen(engine, 'before_cursor_execute', self._on_execute)
+    
+    def _on_execute(self, *args):
+        self.count += 1
+    
+    def measure(self, func):
+        self.count = 0
+        func()
+        return self.count
+
+def seed_words():
+    """生成一个年级的词库（数量足够覆盖最大的学习记录数）"""
+    db.session.add_all([
+        Word(word=f'word_{unit}_{index}', chinese_meaning=f'单词{unit}-{index}', grade=GRADE, unit=unit)
+        for unit in range(1, UNITS + 1)
+        for index in range(WORDS_PER_UNIT)
+    ])
+    db.session.commit()
+
+def seed_user(record_count):
+    """新建用户并写入 record_count 条学习记录（学习时间在一个月前，全部到期待复习）"""
+    user = User(username=f'student_{record_count}', grade=GRADE, current_unit=1)
+    db.session.add(user)
+    db.session.commit()
+    
+    studied_at = datetime.utcnow() - timedelta(days=30)
+    word_ids = [row[0] for row in db.session.query(Word.id).order_by(Word.id).limit(record_count).all()]
+    StudyRecord.bulk_upsert(user.id, [
+        {'word_id': word_id, 'mastery_level': word_id % 3 + 1, 'studied_at': studied_at - timedelta(minutes=word_id)}
+        for word_id in word_ids
+    ])
+    user_id = user.id
+    # 清空会话，避免已加载的对象掩盖懒加载查询
+    db.session.remove()
+    return user_id
+
+def main():
+    app = create_app('testing')
+    client = app.test_client()
+    
+    with app.app_context():
+        db.create_all()
+        seed_words()
+        counter = StatementCounter(db.engine)
+        
+        endpoints = {
+            '学习报告CSV导出': lambda user_id: f'/api/export/study-report/{user_id}/csv',
+            '学习进度API': lambda user_id: f'/api/study/progress/{user_id}',
+            '复习页面': lambda user_id: f'/study/{user_id}/review'
+        }
+        
+        # 先请求一次，填充词库计数等与学习记录无关的缓存
+        warmup_user_id = seed_user(1)
+        for path in endpoints.values():
+            client.get(path(warmup_user_id))
+        
+        counts = {name: [] for name in endpoints}
+        for record_count in RECORD_COUNTS:
+            user_id = seed_user(record_count)
+            for name, path in endpoints.items():
+                def request():
+                    response = client.get(path(user_id))
+                    assert response.status_code == 200, f'{name} 请求失败: {response.status_code}'
+                    # 读取响应体：流式CSV在迭代时才执行查询
+                    response.get_data()
+                counts[name].append(counter.measure(request))
+        
+        for name, values in counts.items():
+            detail = ', '.join(f'{record_count}条记录 {value}次' for record_count, value in zip(RECORD_COUNTS, values))
+            assert len(set(values)) == 1, f'{name} 的查询次数随学习记录数增长: {detail}'
+            print(f"✅ {name}: 查询次数恒定（{detail}）")
+
+if __name__ == '__main__':
+    main()